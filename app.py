@@ -1,6 +1,12 @@
 """Flask API for the banking chatbot service."""
-from flask import Flask, request, jsonify
-from chatbot_service import BankingChatbot
+from typing import Optional
+import hmac
+import math
+import os
+
+from flask import Flask, Response, request, jsonify, stream_with_context
+from chatbot_service import BankingChatbot, format_sse_event
+from response_templates import RESPONSE_MODES
 import config
 
 app = Flask(__name__)
@@ -16,6 +22,16 @@ def health_check():
     }), 200
 
 
+def _invalid_response_mode(data):
+    """Error response if the request names an unknown response_mode, else None."""
+    response_mode = data.get('response_mode')
+    if response_mode is not None and response_mode not in RESPONSE_MODES:
+        return jsonify({
+            "error": f"Invalid response_mode: must be one of {', '.join(RESPONSE_MODES)}"
+        }), 400
+    return None
+
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """
@@ -24,8 +40,11 @@ def chat():
     Request body:
     {
         "customer_id": "CUST001",
-        "query": "What's my current EMI and can I prepay this month?"
+        "query": "What's my current EMI and can I prepay this month?",
+        "response_mode": "auto"
     }
+    
+    "response_mode" is optional: "template", "llm" or "auto".
     """
     try:
         data = request.get_json()
@@ -34,12 +53,15 @@ def chat():
             return jsonify({
                 "error": "Missing required fields: customer_id and query"
             }), 400
+        invalid = _invalid_response_mode(data)
+        if invalid:
+            return invalid
         
         customer_id = data['customer_id']
         query = data['query']
         
         # Process the query
-        result = chatbot.process_query(customer_id, query)
+        result = chatbot.process_query(customer_id, query, data.get('response_mode'))
         
         return jsonify(result), 200
     
@@ -50,6 +72,51 @@ def chat():
         }), 500
 
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Chat endpoint streaming the answer as server-sent events.
+    
+    Events: "metadata" (context used), "token" (text chunks), "done" (timings).
+    
+    Request body:
+    {
+        "customer_id": "CUST001",
+        "query": "What's my current EMI and can I prepay this month?",
+        "response_mode": "auto"
+    }
+    """
+    data = request.get_json(silent=True)
+    
+    if not data or 'customer_id' not in data or 'query' not in data:
+        return jsonify({
+            "error": "Missing required fields: customer_id and query"
+        }), 400
+    invalid = _invalid_response_mode(data)
+    if invalid:
+        return invalid
+    
+    customer_id = data['customer_id']
+    query = data['query']
+    response_mode = data.get('response_mode')
+    
+    def generate():
+        try:
+            for event, payload in chatbot.process_query_stream(customer_id, query, response_mode):
+                yield format_sse_event(event, payload)
+        except Exception as e:
+            yield format_sse_event("error", {
+                "error": "Internal server error",
+                "message": str(e)
+            })
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.route('/prepayment/calculate', methods=['POST'])
 def calculate_prepayment():
     """
@@ -59,8 +126,12 @@ def calculate_prepayment():
     {
         "customer_id": "CUST001",
         "loan_id": "LOAN001",
-        "prepayment_amount": 100000
+        "prepayment_amount": 100000,
+        "response_mode": "template"
     }
+    
+    "response_mode" is optional: "llm" asks for a free-form LLM explanation;
+    "template" and "auto" explain the numbers with a template, without an LLM call.
     """
     try:
         data = request.get_json()
@@ -70,13 +141,16 @@ def calculate_prepayment():
             return jsonify({
                 "error": f"Missing required fields: {', '.join(required_fields)}"
             }), 400
+        invalid = _invalid_response_mode(data)
+        if invalid:
+            return invalid
         
         customer_id = data['customer_id']
         loan_id = data['loan_id']
         prepayment_amount = float(data['prepayment_amount'])
         
         # Calculate prepayment
-        result = chatbot.calculate_prepayment(customer_id, loan_id, prepayment_amount)
+        result = chatbot.calculate_prepayment(customer_id, loan_id, prepayment_amount, data.get('response_mode'))
         
         return jsonify(result), 200
     
@@ -91,6 +165,74 @@ def calculate_prepayment():
         }), 500
 
 
+@app.route('/prepayment/calculate/batch', methods=['POST'])
+def calculate_prepayments():
+    """
+    Calculate many prepayment scenarios in one request.
+    
+    Request body:
+    {
+        "scenarios": [
+            {"customer_id": "CUST001", "loan_id": "LOAN001", "prepayment_amount": 100000},
+            {"customer_id": "CUST001", "loan_id": "LOAN001", "prepayment_amount": 200000}
+        ],
+        "summarize": false
+    }
+    
+    Returns the raw numbers per scenario; with "summarize" one LLM summary
+    of all scenarios is added.
+    """
+    try:
+        data = request.get_json()
+        
+        scenarios = data.get('scenarios') if data else None
+        required_fields = ['customer_id', 'loan_id', 'prepayment_amount']
+        if not isinstance(scenarios, list) or not all(
+            isinstance(scenario, dict) and all(field in scenario for field in required_fields)
+            for scenario in scenarios
+        ):
+            return jsonify({
+                "error": f"Missing required field: scenarios (list of objects with {', '.join(required_fields)})"
+            }), 400
+        
+        if len(scenarios) > config.PREPAYMENT_BATCH_MAX:
+            return jsonify({
+                "error": f"Too many scenarios: maximum is {config.PREPAYMENT_BATCH_MAX}"
+            }), 400
+        
+        summarize = data.get('summarize', False)
+        if not isinstance(summarize, bool):
+            return jsonify({
+                "error": "Invalid summarize: must be true or false"
+            }), 400
+        
+        scenarios = [
+            dict(scenario, prepayment_amount=float(scenario['prepayment_amount']))
+            for scenario in scenarios
+        ]
+        if not all(
+            math.isfinite(scenario['prepayment_amount']) and scenario['prepayment_amount'] >= 0
+            for scenario in scenarios
+        ):
+            return jsonify({
+                "error": "Invalid prepayment_amount: must be a finite, non-negative number"
+            }), 400
+        
+        result = chatbot.calculate_prepayments(scenarios, summarize=summarize)
+        
+        return jsonify(result), 200
+    
+    except (ValueError, TypeError):
+        return jsonify({
+            "error": "Invalid prepayment_amount: must be a number"
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "error": "Internal server error",
+            "message": str(e)
+        }), 500
+
+
 @app.route('/customer/<customer_id>/summary', methods=['GET'])
 def get_customer_summary(customer_id):
     """
@@ -116,6 +258,41 @@ def get_customer_summary(customer_id):
         }), 500
 
 
+@app.route('/customers/summary', methods=['POST'])
+def get_customer_summaries():
+    """
+    Get account and loan summaries of many customers in one request.
+    
+    Request body:
+    {
+        "customer_ids": ["CUST001", "CUST002"]
+    }
+    
+    Unknown customers and failed lookups are reported per ID in "errors".
+    """
+    try:
+        data = request.get_json()
+        
+        customer_ids = data.get('customer_ids') if data else None
+        if not isinstance(customer_ids, list) or not all(isinstance(customer_id, str) for customer_id in customer_ids):
+            return jsonify({
+                "error": "Missing required field: customer_ids (list of strings)"
+            }), 400
+        
+        if len(customer_ids) > config.CUSTOMER_SUMMARY_BATCH_MAX:
+            return jsonify({
+                "error": f"Too many customer IDs: maximum is {config.CUSTOMER_SUMMARY_BATCH_MAX}"
+            }), 400
+        
+        return jsonify(chatbot.get_customer_summaries(customer_ids)), 200
+    
+    except Exception as e:
+        return jsonify({
+            "error": "Internal server error",
+            "message": str(e)
+        }), 500
+
+
 @app.route('/search/faqs', methods=['POST'])
 def search_faqs():
     """
@@ -188,6 +365,253 @@ def search_policies():
         }), 500
 
 
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    """
+    Search many queries in one request.
+    
+    Request body:
+    {
+        "queries": ["What is EMI?", "prepayment charges"],
+        "n_results": 3,
+        "collections": ["faqs", "policies"]
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('queries'), list):
+            return jsonify({
+                "error": "Missing required field: queries (list)"
+            }), 400
+        
+        queries = data['queries']
+        if len(queries) > config.SEARCH_BATCH_MAX_QUERIES:
+            return jsonify({
+                "error": f"Too many queries: maximum is {config.SEARCH_BATCH_MAX_QUERIES}"
+            }), 400
+        
+        if not all(isinstance(query, str) and query.strip() for query in queries):
+            return jsonify({
+                "error": "Invalid queries: every query must be a non-empty string"
+            }), 400
+        
+        n_results = data.get('n_results', 3)
+        if isinstance(n_results, bool) or not isinstance(n_results, int) or n_results < 1:
+            return jsonify({
+                "error": "Invalid n_results: must be a positive integer"
+            }), 400
+        collections = tuple(data.get('collections', ['faqs', 'policies']))
+        
+        results = chatbot.vector_db.search_many(queries, n_results, collections)
+        
+        return jsonify({
+            "results": [
+                dict(result, query=query) for query, result in zip(queries, results)
+            ]
+        }), 200
+    
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            "error": "Invalid request",
+            "message": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "error": "Internal server error",
+            "message": str(e)
+        }), 500
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Cache and performance counters."""
+    return jsonify(chatbot.get_metrics()), 200
+
+
+def _admin_error():
+    """
+    Check the X-Admin-Token header of an admin request.
+    
+    Admin endpoints are refused altogether unless ADMIN_API_TOKEN is set.
+    
+    Returns:
+        Error response, or None if the request is authorized
+    """
+    if not config.ADMIN_API_TOKEN:
+        return jsonify({
+            "error": "Admin endpoints are disabled; set ADMIN_API_TOKEN to enable them"
+        }), 403
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token.encode('utf-8'), config.ADMIN_API_TOKEN.encode('utf-8')):
+        return jsonify({
+            "error": "Unauthorized"
+        }), 401
+    return None
+
+
+def _corpus_dir_path(name) -> Optional[str]:
+    """
+    Resolve a corpus file named in a request to a path under CORPUS_DIR.
+    
+    Returns:
+        Absolute path, or None if CORPUS_DIR is not set or the name points
+        outside it
+    """
+    if not config.CORPUS_DIR or not isinstance(name, str) or not name:
+        return None
+    base = os.path.realpath(config.CORPUS_DIR)
+    path = os.path.realpath(os.path.join(base, name))
+    if path == base or os.path.commonpath([base, path]) != base:
+        return None
+    return path
+
+
+@app.route('/admin/corpus/reload', methods=['POST'])
+def reload_corpus():
+    """
+    Reload the FAQ/policy corpus from a JSON file and swap it in atomically.
+    
+    Loads CORPUS_FILE, or a file under CORPUS_DIR named by "path"; other
+    server paths are refused.
+    
+    Request body (optional):
+    {
+        "path": "corpus-2024-06.json"
+    }
+    """
+    denied = _admin_error()
+    if denied:
+        return denied
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        name = data.get('path', config.CORPUS_FILE)
+        if 'path' in data:
+            path = _corpus_dir_path(data['path'])
+            if path is None:
+                return jsonify({
+                    "error": "path must name a file under CORPUS_DIR"
+                }), 400
+        else:
+            path = config.CORPUS_FILE
+        
+        counts = chatbot.vector_db.load_corpus_file(path)
+        
+        return jsonify({
+            "success": True,
+            "documents": counts,
+            "corpus_version": chatbot.vector_db.corpus_version
+        }), 200
+    
+    except FileNotFoundError:
+        return jsonify({
+            "error": f"Corpus file not found: {name}"
+        }), 400
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({
+            "error": "Invalid corpus file",
+            "message": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "error": "Internal server error",
+            "message": str(e)
+        }), 500
+
+
+@app.route('/admin/documents', methods=['POST', 'DELETE'])
+def manage_documents():
+    """
+    Add (POST) or remove (DELETE) documents; the collection is rebuilt aside and swapped in.
+    
+    Request body (POST):
+    {
+        "collection": "policies",
+        "documents": [{"id": "policy-11", "title": "...", "section": "...", "content": "..."}]
+    }
+    
+    Request body (DELETE):
+    {
+        "collection": "policies",
+        "ids": ["policy-11"]
+    }
+    """
+    denied = _admin_error()
+    if denied:
+        return denied
+    
+    try:
+        data = request.get_json()
+        items_field = 'documents' if request.method == 'POST' else 'ids'
+        
+        if not data or 'collection' not in data or not isinstance(data.get(items_field), list):
+            return jsonify({
+                "error": f"Missing required fields: collection and {items_field}"
+            }), 400
+        
+        if request.method == 'POST':
+            ids = chatbot.vector_db.add_documents(data['collection'], data['documents'])
+            result = {"success": True, "added": ids}
+        else:
+            removed = chatbot.vector_db.remove_documents(data['collection'], data['ids'])
+            result = {"success": True, "removed": removed}
+        
+        result["corpus_version"] = chatbot.vector_db.corpus_version
+        return jsonify(result), 200
+    
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({
+            "error": "Invalid documents",
+            "message": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "error": "Internal server error",
+            "message": str(e)
+        }), 500
+
+
+@app.route('/admin/customers/invalidate', methods=['POST'])
+def invalidate_customers():
+    """
+    Drop cached customer data after balances or loans changed.
+    
+    Request body (optional; without customer_ids the whole cache is dropped):
+    {
+        "customer_ids": ["CUST001"]
+    }
+    """
+    denied = _admin_error()
+    if denied:
+        return denied
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        customer_ids = data.get('customer_ids')
+        
+        if customer_ids is None:
+            chatbot.bank_api.invalidate_all_customers()
+        elif isinstance(customer_ids, list):
+            for customer_id in customer_ids:
+                chatbot.bank_api.invalidate_customer(customer_id)
+        else:
+            return jsonify({
+                "error": "customer_ids must be a list"
+            }), 400
+        
+        return jsonify({
+            "success": True,
+            "invalidated": "all" if customer_ids is None else len(customer_ids)
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            "error": "Internal server error",
+            "message": str(e)
+        }), 500
+
+
 if __name__ == '__main__':
     print("Starting Banking Chatbot Service...")
     print(f"Server running on http://{config.FLASK_HOST}:{config.FLASK_PORT}")
@@ -0,0 +1,186 @@
+"""Asyncio-native (ASGI) entry point for the banking chatbot.
+
+Serves the conversational endpoints (/chat, /chat/stream) on an event loop,
+so a single process can keep many LLM calls in flight at once. The Flask app
+in app.py remains the entry point for the full API.
+
+Run with an ASGI server, e.g.:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+"""
+from typing import Dict, Tuple
+import json
+
+from chatbot_service import BankingChatbot, format_sse_event
+from response_templates import RESPONSE_MODES
+import config
+
+chatbot = BankingChatbot()
+
+
+async def health_check(data: Dict) -> Tuple[int, Dict]:
+    """Health check endpoint."""
+    return 200, {
+        "status": "healthy",
+        "service": "banking-chatbot"
+    }
+
+
+def _invalid_response_mode(data: Dict):
+    """Error response if the request names an unknown response_mode, else None."""
+    response_mode = data.get('response_mode')
+    if response_mode is not None and response_mode not in RESPONSE_MODES:
+        return 400, {
+            "error": f"Invalid response_mode: must be one of {', '.join(RESPONSE_MODES)}"
+        }
+    return None
+
+
+async def chat(data: Dict) -> Tuple[int, Dict]:
+    """
+    Main chat endpoint for natural language queries.
+
+    Request body:
+    {
+        "customer_id": "CUST001",
+        "query": "What's my current EMI and can I prepay this month?",
+        "response_mode": "auto"
+    }
+    """
+    if not data or 'customer_id' not in data or 'query' not in data:
+        return 400, {
+            "error": "Missing required fields: customer_id and query"
+        }
+    invalid = _invalid_response_mode(data)
+    if invalid:
+        return invalid
+
+    result = await chatbot.process_query_async(data['customer_id'], data['query'], data.get('response_mode'))
+    return 200, result
+
+
+async def chat_stream(data: Dict):
+    """
+    Chat endpoint streaming the answer as server-sent events.
+
+    Events: "metadata" (context used), "token" (text chunks), "done" (timings).
+    """
+    if not data or 'customer_id' not in data or 'query' not in data:
+        return 400, {
+            "error": "Missing required fields: customer_id and query"
+        }
+    invalid = _invalid_response_mode(data)
+    if invalid:
+        return invalid
+
+    async def events():
+        try:
+            async for event, payload in chatbot.process_query_stream_async(
+                data['customer_id'], data['query'], data.get('response_mode')
+            ):
+                yield format_sse_event(event, payload)
+        except Exception as e:
+            yield format_sse_event("error", {
+                "error": "Internal server error",
+                "message": str(e)
+            })
+
+    return 200, events()
+
+
+ROUTES = {
+    ("GET", "/health"): health_check,
+    ("POST", "/chat"): chat,
+    ("POST", "/chat/stream"): chat_stream,
+}
+
+
+async def _read_body(receive) -> bytes:
+    """Read the full request body."""
+    body = b""
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get("body", b"")
+        more_body = message.get("more_body", False)
+    return body
+
+
+async def _send_json(send, status: int, payload: Dict) -> None:
+    """Send a JSON response."""
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_stream(send, events) -> None:
+    """Send server-sent events as they are produced."""
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream"),
+            (b"cache-control", b"no-cache"),
+        ],
+    })
+    async for message in events:
+        await send({"type": "http.response.body", "body": message.encode("utf-8"), "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def app(scope, receive, send):
+    """ASGI application."""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    if scope["type"] != "http":
+        return
+
+    handler = ROUTES.get((scope["method"], scope["path"]))
+    if handler is None:
+        await _send_json(send, 404, {"error": "Not found"})
+        return
+
+    try:
+        body = await _read_body(receive)
+        data = json.loads(body) if body else None
+    except ValueError:
+        await _send_json(send, 400, {"error": "Invalid JSON body"})
+        return
+
+    try:
+        status, payload = await handler(data)
+    except Exception as e:
+        status, payload = 500, {
+            "error": "Internal server error",
+            "message": str(e)
+        }
+
+    if isinstance(payload, dict):
+        await _send_json(send, status, payload)
+    else:
+        await _send_stream(send, payload)
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn is required to run the async server: pip install uvicorn")
+
+    print("Starting Banking Chatbot async service...")
+    print(f"Server running on http://{config.FLASK_HOST}:{config.ASYNC_PORT}")
+    uvicorn.run(app, host=config.FLASK_HOST, port=config.ASYNC_PORT)
@@ -1,15 +1,222 @@
-"""Mock bank API client for account and loan details."""
-from typing import Dict, List, Optional
+"""Bank API client for account and loan details (mock data or HTTP)."""
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
+from urllib.parse import quote
+import asyncio
 import random
+import threading
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+import config
+from cache import LRUCache, SingleFlight
+from loan_math import prepayment_impact, prepayment_impacts
+from records import Customer, Loan, LoanBook
+from synthetic_data import load_customers
+
+BANK_API_MODES = ("mock", "http")
+
+
+class BankAPIError(Exception):
+    """The bank API could not be reached or returned an error."""
 
 
 class BankAPIClient:
     """Client for interacting with internal banking APIs."""
     
-    def __init__(self):
-        """Initialize the bank API client with mock data."""
-        self._mock_data = self._initialize_mock_data()
+    def __init__(self, mode: Optional[str] = None, base_url: Optional[str] = None):
+        """
+        Initialize the bank API client.
+        
+        Args:
+            mode: "mock" (in-process demo data) or "http" (bank API at
+                base_url), defaults to config.BANK_API_MODE
+            base_url: Bank API base URL, defaults to config.BANK_API_BASE_URL
+        """
+        self.mode = mode or config.BANK_API_MODE
+        if self.mode not in BANK_API_MODES:
+            raise ValueError(f"Unknown bank API mode '{self.mode}', expected one of {BANK_API_MODES}")
+        
+        self.base_url = (base_url or config.BANK_API_BASE_URL).rstrip("/")
+        self.timeout = (config.BANK_API_CONNECT_TIMEOUT, config.BANK_API_TIMEOUT)
+        # Mock mode serves customers from an indexed in-memory book
+        self.book = LoanBook(self._initialize_mock_data().values() if self.mode == "mock" else ())
+        self._session = self._create_session() if self.mode == "http" else None
+        
+        # Short-lived per-customer cache; concurrent misses for the same
+        # customer share one backend fetch
+        self.customer_cache = LRUCache(max_size=config.CUSTOMER_CACHE_SIZE, ttl_seconds=config.CUSTOMER_CACHE_TTL)
+        self._customer_fetches = SingleFlight()
+        self._invalidations = 0
+        self._invalidation_lock = threading.Lock()
+        
+        # Optional large customer book (e.g. from synthetic_data.py) for scale testing
+        if self.mode == "mock" and config.MOCK_CUSTOMERS_FILE:
+            load_customers(self, config.MOCK_CUSTOMERS_FILE)
+    
+    @staticmethod
+    def _create_session():
+        """
+        Create a pooled keep-alive HTTP session with retries.
+        
+        Connections to the bank API are reused across requests and threads
+        (up to BANK_API_POOL_SIZE per host). Idempotent requests that fail to
+        connect or get a 502/503/504 are retried with exponential backoff.
+        """
+        if not REQUESTS_AVAILABLE:
+            raise ImportError("requests is required for the HTTP bank API mode: pip install requests")
+        
+        retry = Retry(
+            total=config.BANK_API_RETRIES,
+            backoff_factor=config.BANK_API_RETRY_BACKOFF,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=config.BANK_API_POOL_SIZE,
+            pool_maxsize=config.BANK_API_POOL_SIZE,
+            max_retries=retry
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Accept": "application/json"})
+        return session
+    
+    def _get(self, path: str) -> Optional[Dict]:
+        """
+        GET a JSON resource from the bank API.
+        
+        Args:
+            path: Path below the base URL
+            
+        Returns:
+            Decoded JSON body, or None if the resource does not exist
+        """
+        try:
+            response = self._session.get(f"{self.base_url}{path}", timeout=self.timeout)
+        except requests.RequestException as e:
+            raise BankAPIError(f"Bank API request failed: {str(e)}") from e
+        
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise BankAPIError(f"Bank API returned HTTP {response.status_code} for {path}")
+        return response.json()
+    
+    def _post(self, path: str, payload: Dict) -> Dict:
+        """
+        POST a JSON request to the bank API.
+        
+        Args:
+            path: Path below the base URL
+            payload: JSON body
+            
+        Returns:
+            Decoded JSON body
+        """
+        try:
+            response = self._session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise BankAPIError(f"Bank API request failed: {str(e)}") from e
+        
+        if response.status_code != 200:
+            raise BankAPIError(f"Bank API returned HTTP {response.status_code} for {path}")
+        return response.json()
+    
+    def _fetch_customer(self, customer_id: str) -> Optional[Customer]:
+        """Fetch a customer record (account and loans) from the backend."""
+        if self.mode == "http":
+            data = self._get(f"/customers/{quote(customer_id, safe='')}")
+            return Customer.from_dict(data) if data else None
+        return self.book.get(customer_id)
+    
+    def _fetch_customers(self, customer_ids: List[str]) -> Dict[str, Optional[Customer]]:
+        """Fetch several customer records from the backend in bulk."""
+        if self.mode != "http":
+            return {customer_id: self.book.get(customer_id) for customer_id in customer_ids}
+        
+        fetched = {}
+        for start in range(0, len(customer_ids), config.BANK_API_BATCH_SIZE):
+            chunk = customer_ids[start:start + config.BANK_API_BATCH_SIZE]
+            customers = self._post("/customers/batch", {"customer_ids": chunk}).get("customers", {})
+            for customer_id in chunk:
+                data = customers.get(customer_id)
+                fetched[customer_id] = Customer.from_dict(data) if data else None
+        return fetched
+    
+    def _cache_fetched(self, customer_id: str, fetched: Tuple[int, Optional[Customer]]) -> Optional[Customer]:
+        """
+        Cache a customer fetched through the coalesced fetches.
+        
+        Args:
+            customer_id: Unique customer identifier
+            fetched: Invalidation count read by the fetching call before it
+                went to the backend, and the record it got
+        
+        Returns:
+            The fetched customer record
+        """
+        invalidations, customer = fetched
+        # Data fetched before an invalidation may be stale: don't cache it
+        if customer is not None and invalidations == self._invalidations:
+            self.customer_cache.set(customer_id, customer)
+        return customer
+    
+    def _get_customer(self, customer_id: str) -> Optional[Customer]:
+        """Get a customer record through the customer cache."""
+        customer = self.customer_cache.get(customer_id)
+        if customer is not None:
+            return customer
+        
+        # The counter is read by the call that actually fetches, so callers
+        # sharing its result check against the same snapshot
+        fetched = self._customer_fetches.do(
+            customer_id, lambda: (self._invalidations, self._fetch_customer(customer_id))
+        )
+        return self._cache_fetched(customer_id, fetched)
+    
+    def invalidate_customer(self, customer_id: str) -> None:
+        """
+        Drop a customer's cached data, e.g. after a payment or loan change.
+        
+        Args:
+            customer_id: Unique customer identifier
+        """
+        with self._invalidation_lock:
+            self._invalidations += 1
+        self.customer_cache.invalidate(customer_id)
+    
+    def invalidate_all_customers(self) -> None:
+        """Drop all cached customer data."""
+        with self._invalidation_lock:
+            self._invalidations += 1
+        self.customer_cache.clear()
+    
+    def cache_stats(self) -> Dict:
+        """
+        Report customer cache usage.
+        
+        Returns:
+            Cache counters plus the number of backend fetches shared by concurrent misses
+        """
+        return dict(self.customer_cache.stats(), coalesced_fetches=self._customer_fetches.deduplicated)
+    
+    def close(self):
+        """Close pooled connections."""
+        if self._session is not None:
+            self._session.close()
     
     def _initialize_mock_data(self) -> Dict:
         """Initialize mock customer data for demonstration."""
@@ -100,7 +307,7 @@ class BankAPIClient:
         Returns:
             Dictionary containing account details or None if not found
         """
-        customer = self._mock_data.get(customer_id)
+        customer = self._get_customer(customer_id)
         if not customer:
             return None
         
@@ -111,10 +318,13 @@ class BankAPIClient:
             "account_balance": customer["account_balance"]
         }
     
-    def get_loan_details(self, customer_id: str, loan_id: Optional[str] = None) -> Optional[List[Dict]]:
+    def get_loan_details(self, customer_id: str, loan_id: Optional[str] = None) -> Optional[List[Loan]]:
         """
         Retrieve loan details for a customer.
         
+        In mock mode a specific loan is looked up in the book's loan index
+        without scanning the customer's loans.
+        
         Args:
             customer_id: Unique customer identifier
             loan_id: Optional specific loan ID to retrieve
@@ -122,18 +332,21 @@ class BankAPIClient:
         Returns:
             List of loan details or None if customer not found
         """
-        customer = self._mock_data.get(customer_id)
+        if loan_id and self.mode == "mock":
+            loan = self.book.get_loan(loan_id)
+            return [loan] if loan is not None and loan.customer_id == customer_id else None
+        
+        customer = self._get_customer(customer_id)
         if not customer:
             return None
         
-        loans = customer.get("loans", [])
-        
         if loan_id:
-            loans = [loan for loan in loans if loan["loan_id"] == loan_id]
+            loan = customer.find_loan(loan_id)
+            return [loan] if loan is not None else None
         
-        return loans if loans else None
+        return list(customer.loans) or None
     
-    def get_all_customer_data(self, customer_id: str) -> Optional[Dict]:
+    def get_all_customer_data(self, customer_id: str) -> Optional[Customer]:
         """
         Retrieve all data for a customer (account + loans).
         
@@ -141,9 +354,62 @@ class BankAPIClient:
             customer_id: Unique customer identifier
             
         Returns:
-            Dictionary containing all customer data or None if not found
+            Customer record (a read-only dict view) or None if not found
         """
-        return self._mock_data.get(customer_id)
+        return self._get_customer(customer_id)
+    
+    def get_many_customer_data(self, customer_ids: List[str]) -> Dict[str, Optional[Customer]]:
+        """
+        Retrieve all data for several customers in bulk.
+        
+        Cached customers are served from the customer cache. In HTTP mode the
+        other IDs are sent to POST /customers/batch, in chunks of
+        BANK_API_BATCH_SIZE, so N customers cost one round trip per chunk
+        instead of N. IDs another request is already fetching wait for that
+        fetch instead of being fetched again, and like single lookups, records
+        fetched across an invalidation are returned but not cached.
+        
+        Args:
+            customer_ids: Unique customer identifiers
+            
+        Returns:
+            Dictionary mapping each requested ID to its data, or None if not found
+        """
+        results = {}
+        missing = []
+        for customer_id in dict.fromkeys(customer_ids):
+            results[customer_id] = self.customer_cache.get(customer_id)
+            if results[customer_id] is None:
+                missing.append(customer_id)
+        
+        def fetch(customer_ids: List[str]) -> Dict[str, Tuple[int, Optional[Customer]]]:
+            invalidations = self._invalidations
+            return {
+                customer_id: (invalidations, customer)
+                for customer_id, customer in self._fetch_customers(customer_ids).items()
+            }
+        
+        # IDs already being fetched by another call share its result; the
+        # rest are fetched in one bulk request
+        for customer_id, fetched in self._customer_fetches.do_many(missing, fetch).items():
+            results[customer_id] = self._cache_fetched(customer_id, fetched)
+        return results
+    
+    async def get_all_customer_data_async(self, customer_id: str) -> Optional[Customer]:
+        """
+        Retrieve all data for a customer without blocking the event loop.
+        
+        Args:
+            customer_id: Unique customer identifier
+            
+        Returns:
+            Customer record or None if not found
+        """
+        if self.mode == "http":
+            # The pooled session is thread-safe for requests; run it off the loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.get_all_customer_data, customer_id)
+        return self.get_all_customer_data(customer_id)
     
     def calculate_prepayment_amount(self, customer_id: str, loan_id: str, prepayment_amount: float) -> Optional[Dict]:
         """
@@ -161,8 +427,115 @@ class BankAPIClient:
         if not loans:
             return None
         
-        loan = loans[0]
+        return self.calculate_loan_prepayment(loans[0], prepayment_amount)
+    
+    def calculate_prepayment_amounts(self, scenarios: Sequence[Tuple[str, str, float]]) -> List[Optional[Dict]]:
+        """
+        Calculate many prepayment scenarios at once.
+        
+        The customers involved are fetched with one bulk lookup and all
+        scenarios are computed in one vectorized pass.
         
+        Args:
+            scenarios: (customer_id, loan_id, prepayment_amount) triples
+            
+        Returns:
+            One prepayment calculation per scenario, in order, or None where
+            the customer or loan was not found
+        """
+        customers = self.get_many_customer_data([customer_id for customer_id, _, _ in scenarios])
+        
+        found = []
+        for index, (customer_id, loan_id, prepayment_amount) in enumerate(scenarios):
+            customer = customers.get(customer_id)
+            loan = customer.find_loan(loan_id) if customer else None
+            if loan is not None:
+                found.append((index, loan, prepayment_amount))
+        
+        results: List[Optional[Dict]] = [None] * len(scenarios)
+        calculations = self.calculate_loan_prepayments(
+            [loan for _, loan, _ in found],
+            [prepayment_amount for _, _, prepayment_amount in found]
+        )
+        for (index, _, _), calculation in zip(found, calculations):
+            results[index] = calculation
+        return results
+    
+    @staticmethod
+    def calculate_loan_prepayments(loans: Sequence[Dict], prepayment_amounts: Sequence[float]) -> List[Dict]:
+        """
+        Calculate prepayment details for many (loan, amount) pairs.
+        
+        Charges, totals, new outstanding amounts and the impact on interest
+        and tenure (loan_math.prepayment_impacts) are computed as NumPy array
+        operations over all pairs; without NumPy each pair goes through
+        calculate_loan_prepayment. Results match calculate_loan_prepayment.
+        
+        Args:
+            loans: Loan details, one per pair
+            prepayment_amounts: Amounts to prepay, one per pair
+            
+        Returns:
+            One prepayment calculation per pair, in order
+        """
+        if len(loans) != len(prepayment_amounts):
+            raise ValueError("loans and prepayment_amounts must have the same length")
+        if not NUMPY_AVAILABLE:
+            return [
+                BankAPIClient.calculate_loan_prepayment(loan, prepayment_amount)
+                for loan, prepayment_amount in zip(loans, prepayment_amounts)
+            ]
+        
+        count = len(loans)
+        
+        def column(field: str) -> "np.ndarray":
+            return np.fromiter((loan[field] for loan in loans), dtype=np.float64, count=count)
+        
+        amounts = np.asarray(prepayment_amounts, dtype=np.float64)
+        charge_percentages = column("prepayment_charges")
+        outstanding = column("outstanding_amount")
+        
+        charges = (amounts * charge_percentages) / 100
+        totals = amounts + charges
+        new_outstanding = np.maximum(0, outstanding - amounts)
+        impacts = prepayment_impacts(outstanding, column("interest_rate"), column("emi_amount"), amounts)
+        
+        results = []
+        for loan, amount, charge, total, current, remaining, impact in zip(
+            loans, amounts.tolist(), charges.tolist(), totals.tolist(),
+            outstanding.tolist(), new_outstanding.tolist(), impacts
+        ):
+            if not loan["prepayment_allowed"]:
+                results.append({
+                    "allowed": False,
+                    "message": "Prepayment not allowed for this loan"
+                })
+                continue
+            results.append({
+                "allowed": True,
+                "prepayment_amount": amount,
+                "prepayment_charge": charge,
+                "prepayment_charge_percentage": loan["prepayment_charges"],
+                "total_amount_to_pay": total,
+                "current_outstanding": current,
+                "new_outstanding": remaining,
+                "loan_type": loan["loan_type"],
+                "impact": impact
+            })
+        return results
+    
+    @staticmethod
+    def calculate_loan_prepayment(loan: Dict, prepayment_amount: float) -> Dict:
+        """
+        Calculate prepayment details for an already fetched loan.
+        
+        Args:
+            loan: Loan details
+            prepayment_amount: Amount to prepay
+            
+        Returns:
+            Dictionary with prepayment calculation
+        """
         if not loan["prepayment_allowed"]:
             return {
                 "allowed": False,
@@ -181,5 +554,16 @@ class BankAPIClient:
             "total_amount_to_pay": total_amount,
             "current_outstanding": loan["outstanding_amount"],
             "new_outstanding": max(0, new_outstanding),
-            "loan_type": loan["loan_type"]
+            "loan_type": loan["loan_type"],
+            "impact": BankAPIClient._prepayment_impact(loan, prepayment_amount)
         }
+    
+    @staticmethod
+    def _prepayment_impact(loan: Dict, prepayment_amount: float) -> Optional[Dict]:
+        """Interest and tenure impact of a prepayment, or None if the loan's terms don't amortize."""
+        try:
+            return prepayment_impact(
+                loan["outstanding_amount"], loan["interest_rate"], loan["emi_amount"], prepayment_amount
+            )
+        except ValueError:
+            return None
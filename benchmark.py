@@ -0,0 +1,314 @@
+"""Benchmarks for retrieval, prompt building and end-to-end query processing.
+
+Runs each benchmark against synthetic corpora and customer books of the given
+sizes (see synthetic_data.py) and reports p50/p95/p99 latency, single-thread
+throughput and peak memory allocated per call. Results can be saved as JSON
+and compared with an earlier run to flag regressions.
+
+Usage:
+
+    python benchmark.py --corpus-sizes 1000,20000 --customers 10000,1000000 --output results.json
+    python benchmark.py --compare results.json           # exits with 1 on regressions
+
+The LLM is always replaced by the demo responses, so process_query measures
+the service's own overhead (classification, bank data, retrieval, prompt)
+without network calls.
+"""
+from typing import Callable, Dict, List, Optional
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+BENCHMARKS = (
+    "search_faqs", "search_policies", "search_all", "create_query_prompt",
+    "validate_query_scope", "calculate_prepayment_amount", "process_query"
+)
+
+QUERIES = (
+    "What is EMI?",
+    "How is EMI calculated?",
+    "What are the prepayment charges on a home loan?",
+    "Can I prepay my personal loan?",
+    "What's my current EMI and can I prepay this month?",
+    "When is my next EMI due?",
+    "What is my outstanding loan amount?",
+    "What happens if I miss an EMI payment?",
+    "How do I close my car loan early?",
+    "Can I change the tenure of my education loan?",
+    "How much do I save by prepaying my home loan?",
+    "What is the interest rate on a gold loan?"
+)
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """Percentile of sorted values, linearly interpolated."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def measure(fn: Callable[[], object], iterations: int, warmup: int = 10, memory_iterations: int = 20) -> Dict:
+    """
+    Measure a benchmark function.
+
+    Latency and throughput are measured without tracing; peak memory is
+    measured in a separate, shorter pass under tracemalloc (which slows
+    calls down).
+
+    Args:
+        fn: Function running one call (its inputs chosen inside)
+        iterations: Timed calls
+        warmup: Untimed calls before timing
+        memory_iterations: Calls traced for peak memory
+
+    Returns:
+        Dictionary with latency percentiles (ms), throughput (calls/s) and
+        peak memory allocated by a single call (KB)
+    """
+    for _ in range(warmup):
+        fn()
+
+    gc.collect()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in range(memory_iterations):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 4),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 4),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 4),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 4),
+        "max_ms": round(latencies[-1] * 1000, 4),
+        "throughput_per_s": round(iterations / elapsed, 2) if elapsed else 0.0,
+        "peak_memory_kb": round(peak / 1024, 2)
+    }
+
+
+def _setup(corpus_size: int, customers: int, seed: int) -> Dict:
+    """
+    Build the services for one corpus size and customer book size.
+
+    Returns:
+        Dictionary with the services, customer IDs and the memory and time
+        taken to load the data
+    """
+    from bank_api_client import BankAPIClient
+    from chatbot_service import BankingChatbot
+    from synthetic_data import generate_customers, generate_faqs, generate_policies, load_corpus
+
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    chatbot = BankingChatbot()
+    chatbot.llm.client = None
+    chatbot.llm.async_client = None
+
+    # Measure searching, not the retrieval cache
+    chatbot.vector_db.cache.max_size = 0
+    load_corpus(chatbot.vector_db, generate_faqs(corpus_size // 2, seed), generate_policies(corpus_size - corpus_size // 2, seed))
+
+    bank_api = BankAPIClient(mode="mock")
+    for customer in generate_customers(customers, seed):
+        bank_api.book.add(customer)
+    chatbot.bank_api = bank_api
+
+    load_seconds = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return {
+        "chatbot": chatbot,
+        "customer_ids": list(bank_api.book.customers),
+        "setup": {"load_seconds": round(load_seconds, 3), "data_memory_mb": round(memory / 1024 / 1024, 2)}
+    }
+
+
+def _benchmark_functions(services: Dict, rng: random.Random) -> Dict[str, Callable[[], object]]:
+    """One zero-argument function per benchmark, drawing random inputs."""
+    from prompts import create_query_prompt
+
+    chatbot = services["chatbot"]
+    customer_ids = services["customer_ids"]
+    vector_db, bank_api, llm = chatbot.vector_db, chatbot.bank_api, chatbot.llm
+    contexts = [vector_db.search_all(query, per_collection=3) for query in QUERIES]
+
+    def calculate_prepayment_amount():
+        customer = bank_api.book.get(rng.choice(customer_ids))
+        loan = customer.loans[0]
+        return bank_api.calculate_prepayment_amount(
+            customer.customer_id, loan.loan_id, round(rng.uniform(10_000, 500_000), -3)
+        )
+
+    return {
+        "search_faqs": lambda: vector_db.search_faqs(rng.choice(QUERIES)),
+        "search_policies": lambda: vector_db.search_policies(rng.choice(QUERIES)),
+        "search_all": lambda: vector_db.search_all(rng.choice(QUERIES)),
+        "create_query_prompt": lambda: create_query_prompt(
+            rng.choice(QUERIES), bank_api.book.get(rng.choice(customer_ids)), rng.choice(contexts)
+        ),
+        "validate_query_scope": lambda: llm.validate_query_scope(rng.choice(QUERIES)),
+        "calculate_prepayment_amount": calculate_prepayment_amount,
+        "process_query": lambda: chatbot.process_query(rng.choice(customer_ids), rng.choice(QUERIES))
+    }
+
+
+def run(corpus_sizes: List[int], customer_counts: List[int], iterations: int, seed: int = 0,
+        benchmarks: Optional[List[str]] = None) -> Dict:
+    """
+    Run the benchmarks for every combination of corpus and customer book size.
+
+    Args:
+        corpus_sizes: Total FAQ and policy chunks per run
+        customer_counts: Customers in the bank book per run
+        iterations: Timed calls per benchmark
+        seed: Seed of the synthetic data and of the inputs
+        benchmarks: Names of the benchmarks to run (default: all)
+
+    Returns:
+        Report with run metadata and one result per benchmark and size
+    """
+    results = []
+    for corpus_size in corpus_sizes:
+        for customers in customer_counts:
+            services = _setup(corpus_size, customers, seed)
+            print(f"corpus={corpus_size} customers={customers}: data loaded in "
+                  f"{services['setup']['load_seconds']}s, {services['setup']['data_memory_mb']} MB", file=sys.stderr)
+
+            functions = _benchmark_functions(services, random.Random(seed))
+            for name in benchmarks or BENCHMARKS:
+                result = measure(functions[name], iterations)
+                results.append(dict(
+                    {"benchmark": name, "corpus_size": corpus_size, "customers": customers},
+                    **result, **services["setup"]
+                ))
+                print(f"  {name}: p50 {result['p50_ms']}ms, p99 {result['p99_ms']}ms, "
+                      f"{result['throughput_per_s']}/s", file=sys.stderr)
+
+            services["chatbot"].executor.shutdown(wait=False)
+            del services
+            gc.collect()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "iterations": iterations
+        },
+        "results": results
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.2) -> List[Dict]:
+    """
+    Compare a report with a baseline report.
+
+    A result regresses if its p50 or p95 latency, or its peak memory, is
+    more than `threshold` (relative) above the baseline's.
+
+    Args:
+        current: Report of this run
+        baseline: Earlier report
+        threshold: Allowed relative increase
+
+    Returns:
+        One entry per regressed metric
+    """
+    def key(result: Dict) -> tuple:
+        return result["benchmark"], result["corpus_size"], result["customers"]
+
+    baseline_results = {key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        previous = baseline_results.get(key(result))
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "peak_memory_kb"):
+            if previous[metric] and result[metric] > previous[metric] * (1 + threshold):
+                regressions.append({
+                    "benchmark": result["benchmark"],
+                    "corpus_size": result["corpus_size"],
+                    "customers": result["customers"],
+                    "metric": metric,
+                    "baseline": previous[metric],
+                    "current": result[metric],
+                    "change": round(result[metric] / previous[metric] - 1, 4)
+                })
+    return regressions
+
+
+def _sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(",") if size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval, prompt building and query processing.")
+    parser.add_argument("--corpus-sizes", type=_sizes, default=[1000, 20000],
+                        help="comma-separated FAQ + policy chunk counts (default: 1000,20000)")
+    parser.add_argument("--customers", type=_sizes, default=[10000],
+                        help="comma-separated customer book sizes (default: 10000)")
+    parser.add_argument("--iterations", type=int, default=500, help="timed calls per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", type=lambda value: value.split(","), default=None,
+                        help=f"comma-separated benchmarks to run ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--output", help="write the report to this JSON file")
+    parser.add_argument("--compare", help="baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative increase counted as a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    unknown = set(args.only or ()) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    report = run(args.corpus_sizes, args.customers, args.iterations, args.seed, args.only)
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        regressions = compare(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression['benchmark']} corpus={regression['corpus_size']} "
+                  f"customers={regression['customers']} {regression['metric']}: "
+                  f"{regression['baseline']} -> {regression['current']} ({regression['change']:+.0%})",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare} (threshold {args.threshold:.0%})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
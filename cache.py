@@ -0,0 +1,373 @@
+"""In-process caching utilities shared by the chatbot services."""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+import asyncio
+import json
+import os
+import threading
+import time
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with optional TTL.
+
+    Entries older than `ttl_seconds` are treated as misses and dropped on
+    access. When the cache is full, the least recently used entry is evicted.
+    Hit, miss and eviction counters are kept for monitoring.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries (0 disables caching)
+            ttl_seconds: Time to live of an entry in seconds, or None for no expiry
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Look up a value, refreshing its recency.
+
+        Args:
+            key: Cache key
+            default: Value returned on a miss
+
+        Returns:
+            Cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry if full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        if self.max_size <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._store(key, value, expires_at)
+
+    def _store(self, key: Hashable, value: Any, expires_at: Optional[float]) -> None:
+        """Store a value with an explicit monotonic expiry time (None never expires)."""
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache usage.
+
+        Returns:
+            Dictionary with size, limits and hit/miss counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def _as_key(value: Any) -> Any:
+    """Convert JSON lists back into (nested) tuples so they can be used as keys."""
+    if isinstance(value, list):
+        return tuple(_as_key(item) for item in value)
+    return value
+
+
+class PersistentLRUCache(LRUCache):
+    """LRUCache whose entries are also appended to a JSON-lines file.
+
+    Keys must be tuples of JSON-serializable values and values must be
+    JSON-serializable. Each line records the entry's wall-clock expiry, so
+    restored entries keep their original expiry and expired ones are
+    skipped. On startup the file is replayed (latest entry wins); it is
+    rewritten with only the live entries at startup when it has grown well
+    beyond the number of entries, and while running whenever it passes
+    twice the cache size.
+    """
+
+    def __init__(self, path: str, max_size: int = 1024, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the cache and load persisted entries.
+
+        Args:
+            path: JSON-lines file used for persistence
+            max_size: Maximum number of entries (0 disables caching)
+            ttl_seconds: Time to live of an entry in seconds, or None for no expiry
+        """
+        super().__init__(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.path = path
+        self._file_lock = threading.Lock()
+        self._file_lines = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Replay the persistence file into memory."""
+        if not os.path.exists(self.path):
+            return
+
+        lines = 0
+        now, wall_now = time.monotonic(), time.time()
+        with open(self.path) as handle:
+            for line in handle:
+                lines += 1
+                try:
+                    record = json.loads(line)
+                    key = _as_key(record["key"])
+                    expires_at = record.get("expires_at")
+                    if expires_at is None:
+                        self._store(key, record["value"], None)
+                    elif expires_at > wall_now:
+                        self._store(key, record["value"], now + expires_at - wall_now)
+                    else:
+                        self.invalidate(key)
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+        self._file_lines = lines
+        if lines > 2 * max(len(self), 1):
+            with self._file_lock:
+                self._compact()
+
+    @staticmethod
+    def _line(key: tuple, value: Any, expires_at: Optional[float]) -> str:
+        """Persistence file line of an entry, with its monotonic expiry as wall-clock time."""
+        wall_expiry = time.time() + expires_at - time.monotonic() if expires_at is not None else None
+        return json.dumps({"key": list(key), "value": value, "expires_at": wall_expiry}) + "\n"
+
+    def _compact(self) -> None:
+        """Rewrite the persistence file with only the live entries (caller holds the file lock)."""
+        now = time.monotonic()
+        with self._lock:
+            records = [
+                (key, value, expires_at) for key, (value, expires_at) in self._entries.items()
+                if expires_at is None or expires_at > now
+            ]
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as handle:
+            for record in records:
+                handle.write(self._line(*record))
+        os.replace(temp_path, self.path)
+        self._file_lines = len(records)
+
+    def set(self, key: tuple, value: Any) -> None:
+        """Store a value in memory and append it to the persistence file."""
+        if self.max_size <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._store(key, value, expires_at)
+        line = self._line(key, value, expires_at)
+        with self._file_lock:
+            with open(self.path, "a") as handle:
+                handle.write(line)
+            self._file_lines += 1
+            # Entries are appended for every set; rewrite once most lines are stale
+            if self._file_lines > 2 * self.max_size:
+                self._compact()
+
+
+class _Call:
+    """An in-flight call shared by SingleFlight callers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result (or exception).
+    Nothing is kept once the call finishes, so this is not a cache.
+    """
+
+    def __init__(self):
+        """Initialize the call registry and counters."""
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, "asyncio.Task"] = {}
+        self.executions = 0
+        self.deduplicated = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn, or wait for the in-flight call with the same key.
+
+        Args:
+            key: Identity of the call
+            fn: Function producing the result
+
+        Returns:
+            Result of the shared call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def do_many(self, keys: Iterable[Hashable], fn: Callable[[List[Hashable]], Dict[Hashable, Any]]) -> Dict[Hashable, Any]:
+        """
+        Run fn once for the keys not in flight, and wait for the others.
+
+        The caller leads the calls for the keys nobody else is running and
+        passes them to fn in one batch; keys already in flight (through do()
+        or another do_many()) are shared with their leaders.
+
+        Args:
+            keys: Identities of the calls
+            fn: Function mapping the keys it is given to their results (a key
+                it leaves out gets None)
+
+        Returns:
+            Dictionary mapping each key to the result of its shared call
+        """
+        leading: Dict[Hashable, _Call] = {}
+        following: Dict[Hashable, _Call] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                call = self._calls.get(key)
+                if call is None:
+                    call = leading[key] = self._calls[key] = _Call()
+                else:
+                    following[key] = call
+                    self.deduplicated += 1
+            if leading:
+                self.executions += 1
+
+        results = {}
+        if leading:
+            try:
+                fetched = fn(list(leading))
+                for key, call in leading.items():
+                    call.result = results[key] = fetched.get(key)
+            except BaseException as e:
+                for call in leading.values():
+                    call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in leading:
+                        del self._calls[key]
+                for call in leading.values():
+                    call.done.set()
+
+        for key, call in following.items():
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            results[key] = call.result
+        return results
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await fn(), or the in-flight call with the same key.
+
+        The shared call runs as its own task, so a cancelled caller does not
+        cancel it for the others.
+
+        Args:
+            key: Identity of the call
+            fn: Coroutine function producing the result
+
+        Returns:
+            Result of the shared call
+        """
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(fn())
+                self._tasks[key] = task
+                task.add_done_callback(lambda _: self._forget_task(key, task))
+                self.executions += 1
+            else:
+                self.deduplicated += 1
+
+        return await asyncio.shield(task)
+
+    def _forget_task(self, key: Hashable, task: "asyncio.Task") -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report coalescing counters.
+
+        Returns:
+            Dictionary with in-flight, executed and deduplicated call counts
+        """
+        calls = self.executions + self.deduplicated
+        return {
+            "in_flight": len(self._calls) + len(self._tasks),
+            "executions": self.executions,
+            "deduplicated": self.deduplicated,
+            "dedup_rate": round(self.deduplicated / calls, 4) if calls else 0.0
+        }
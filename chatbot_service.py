@@ -1,9 +1,33 @@
 """Main chatbot service that orchestrates LLM, RAG, and bank APIs."""
-from typing import Dict, Optional
-from bank_api_client import BankAPIClient
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import math
+import re
+import time
+from bank_api_client import BankAPIClient, BankAPIError
 from vector_db_service import VectorDBService
+from query_pipeline import QueryPipeline, StageStats, StageTimeoutError
 from llm_service import LLMService
-from prompts import create_query_prompt, create_prepayment_calculation_prompt, FALLBACK_RESPONSES
+from response_templates import RESPONSE_MODES, render_intents, render_prepayment
+from prompts import (
+    build_query_prompt, create_prepayment_calculation_prompt, create_prepayment_batch_summary_prompt,
+    FALLBACK_RESPONSES
+)
+import config
+
+
+# Words showing that a query is about the customer's own accounts
+PERSONAL_REFERENCE_PATTERN = re.compile(
+    r"\b(?:i|i'm|i've|im|me|my|mine|our|ours|we|us)\b"
+    r"|\b(?:balance|outstanding|due|remaining|next emi|my loan|account number)\b"
+)
+
+
+def format_sse_event(event: str, data: Dict) -> str:
+    """Format an event as a server-sent events (SSE) message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 class BankingChatbot:
@@ -19,70 +43,336 @@ class BankingChatbot:
         self.bank_api = BankAPIClient()
         self.vector_db = VectorDBService()
         self.llm = LLMService()
+        self.stage_stats = StageStats()
+        # Shared, bounded pool running the independent stages of all requests
+        self.executor = ThreadPoolExecutor(max_workers=config.PIPELINE_WORKERS, thread_name_prefix="pipeline")
+        self.stage_timeouts = {
+            "customer": config.CUSTOMER_STAGE_TIMEOUT,
+            "retrieval": config.RETRIEVAL_STAGE_TIMEOUT
+        }
     
-    def process_query(self, customer_id: str, query: str) -> Dict:
+    def _new_pipeline(self, customer_id: str, query: str, response_mode: Optional[str] = None) -> QueryPipeline:
+        """Create the pipeline of one query."""
+        return QueryPipeline(
+            self, customer_id, query, executor=self.executor, timeouts=self.stage_timeouts,
+            response_mode=self._response_mode(response_mode)
+        )
+    
+    @staticmethod
+    def _response_mode(response_mode: Optional[str]) -> str:
+        """Resolve the requested response mode, defaulting to config.RESPONSE_MODE."""
+        response_mode = response_mode or config.RESPONSE_MODE
+        if response_mode not in RESPONSE_MODES:
+            raise ValueError(f"Unknown response mode '{response_mode}', expected one of {RESPONSE_MODES}")
+        return response_mode
+    
+    @staticmethod
+    def _use_template(scope: Dict, customer_independent: bool, response_mode: str) -> bool:
+        """
+        Check if a chat query is answered from templates instead of the LLM.
+        
+        Only questions naming the customer's own EMIs or balances (as whole
+        words) qualify. In "auto" mode the query must also be a pure lookup,
+        so mixed questions ("I missed my EMI, what is the penalty?") go to
+        the LLM; "template" mode answers the EMI/balance part of any query.
+        """
+        if response_mode == "llm" or customer_independent:
+            return False
+        if response_mode == "auto" and not scope.get("pure_lookup"):
+            return False
+        intents = scope.get("lookup_intents", ())
+        return bool(intents) and all(intent in config.TEMPLATE_INTENTS for intent in intents)
+    
+    def process_query(self, customer_id: str, query: str, response_mode: Optional[str] = None) -> Dict:
         """
         Process a user query with full orchestration.
         
         Args:
             customer_id: Customer identifier
             query: Natural language query from user
+            response_mode: "template", "llm" or "auto" (defaults to config.RESPONSE_MODE)
             
         Returns:
             Dictionary with response and metadata
         """
-        # Step 1: Validate query scope
-        validation = self.llm.validate_query_scope(query)
-        if not validation.get("in_scope", True):
-            return {
-                "response": validation.get("message", FALLBACK_RESPONSES["out_of_scope"]),
-                "success": False,
-                "reason": validation.get("reason")
-            }
+        pipeline = self._new_pipeline(customer_id, query, response_mode)
+        try:
+            result = self._prepare_query(pipeline)
+            if result is not None:
+                return result
+            
+            # Generate response using LLM
+            prompt, cache_key = pipeline.prompt, pipeline.cache_key
+            response = pipeline.generate(lambda: self.llm.generate_response(prompt, cache_key=cache_key))
+            
+            return self._answer_response(customer_id, query, response, pipeline.retrieved_context, pipeline.prompt_details)
+        finally:
+            pipeline.cancel_pending()
+            self.stage_stats.record(pipeline)
+    
+    def _prepare_query(self, pipeline: QueryPipeline) -> Optional[Dict]:
+        """
+        Run the stages before LLM generation.
         
-        # Step 2: Retrieve customer data from bank API
-        customer_data = self.bank_api.get_all_customer_data(customer_id)
+        Stages are evaluated lazily: retrieval and prompt building only run
+        when the query actually needs an LLM answer.
+        
+        Args:
+            pipeline: Pipeline of the current query
+            
+        Returns:
+            Final result if no LLM call is needed, else None (the prompt is
+            then available from the pipeline)
+        """
+        # Scope check
+        if not pipeline.scope.get("in_scope", True):
+            return self._out_of_scope_response(pipeline.scope)
+        
+        # Customer data and retrieval are independent: fetch them concurrently.
+        # Prepayment calculations and templated answers need neither retrieval nor the LLM.
+        prepayment = pipeline.intent["prepayment_calculation"]
+        template = pipeline.intent["template"]
+        pipeline.fan_out(retrieval=not (prepayment or template))
+        
+        try:
+            customer_data = pipeline.customer_data
+        except StageTimeoutError:
+            return self._stage_timeout_response("customer")
         if not customer_data:
-            return {
-                "response": FALLBACK_RESPONSES["no_customer_data"],
-                "success": False,
-                "reason": "customer_not_found"
-            }
+            return self._customer_not_found_response()
+        
+        if prepayment:
+            return self._handle_prepayment_query(pipeline.customer_id, pipeline.query, customer_data)
+        if template:
+            return self._template_response(pipeline, customer_data)
         
-        # Step 3: Retrieve relevant context from vector DB (RAG)
-        retrieved_context = self.vector_db.search_all(query, n_results=6)
+        # Retrieval (RAG) and prompt building complete when the prompt is first used
+        return None
+    
+    async def _prepare_query_async(self, pipeline: QueryPipeline) -> Optional[Dict]:
+        """Async counterpart of _prepare_query."""
+        if not pipeline.scope.get("in_scope", True):
+            return self._out_of_scope_response(pipeline.scope)
+        
+        prepayment = pipeline.intent["prepayment_calculation"]
+        template = pipeline.intent["template"]
+        pipeline.fan_out_async(retrieval=not (prepayment or template))
+        
+        try:
+            customer_data = await pipeline.customer_data_async()
+        except StageTimeoutError:
+            return self._stage_timeout_response("customer")
+        if not customer_data:
+            return self._customer_not_found_response()
         
-        # Step 4: Check if this is a prepayment calculation request
-        if self._is_prepayment_calculation_query(query):
-            return self._handle_prepayment_query(customer_id, query, customer_data)
+        if prepayment:
+            return self._handle_prepayment_query(pipeline.customer_id, pipeline.query, customer_data)
+        if template:
+            return self._template_response(pipeline, customer_data)
         
-        # Step 5: Create structured prompt with all context
-        prompt = create_query_prompt(query, customer_data, retrieved_context)
+        await pipeline.retrieved_context_async()
+        return None
+    
+    def _build_prompt(self, query: str, customer_data: Dict, retrieved_context: Dict,
+                      corpus_hash: str, customer_independent: bool) -> Tuple[str, Optional[tuple], Dict]:
+        """
+        Create the LLM prompt and, for customer-independent queries, the response cache key.
+        
+        Queries that need no customer fields are answered from the retrieved
+        documents only, so the answer can be shared between customers. The
+        key is the hash of the exact prompt (so only identically worded
+        questions with the same documents share an answer) and of the corpus
+        content (so answers cached before a corpus edit, also on disk across
+        restarts, are not served after it).
+        
+        Returns:
+            Tuple of (prompt, response cache key or None, prompt details)
+        """
+        if not customer_independent:
+            prompt, details = build_query_prompt(query, customer_data, retrieved_context)
+            return prompt, None, details
+        
+        prompt, details = build_query_prompt(query, {}, retrieved_context)
+        cache_key = (hashlib.sha256(prompt.encode("utf-8")).hexdigest(), corpus_hash)
+        return prompt, cache_key, details
+    
+    async def process_query_async(self, customer_id: str, query: str, response_mode: Optional[str] = None) -> Dict:
+        """
+        Process a user query on the asyncio event loop.
+        
+        Same flow as process_query, but the bank lookup and the LLM call are
+        awaited and retrieval runs on the shared executor, so one process can
+        keep many conversations in flight.
+        
+        Args:
+            customer_id: Customer identifier
+            query: Natural language query from user
+            response_mode: "template", "llm" or "auto" (defaults to config.RESPONSE_MODE)
+            
+        Returns:
+            Dictionary with response and metadata
+        """
+        pipeline = self._new_pipeline(customer_id, query, response_mode)
+        try:
+            result = await self._prepare_query_async(pipeline)
+            if result is not None:
+                return result
+            
+            prompt, cache_key = pipeline.prompt, pipeline.cache_key
+            response = await pipeline.generate_async(lambda: self.llm.generate_response_async(prompt, cache_key=cache_key))
+            
+            return self._answer_response(customer_id, query, response, pipeline.retrieved_context, pipeline.prompt_details)
+        finally:
+            pipeline.cancel_pending()
+            self.stage_stats.record(pipeline)
+    
+    def process_query_stream(self, customer_id: str, query: str,
+                             response_mode: Optional[str] = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Process a user query, streaming the answer as it is generated.
+        
+        Yields a "metadata" event (the response fields except the text), one
+        "token" event per text chunk and a final "done" event with timings.
+        Answers that need no LLM call are sent as a single token event.
+        
+        Args:
+            customer_id: Customer identifier
+            query: Natural language query from user
+            response_mode: "template", "llm" or "auto" (defaults to config.RESPONSE_MODE)
+            
+        Yields:
+            (event name, event data) tuples
+        """
+        started = time.perf_counter()
+        pipeline = self._new_pipeline(customer_id, query, response_mode)
+        try:
+            result = self._prepare_query(pipeline)
+            
+            first_token_at = None
+            if result is not None:
+                yield "metadata", {key: value for key, value in result.items() if key != "response"}
+                first_token_at = time.perf_counter()
+                yield "token", {"text": result["response"]}
+            else:
+                result = self._answer_response(customer_id, query, None, pipeline.retrieved_context, pipeline.prompt_details)
+                yield "metadata", {key: value for key, value in result.items() if key != "response"}
+                prompt, cache_key = pipeline.prompt, pipeline.cache_key
+                generate_started = time.perf_counter()
+                for text in self.llm.generate_response_stream(prompt, cache_key=cache_key):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    yield "token", {"text": text}
+                pipeline.record_stage("generate", time.perf_counter() - generate_started)
+            
+            yield "done", self._stream_timings(started, first_token_at)
+        finally:
+            pipeline.cancel_pending()
+            self.stage_stats.record(pipeline)
+    
+    async def process_query_stream_async(self, customer_id: str, query: str,
+                                         response_mode: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Async counterpart of process_query_stream.
         
-        # Step 6: Generate response using LLM
-        response = self.llm.generate_response(prompt)
+        Args:
+            customer_id: Customer identifier
+            query: Natural language query from user
+            response_mode: "template", "llm" or "auto" (defaults to config.RESPONSE_MODE)
+            
+        Yields:
+            (event name, event data) tuples
+        """
+        started = time.perf_counter()
+        pipeline = self._new_pipeline(customer_id, query, response_mode)
+        try:
+            result = await self._prepare_query_async(pipeline)
+            
+            first_token_at = None
+            if result is not None:
+                yield "metadata", {key: value for key, value in result.items() if key != "response"}
+                first_token_at = time.perf_counter()
+                yield "token", {"text": result["response"]}
+            else:
+                result = self._answer_response(customer_id, query, None, pipeline.retrieved_context, pipeline.prompt_details)
+                yield "metadata", {key: value for key, value in result.items() if key != "response"}
+                prompt, cache_key = pipeline.prompt, pipeline.cache_key
+                generate_started = time.perf_counter()
+                async for text in self.llm.generate_response_stream_async(prompt, cache_key=cache_key):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    yield "token", {"text": text}
+                pipeline.record_stage("generate", time.perf_counter() - generate_started)
+            
+            yield "done", self._stream_timings(started, first_token_at)
+        finally:
+            pipeline.cancel_pending()
+            self.stage_stats.record(pipeline)
+    
+    @staticmethod
+    def _stream_timings(started: float, first_token_at: Optional[float]) -> Dict:
+        """Build the timing payload of the final stream event."""
+        finished = time.perf_counter()
+        return {
+            "time_to_first_token_ms": round((first_token_at - started) * 1000, 2) if first_token_at else None,
+            "total_ms": round((finished - started) * 1000, 2)
+        }
+    
+    def _out_of_scope_response(self, validation: Dict) -> Dict:
+        """Build the response for a query rejected by scope validation."""
+        return {
+            "response": validation.get("message", FALLBACK_RESPONSES["out_of_scope"]),
+            "success": False,
+            "reason": validation.get("reason")
+        }
+    
+    def _customer_not_found_response(self) -> Dict:
+        """Build the response for an unknown customer."""
+        return {
+            "response": FALLBACK_RESPONSES["no_customer_data"],
+            "success": False,
+            "reason": "customer_not_found"
+        }
+    
+    def _stage_timeout_response(self, stage: str) -> Dict:
+        """Build the response for a query whose required stage timed out."""
+        return {
+            "response": FALLBACK_RESPONSES["error"],
+            "success": False,
+            "reason": f"{stage}_timeout"
+        }
+    
+    def _template_response(self, pipeline: QueryPipeline, customer_data: Dict) -> Dict:
+        """Build the response for a query answered from templates."""
+        response = render_intents(pipeline.scope.get("lookup_intents", ()), customer_data)
+        return self._answer_response(
+            pipeline.customer_id, pipeline.query, response, {"faqs": [], "policies": []}, response_mode="template"
+        )
+    
+    def _answer_response(self, customer_id: str, query: str, response: str, retrieved_context: Dict,
+                         prompt_details: Optional[Dict] = None, response_mode: str = "llm") -> Dict:
+        """Build the response for an answered query."""
+        context_used = {
+            "faqs_count": len(retrieved_context.get("faqs", [])),
+            "policies_count": len(retrieved_context.get("policies", []))
+        }
+        if prompt_details:
+            context_used["documents_in_prompt"] = len(prompt_details["document_ids"])
+            context_used["prompt_tokens"] = prompt_details["prompt_tokens"]
+            context_used["token_budget"] = prompt_details["token_budget"]
+            context_used["loans_omitted"] = prompt_details["loans_omitted"]
         
         return {
             "response": response,
             "success": True,
             "customer_id": customer_id,
             "query": query,
-            "context_used": {
-                "faqs_count": len(retrieved_context.get("faqs", [])),
-                "policies_count": len(retrieved_context.get("policies", []))
-            }
+            "context_used": context_used,
+            "response_mode": response_mode
         }
     
-    def _is_prepayment_calculation_query(self, query: str) -> bool:
-        """Check if query is asking for prepayment calculation."""
-        query_lower = query.lower()
-        calculation_keywords = ["calculate", "how much", "amount"]
-        prepayment_keywords = ["prepay", "prepayment", "foreclose"]
-        
-        has_calculation = any(kw in query_lower for kw in calculation_keywords)
-        has_prepayment = any(kw in query_lower for kw in prepayment_keywords)
-        
-        return has_calculation and has_prepayment
+    def _is_customer_independent_query(self, query: str) -> bool:
+        """Check if a query can be answered without any customer-specific fields."""
+        return PERSONAL_REFERENCE_PATTERN.search(query.lower()) is None
     
     def _handle_prepayment_query(self, customer_id: str, query: str, customer_data: Dict) -> Dict:
         """Handle prepayment calculation queries."""
@@ -111,7 +401,8 @@ Please specify the amount you'd like to prepay, and I'll calculate the total amo
             "action_required": "specify_prepayment_amount"
         }
     
-    def calculate_prepayment(self, customer_id: str, loan_id: str, prepayment_amount: float) -> Dict:
+    def calculate_prepayment(self, customer_id: str, loan_id: str, prepayment_amount: float,
+                             response_mode: Optional[str] = None) -> Dict:
         """
         Calculate prepayment with charges.
         
@@ -119,43 +410,90 @@ Please specify the amount you'd like to prepay, and I'll calculate the total amo
             customer_id: Customer identifier
             loan_id: Loan identifier
             prepayment_amount: Amount to prepay
+            response_mode: "template" or "auto" render the explanation from a
+                template, "llm" asks the LLM for a free-form explanation
+                (defaults to config.RESPONSE_MODE)
             
         Returns:
             Dictionary with calculation and explanation
         """
-        # Get calculation from bank API
-        calculation = self.bank_api.calculate_prepayment_amount(
-            customer_id, loan_id, prepayment_amount
-        )
+        # Neither the template nor the LLM can explain NaN, infinite or
+        # non-positive amounts meaningfully
+        if not (math.isfinite(prepayment_amount) and prepayment_amount > 0):
+            return {
+                "response": "Please enter a prepayment amount greater than zero.",
+                "success": False
+            }
         
-        if not calculation:
+        # Get loan data once; it is used for the calculation and as context
+        loans = self.bank_api.get_loan_details(customer_id, loan_id)
+        if not loans:
             return {
                 "response": "Unable to calculate prepayment. Please check your loan details.",
                 "success": False
             }
         
+        loan_data = loans[0]
+        calculation = self.bank_api.calculate_loan_prepayment(loan_data, prepayment_amount)
+        
         if not calculation.get("allowed"):
             return {
                 "response": calculation.get("message"),
                 "success": False
             }
         
-        # Get loan data for context
-        loans = self.bank_api.get_loan_details(customer_id, loan_id)
-        loan_data = loans[0] if loans else {}
-        
-        # Create prompt for explanation
-        prompt = create_prepayment_calculation_prompt(loan_data, prepayment_amount, calculation)
-        
-        # Generate friendly explanation
-        response = self.llm.generate_response(prompt, max_tokens=400)
+        response_mode = self._response_mode(response_mode)
+        if response_mode != "llm" and "prepayment_calc" in config.TEMPLATE_INTENTS:
+            # The numbers are exact: restate them without an LLM call
+            response = render_prepayment(calculation)
+            response_mode = "template"
+        else:
+            # Create prompt for explanation
+            prompt = create_prepayment_calculation_prompt(loan_data, prepayment_amount, calculation)
+            
+            # Generate friendly explanation
+            response = self.llm.generate_response(prompt, max_tokens=400)
+            response_mode = "llm"
         
         return {
             "response": response,
             "success": True,
-            "calculation": calculation
+            "calculation": calculation,
+            "response_mode": response_mode
         }
     
+    def calculate_prepayments(self, scenarios: List[Dict], summarize: bool = False) -> Dict:
+        """
+        Calculate many prepayment scenarios, optionally with one LLM summary.
+        
+        Args:
+            scenarios: Dictionaries with customer_id, loan_id and prepayment_amount
+            summarize: Whether to add a single LLM summary of all scenarios
+            
+        Returns:
+            Dictionary with "results" (one row per scenario, in order) and,
+            if requested, "summary"
+        """
+        calculations = self.bank_api.calculate_prepayment_amounts([
+            (scenario["customer_id"], scenario["loan_id"], scenario["prepayment_amount"])
+            for scenario in scenarios
+        ])
+        
+        results = []
+        for scenario, calculation in zip(scenarios, calculations):
+            row = {"customer_id": scenario["customer_id"], "loan_id": scenario["loan_id"]}
+            if calculation is None:
+                row.update(allowed=False, message="Loan not found")
+            else:
+                row.update(calculation)
+            results.append(row)
+        
+        result = {"results": results}
+        if summarize:
+            prompt = create_prepayment_batch_summary_prompt(results, config.PREPAYMENT_SUMMARY_MAX_SCENARIOS)
+            result["summary"] = self.llm.generate_response(prompt, max_tokens=400)
+        return result
+    
     def get_customer_summary(self, customer_id: str) -> Optional[Dict]:
         """
         Get a summary of customer's account and loans.
@@ -170,6 +508,42 @@ Please specify the amount you'd like to prepay, and I'll calculate the total amo
         if not customer_data:
             return None
         
+        return self._build_customer_summary(customer_data)
+    
+    def get_customer_summaries(self, customer_ids: List[str]) -> Dict:
+        """
+        Get summaries of many customers with bulk bank-data fetches.
+        
+        Args:
+            customer_ids: Customer identifiers
+            
+        Returns:
+            Dictionary with "summaries" (customer ID -> summary) and
+            "errors" (customer ID -> error message) for IDs that failed
+        """
+        unique_ids = list(dict.fromkeys(customer_ids))
+        summaries = {}
+        errors = {}
+        
+        # One bulk fetch per chunk; a failed chunk only fails its own IDs
+        for start in range(0, len(unique_ids), config.BANK_API_BATCH_SIZE):
+            chunk = unique_ids[start:start + config.BANK_API_BATCH_SIZE]
+            try:
+                customers = self.bank_api.get_many_customer_data(chunk)
+            except BankAPIError as e:
+                errors.update((customer_id, str(e)) for customer_id in chunk)
+                continue
+            
+            for customer_id, customer_data in customers.items():
+                if customer_data:
+                    summaries[customer_id] = self._build_customer_summary(customer_data)
+                else:
+                    errors[customer_id] = "Customer not found"
+        
+        return {"summaries": summaries, "errors": errors}
+    
+    def _build_customer_summary(self, customer_data: Dict) -> Dict:
+        """Build the summary of one customer's account and loans."""
         summary = {
             "customer_name": customer_data["name"],
             "account_number": customer_data["account_number"],
@@ -188,3 +562,18 @@ Please specify the amount you'd like to prepay, and I'll calculate the total amo
             })
         
         return summary
+    
+    def get_metrics(self) -> Dict:
+        """
+        Collect cache and performance counters from the underlying services.
+        
+        Returns:
+            Dictionary of metrics per component
+        """
+        return {
+            "retrieval_cache": self.vector_db.cache_stats(),
+            "llm_response_cache": self.llm.cache_stats(),
+            "llm_coalescing": self.llm.coalescing_stats(),
+            "customer_cache": self.bank_api.cache_stats(),
+            "pipeline": self.stage_stats.stats()
+        }
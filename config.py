@@ -6,18 +6,116 @@ load_dotenv()
 
 # LLM Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-api-key-here")
+# OpenAI-compatible API base URL (empty uses api.openai.com), e.g. the stand-in
+# server started with `python mock_llm_server.py` (http://localhost:8001/v1);
+# with a base URL set, no real API key is needed
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "")
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
+# Cache of answers to customer-independent questions (size 0 disables it)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+# JSON-lines file the answer cache is persisted to (empty keeps it in memory only)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
 
 # Vector DB Configuration
 VECTOR_DB_PERSIST_DIR = os.getenv("VECTOR_DB_PERSIST_DIR", "./vectordb")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
 
+# Corpus file reloaded by POST /admin/corpus/reload ({"faqs": [...], "policies": [...]})
+CORPUS_FILE = os.getenv("CORPUS_FILE", "./corpus.json")
+# Directory of further corpus files that POST /admin/corpus/reload may name in
+# "path" (empty allows only CORPUS_FILE)
+CORPUS_DIR = os.getenv("CORPUS_DIR", "")
+
+# Retrieval Configuration
+# Ranking mode: "overlap" (keyword overlap ratio), "bm25" or "dense"
+RETRIEVAL_RANKING = os.getenv("RETRIEVAL_RANKING", "overlap")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Size of the local hashed n-gram embeddings used by the "dense" mode
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "256"))
+# Retrieval result cache (size 0 disables it)
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "1024"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "300"))
+# Maximum number of queries accepted by POST /search/batch
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "1000"))
+
+# Estimated token budget of a chat prompt including the system prompt (0 for no
+# limit); retrieved documents are included by relevance until it is full
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+# Number of customers whose rendered prompt section is kept for reuse
+PROMPT_CUSTOMER_CACHE_SIZE = int(os.getenv("PROMPT_CUSTOMER_CACHE_SIZE", "1024"))
+
+# JSON file of intent keyword groups ({"group": ["keyword", ...]}) replacing the
+# defaults in intent_classifier.py (empty uses the defaults)
+INTENT_KEYWORDS_FILE = os.getenv("INTENT_KEYWORDS_FILE", "")
+
+# How structured answers (prepayment breakdowns, EMI/next due date, balances)
+# are written: "template" (deterministic, no LLM call), "llm" or "auto"
+# (templates only for pure lookups such as "When is my next EMI due?");
+# overridable per request
+RESPONSE_MODE = os.getenv("RESPONSE_MODE", "auto")
+# Intents answered from templates in the "template" and "auto" modes
+TEMPLATE_INTENTS = [intent.strip() for intent in os.getenv("TEMPLATE_INTENTS", "prepayment_calc,emi,balance").split(",") if intent.strip()]
+
+# Query pipeline: worker threads shared by all requests for the concurrent
+# customer fetch and retrieval stages, and how long to wait for each stage
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "16"))
+CUSTOMER_STAGE_TIMEOUT = float(os.getenv("CUSTOMER_STAGE_TIMEOUT", "5"))
+RETRIEVAL_STAGE_TIMEOUT = float(os.getenv("RETRIEVAL_STAGE_TIMEOUT", "2"))
+
 # API Configuration
 FLASK_HOST = os.getenv("FLASK_HOST", "0.0.0.0")
 FLASK_PORT = int(os.getenv("FLASK_PORT", "5000"))
 FLASK_DEBUG = os.getenv("FLASK_DEBUG", "True").lower() == "true"
+# Port of the asyncio (ASGI) server in asgi.py
+ASYNC_PORT = int(os.getenv("ASYNC_PORT", "5001"))
+# Token required in the X-Admin-Token header for /admin endpoints (empty disables
+# the admin endpoints)
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
 
-# Banking API Configuration (Mock for demo)
+# Banking API Configuration
+# Mode: "mock" (built-in demo data) or "http" (bank API at BANK_API_BASE_URL,
+# e.g. the stand-in server started with `python mock_bank_server.py`)
+BANK_API_MODE = os.getenv("BANK_API_MODE", "mock")
 BANK_API_BASE_URL = os.getenv("BANK_API_BASE_URL", "http://localhost:8000")
+# JSON-lines customers file (see synthetic_data.py) added to the mock-mode demo
+# customers at startup (empty loads only the demo customers)
+MOCK_CUSTOMERS_FILE = os.getenv("MOCK_CUSTOMERS_FILE", "")
 BANK_API_TIMEOUT = int(os.getenv("BANK_API_TIMEOUT", "10"))
+BANK_API_CONNECT_TIMEOUT = float(os.getenv("BANK_API_CONNECT_TIMEOUT", "3"))
+# Keep-alive connections kept per bank API host
+BANK_API_POOL_SIZE = int(os.getenv("BANK_API_POOL_SIZE", "32"))
+BANK_API_RETRIES = int(os.getenv("BANK_API_RETRIES", "3"))
+BANK_API_RETRY_BACKOFF = float(os.getenv("BANK_API_RETRY_BACKOFF", "0.2"))
+# Per-customer data cache in BankAPIClient (size 0 disables it)
+CUSTOMER_CACHE_SIZE = int(os.getenv("CUSTOMER_CACHE_SIZE", "10000"))
+CUSTOMER_CACHE_TTL = float(os.getenv("CUSTOMER_CACHE_TTL", "30"))
+# Customers requested per bulk round trip
+BANK_API_BATCH_SIZE = int(os.getenv("BANK_API_BATCH_SIZE", "500"))
+# Maximum number of customer IDs accepted by POST /customers/summary
+CUSTOMER_SUMMARY_BATCH_MAX = int(os.getenv("CUSTOMER_SUMMARY_BATCH_MAX", "1000"))
+# Maximum number of scenarios accepted by POST /prepayment/calculate/batch
+PREPAYMENT_BATCH_MAX = int(os.getenv("PREPAYMENT_BATCH_MAX", "10000"))
+# Scenarios listed in the prompt of a batch summary
+PREPAYMENT_SUMMARY_MAX_SCENARIOS = int(os.getenv("PREPAYMENT_SUMMARY_MAX_SCENARIOS", "20"))
+# Stand-in bank server (mock_bank_server.py): port and simulated latency
+MOCK_BANK_PORT = int(os.getenv("MOCK_BANK_PORT", "8000"))
+MOCK_BANK_LATENCY_MS = float(os.getenv("MOCK_BANK_LATENCY_MS", "50"))
+MOCK_BANK_JITTER_MS = float(os.getenv("MOCK_BANK_JITTER_MS", "10"))
+# Stand-in LLM server (mock_llm_server.py): port, time to first token, token rate
+# and injected errors. Latency distribution: "fixed", "uniform" (latency ± jitter),
+# "normal" (jitter is the standard deviation) or "lognormal" (latency is the
+# median, jitter/latency the log-scale sigma, for long tails)
+MOCK_LLM_PORT = int(os.getenv("MOCK_LLM_PORT", "8001"))
+MOCK_LLM_LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "400"))
+MOCK_LLM_JITTER_MS = float(os.getenv("MOCK_LLM_JITTER_MS", "200"))
+MOCK_LLM_LATENCY_DISTRIBUTION = os.getenv("MOCK_LLM_LATENCY_DISTRIBUTION", "lognormal")
+MOCK_LLM_TOKENS_PER_SECOND = float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND", "50"))
+MOCK_LLM_RESPONSE_TOKENS = int(os.getenv("MOCK_LLM_RESPONSE_TOKENS", "120"))
+# Fraction of requests failed with MOCK_LLM_ERROR_STATUS (e.g. 429 or 500), and
+# of streams cut off after their first tokens
+MOCK_LLM_ERROR_RATE = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+MOCK_LLM_ERROR_STATUS = int(os.getenv("MOCK_LLM_ERROR_STATUS", "500"))
+MOCK_LLM_STREAM_ABORT_RATE = float(os.getenv("MOCK_LLM_STREAM_ABORT_RATE", "0"))
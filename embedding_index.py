@@ -0,0 +1,223 @@
+"""Local embedding index for dense retrieval without network access."""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+import zlib
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from search_index import tokenize
+
+
+class HashingEmbedder:
+    """Embed text with signed feature hashing of words and character n-grams.
+
+    Every word and every character n-gram of the padded word ("#emi#") is
+    hashed with CRC32 into one of `dimensions` buckets with a +1/-1 sign, and
+    the resulting vector is L2-normalized. Hashes are deterministic across
+    processes, so vectors can be persisted and compared between workers.
+    """
+
+    def __init__(self, dimensions: int = 256, ngram_range: Tuple[int, int] = (3, 4)):
+        """
+        Initialize the embedder.
+
+        Args:
+            dimensions: Size of the embedding vectors
+            ngram_range: Inclusive (min, max) character n-gram lengths
+        """
+        if not NUMPY_AVAILABLE:
+            raise ImportError("numpy is required for dense retrieval")
+
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+        self._word_features = lru_cache(maxsize=65536)(self._hash_word)
+
+    def _hash_word(self, word: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Hash a word and its character n-grams into (bucket indices, signs)."""
+        features = [word]
+        padded = f"#{word}#"
+        min_n, max_n = self.ngram_range
+        for n in range(min_n, max_n + 1):
+            features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in features),
+            dtype=np.uint32, count=len(features)
+        )
+        indices = (hashes % self.dimensions).astype(np.intp)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        return indices, signs
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed a single text.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            L2-normalized float32 vector
+        """
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in tokenize(text):
+            indices, signs = self._word_features(word)
+            np.add.at(vector, indices, signs)
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def embed_many(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Embed several texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Float32 matrix with one normalized row per text
+        """
+        rows = [self.embed(text) for text in texts]
+        if not rows:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        return np.vstack(rows)
+
+
+class DenseIndex:
+    """Contiguous float32 matrix of document embeddings.
+
+    Row i holds the embedding of document number i of the matching
+    InvertedIndex. A query is scored against every document with a single
+    matrix-vector product and the top k rows are selected with argpartition.
+    """
+
+    def __init__(self, embedder: HashingEmbedder, contents: Iterable[str] = ()):
+        """
+        Build the index.
+
+        Args:
+            embedder: Embedder used for documents and queries
+            contents: Document texts in document-number order
+        """
+        self.embedder = embedder
+        self._matrix = embedder.embed_many(contents)
+        self.size = self._matrix.shape[0]
+        self._shared = False
+
+    @classmethod
+    def from_matrix(cls, embedder: HashingEmbedder, matrix: np.ndarray) -> "DenseIndex":
+        """
+        Wrap an existing embedding matrix (e.g. memory-mapped) without copying.
+
+        The matrix is only copied if a document is added later.
+
+        Args:
+            embedder: Embedder used for queries
+            matrix: Float32 matrix with one row per document
+
+        Returns:
+            DenseIndex backed by the given matrix
+        """
+        index = cls(embedder)
+        index._matrix = matrix
+        index.size = matrix.shape[0]
+        return index
+
+    def copy(self) -> "DenseIndex":
+        """
+        Copy the index for an update that readers must not see half-done.
+
+        The matrix is shared until the copy adds a document, which then
+        copies the rows (no document is re-embedded).
+
+        Returns:
+            Independent DenseIndex with the same embeddings
+        """
+        index = DenseIndex.from_matrix(self.embedder, self._matrix)
+        index.size = self.size
+        index._shared = True
+        return index
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Embeddings of all indexed documents."""
+        return self._matrix[:self.size]
+
+    def add(self, content: str) -> int:
+        """
+        Append a document embedding, growing the matrix geometrically.
+
+        Args:
+            content: Document text
+
+        Returns:
+            Document number
+        """
+        if self._shared or self.size == self._matrix.shape[0]:
+            capacity = max(16, self.size * 2)
+            grown = np.zeros((capacity, self.embedder.dimensions), dtype=np.float32)
+            grown[:self.size] = self._matrix[:self.size]
+            self._matrix = grown
+            self._shared = False
+
+        self._matrix[self.size] = self.embedder.embed(content)
+        self.size += 1
+        return self.size - 1
+
+    def score(self, query: str) -> np.ndarray:
+        """
+        Compute cosine similarity of the query with every document.
+
+        Args:
+            query: Search query
+
+        Returns:
+            Float32 array of scores indexed by document number
+        """
+        return self.matrix @ self.embedder.embed(query)
+
+    def score_many(self, queries: List[str]) -> np.ndarray:
+        """
+        Compute cosine similarities for several queries with one matrix product.
+
+        Args:
+            queries: Search queries
+
+        Returns:
+            Float32 matrix of shape (len(queries), documents)
+        """
+        return self.embedder.embed_many(queries) @ self.matrix.T
+
+    @staticmethod
+    def top_k(scores: np.ndarray, n_results: int) -> List[Tuple[int, float]]:
+        """
+        Select the best scoring documents.
+
+        Args:
+            scores: Scores indexed by document number
+            n_results: Number of results to return
+
+        Returns:
+            List of (document number, score) tuples ordered by score, then document number
+        """
+        n_results = min(n_results, scores.shape[0])
+        if n_results <= 0:
+            return []
+
+        if n_results < scores.shape[0]:
+            candidates = np.argpartition(-scores, n_results - 1)[:n_results]
+        else:
+            candidates = np.arange(scores.shape[0])
+
+        order = np.lexsort((candidates, -scores[candidates]))
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in candidates[order]]
@@ -0,0 +1,377 @@
+"""Persistent, memory-mapped storage for the retrieval indexes.
+
+An index directory (config.VECTOR_DB_PERSIST_DIR) contains a manifest and one
+subdirectory per collection:
+
+    manifest.json           format version, collection list and content hash
+    <collection>/
+        contents.bin        UTF-8 document texts, back to back
+        contents.idx        uint64 offsets into contents.bin (N + 1)
+        metadata.jsonl      one JSON metadata object per document
+        metadata.idx        uint64 offsets into metadata.jsonl (N + 1)
+        vocabulary.json     terms in term-id order
+        postings.bin        uint32 document numbers for every term, back to back
+        term_freqs.bin      uint32 term frequencies aligned with postings.bin
+        postings.idx        uint64 offsets into postings.bin per term (V + 1)
+        doc_lengths.bin     uint32 token count per document
+        idf.bin             float64 BM25 IDF per term
+        length_norms.bin    float64 BM25 length normalization per document
+        deleted.bin         uint32 numbers of removed documents
+        vectors.bin         float32 N x D embedding matrix (optional)
+
+Large files are opened with mmap, so opening an index is near-instant and
+worker processes reading the same files share the same physical pages.
+Build the index with:
+
+    python index_store.py build
+"""
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import sys
+
+import config
+from search_index import InvertedIndex, TOKEN_PATTERN
+from embedding_index import DenseIndex, HashingEmbedder, NUMPY_AVAILABLE
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+class _MappedSequence:
+    """Read-only sequence over mmap-backed records with in-memory additions.
+
+    Items are decoded on access by `loader`. Items appended or replaced after
+    opening are kept in memory, so an opened index can still be updated
+    without rewriting the files.
+    """
+
+    def __init__(self, count: int, loader: Callable):
+        self._count = count
+        self._loader = loader
+        self._tail: List = []
+        self._overrides: Dict[int, object] = {}
+
+    def __len__(self) -> int:
+        return self._count + len(self._tail)
+
+    def __getitem__(self, position: int):
+        if position < 0:
+            position += len(self)
+        if position < 0 or position >= len(self):
+            raise IndexError(position)
+        if position >= self._count:
+            return self._tail[position - self._count]
+        if position in self._overrides:
+            return self._overrides[position]
+        return self._loader(position)
+
+    def __setitem__(self, position: int, value):
+        if position >= self._count:
+            self._tail[position - self._count] = value
+        else:
+            self._overrides[position] = value
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def append(self, value):
+        self._tail.append(value)
+
+    def copy(self) -> "_MappedSequence":
+        """Copy sharing the mapped records; additions to either are not seen by the other."""
+        sequence = _MappedSequence(self._count, self._loader)
+        sequence._tail = self._tail.copy()
+        sequence._overrides = dict(self._overrides)
+        return sequence
+
+
+def content_hash(collections: Dict[str, Iterable[Tuple[str, str]]]) -> str:
+    """
+    Hash the documents of a corpus.
+
+    Unlike the process-local corpus version, the hash is the same in every
+    process and after restarts for the same documents, and changes with any
+    edit, addition or removal.
+
+    Args:
+        collections: Mapping of collection name to (document id, content)
+            pairs in index order
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for name in sorted(collections):
+        digest.update(f"{name}\0".encode("utf-8"))
+        for document_id, content in collections[name]:
+            digest.update(f"{document_id}\0{len(content)}\0{content}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def index_hash(collections: Dict[str, tuple]) -> str:
+    """
+    Hash the live documents of indexed collections (see content_hash).
+
+    Args:
+        collections: Mapping of collection name to (InvertedIndex, DenseIndex or None)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    def live_documents(index: InvertedIndex):
+        for position in range(len(index)):
+            if position not in index.deleted:
+                yield index.metadata[position]["id"], index.contents[position]
+
+    return content_hash({name: live_documents(index) for name, (index, _) in collections.items()})
+
+
+def _open_map(path: str):
+    """Memory-map a file read-only (empty files map to an empty buffer)."""
+    if os.path.getsize(path) == 0:
+        return b""
+    with open(path, "rb") as handle:
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _read_array(path: str, typecode: str) -> array:
+    """Load a small binary array file fully into memory."""
+    values = array(typecode)
+    with open(path, "rb") as handle:
+        values.frombytes(handle.read())
+    return values
+
+
+def _write_array(path: str, typecode: str, values) -> None:
+    with open(path, "wb") as handle:
+        array(typecode, values).tofile(handle)
+
+
+def _write_blobs(data_path: str, index_path: str, blobs) -> None:
+    """Write byte strings back to back plus an offsets file."""
+    offsets = array('Q', [0])
+    with open(data_path, "wb") as handle:
+        for blob in blobs:
+            handle.write(blob)
+            offsets.append(offsets[-1] + len(blob))
+    with open(index_path, "wb") as handle:
+        offsets.tofile(handle)
+
+
+def write_collection(directory: str, index: InvertedIndex, vectors: Optional[DenseIndex] = None) -> None:
+    """
+    Write one collection to disk.
+
+    Args:
+        directory: Target directory (created if missing)
+        index: Keyword index to persist
+        vectors: Optional dense vectors aligned with the index
+    """
+    os.makedirs(directory, exist_ok=True)
+    if index._stats_stale:
+        index._refresh_statistics()
+
+    _write_blobs(
+        os.path.join(directory, "contents.bin"), os.path.join(directory, "contents.idx"),
+        (content.encode("utf-8") for content in index.contents)
+    )
+    _write_blobs(
+        os.path.join(directory, "metadata.jsonl"), os.path.join(directory, "metadata.idx"),
+        ((json.dumps(metadata) + "\n").encode("utf-8") for metadata in index.metadata)
+    )
+
+    terms = sorted(index.vocabulary, key=index.vocabulary.get)
+    with open(os.path.join(directory, "vocabulary.json"), "w") as handle:
+        json.dump(terms, handle)
+
+    offsets = array('Q', [0])
+    with open(os.path.join(directory, "postings.bin"), "wb") as postings_file, \
+            open(os.path.join(directory, "term_freqs.bin"), "wb") as freqs_file:
+        for term_id in range(len(terms)):
+            postings = array('I', index.postings[term_id])
+            postings.tofile(postings_file)
+            array('I', index.term_freqs[term_id]).tofile(freqs_file)
+            offsets.append(offsets[-1] + len(postings))
+    with open(os.path.join(directory, "postings.idx"), "wb") as handle:
+        offsets.tofile(handle)
+
+    _write_array(os.path.join(directory, "doc_lengths.bin"), 'I', index.doc_lengths)
+    _write_array(os.path.join(directory, "idf.bin"), 'd', index.idf)
+    _write_array(os.path.join(directory, "length_norms.bin"), 'd', index.length_norms)
+    _write_array(os.path.join(directory, "deleted.bin"), 'I', sorted(index.deleted))
+
+    if vectors is not None:
+        with open(os.path.join(directory, "vectors.bin"), "wb") as handle:
+            handle.write(np.ascontiguousarray(vectors.matrix, dtype=np.float32).tobytes())
+
+
+def open_collection(directory: str, manifest: Dict, embedder: Optional[HashingEmbedder] = None) -> tuple:
+    """
+    Open a persisted collection via mmap.
+
+    Args:
+        directory: Collection directory
+        manifest: Collection entry from the manifest
+        embedder: Embedder to attach to the dense vectors, if wanted
+
+    Returns:
+        Tuple of (InvertedIndex, DenseIndex or None)
+    """
+    n_docs = manifest["documents"]
+
+    contents_map = _open_map(os.path.join(directory, "contents.bin"))
+    contents_offsets = memoryview(_open_map(os.path.join(directory, "contents.idx"))).cast('Q')
+    metadata_map = _open_map(os.path.join(directory, "metadata.jsonl"))
+    metadata_offsets = memoryview(_open_map(os.path.join(directory, "metadata.idx"))).cast('Q')
+
+    def load_content(doc_id):
+        return contents_map[contents_offsets[doc_id]:contents_offsets[doc_id + 1]].decode("utf-8")
+
+    def load_metadata(doc_id):
+        return json.loads(metadata_map[metadata_offsets[doc_id]:metadata_offsets[doc_id + 1]])
+
+    with open(os.path.join(directory, "vocabulary.json")) as handle:
+        terms = json.load(handle)
+
+    postings_view = memoryview(_open_map(os.path.join(directory, "postings.bin"))).cast('I')
+    freqs_view = memoryview(_open_map(os.path.join(directory, "term_freqs.bin"))).cast('I')
+    postings_offsets = memoryview(_open_map(os.path.join(directory, "postings.idx"))).cast('Q')
+
+    contents = _MappedSequence(n_docs, load_content)
+    contents_lower = _MappedSequence(n_docs, lambda doc_id: contents[doc_id].lower())
+    index = InvertedIndex.from_parts(
+        contents=contents,
+        contents_lower=contents_lower,
+        metadata=_MappedSequence(n_docs, load_metadata),
+        doc_terms=_MappedSequence(
+            n_docs, lambda doc_id: frozenset(TOKEN_PATTERN.findall(contents_lower[doc_id]))
+        ),
+        doc_lengths=_read_array(os.path.join(directory, "doc_lengths.bin"), 'I'),
+        vocabulary={term: term_id for term_id, term in enumerate(terms)},
+        postings=_MappedSequence(
+            len(terms), lambda term_id: postings_view[postings_offsets[term_id]:postings_offsets[term_id + 1]]
+        ),
+        term_freqs=_MappedSequence(
+            len(terms), lambda term_id: freqs_view[postings_offsets[term_id]:postings_offsets[term_id + 1]]
+        ),
+        idf=_read_array(os.path.join(directory, "idf.bin"), 'd'),
+        length_norms=_read_array(os.path.join(directory, "length_norms.bin"), 'd'),
+        k1=manifest["k1"],
+        b=manifest["b"],
+        deleted=_read_array(os.path.join(directory, "deleted.bin"), 'I')
+    )
+
+    vectors = None
+    vectors_path = os.path.join(directory, "vectors.bin")
+    if embedder is not None and manifest.get("embedding_dimensions") == embedder.dimensions \
+            and os.path.exists(vectors_path):
+        matrix = np.frombuffer(_open_map(vectors_path), dtype=np.float32).reshape(n_docs, embedder.dimensions)
+        vectors = DenseIndex.from_matrix(embedder, matrix)
+
+    return index, vectors
+
+
+def write_index(persist_dir: str, collections: Dict[str, tuple]) -> None:
+    """
+    Write all collections and the manifest, replacing any existing index.
+
+    The new index is written to a temporary directory first and moved into
+    place, so processes that already mapped the old files keep reading them.
+    The manifest records the content hash of the written documents.
+
+    Args:
+        persist_dir: Index directory
+        collections: Mapping of collection name to (InvertedIndex, DenseIndex or None)
+    """
+    staging_dir = f"{persist_dir.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+
+    # Lets readers check that the index still holds the corpus they expect
+    manifest = {"format_version": FORMAT_VERSION, "content_hash": index_hash(collections), "collections": {}}
+    for name, (index, vectors) in collections.items():
+        write_collection(os.path.join(staging_dir, name), index, vectors)
+        manifest["collections"][name] = {
+            "documents": len(index),
+            "terms": len(index.vocabulary),
+            "k1": index.k1,
+            "b": index.b,
+            "embedding_dimensions": vectors.embedder.dimensions if vectors is not None else None
+        }
+
+    with open(os.path.join(staging_dir, MANIFEST_FILE), "w") as handle:
+        json.dump(manifest, handle, indent=2)
+
+    if os.path.exists(persist_dir):
+        retired_dir = f"{persist_dir.rstrip(os.sep)}.old-{os.getpid()}"
+        os.rename(persist_dir, retired_dir)
+        os.rename(staging_dir, persist_dir)
+        shutil.rmtree(retired_dir, ignore_errors=True)
+    else:
+        os.rename(staging_dir, persist_dir)
+
+
+def read_manifest(persist_dir: str) -> Optional[Dict]:
+    """
+    Read the index manifest.
+
+    Args:
+        persist_dir: Index directory
+
+    Returns:
+        Manifest dictionary, or None if there is no index of the supported format
+    """
+    try:
+        with open(os.path.join(persist_dir, MANIFEST_FILE)) as handle:
+            manifest = json.load(handle)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("format_version") != FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def build_index(persist_dir: str = config.VECTOR_DB_PERSIST_DIR) -> Dict:
+    """
+    Build the FAQ and policy indexes from data.py and write them to disk.
+
+    Args:
+        persist_dir: Index directory
+
+    Returns:
+        The written manifest
+    """
+    from vector_db_service import VectorDBService
+
+    service = VectorDBService(persist_dir=None)
+    embedder = HashingEmbedder(dimensions=config.EMBEDDING_DIMENSIONS) if NUMPY_AVAILABLE else None
+
+    collections = {}
+    for name, index in (("faqs", service.faq_index), ("policies", service.policy_index)):
+        vectors = DenseIndex(embedder, index.contents) if embedder else None
+        collections[name] = (index, vectors)
+
+    write_index(persist_dir, collections)
+    return read_manifest(persist_dir)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print("Usage: python index_store.py build [persist_dir]")
+        sys.exit(1)
+
+    target_dir = sys.argv[2] if len(sys.argv) > 2 else config.VECTOR_DB_PERSIST_DIR
+    written = build_index(target_dir)
+    for collection, details in written["collections"].items():
+        print(f"{collection}: {details['documents']} documents, {details['terms']} terms")
+    print(f"Index written to {target_dir}")
@@ -0,0 +1,246 @@
+"""Single-pass keyword classifier for query scope and intents."""
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import json
+import re
+
+import config
+from prompts import FALLBACK_RESPONSES
+
+# Keyword groups; a query "contains" a keyword if it occurs as a substring
+# of the lowercased query, anywhere (the same rule as `keyword in query`).
+# The "lookup" group is not matched this way: it lists the words that may
+# surround an EMI or balance keyword in a plain lookup ("When is my next EMI
+# due?"), which can be answered from a template.
+DEFAULT_KEYWORDS: Dict[str, List[str]] = {
+    "out_of_scope": [
+        "new account", "open account", "new loan application",
+        "credit card", "debit card", "apply for",
+        "password", "otp", "pin"
+    ],
+    "in_scope": [
+        "emi", "loan", "prepay", "prepayment", "outstanding",
+        "balance", "account", "payment", "interest", "tenure"
+    ],
+    "calculation": ["calculate", "how much", "amount"],
+    "prepayment": ["prepay", "prepayment", "foreclose"],
+    "emi": ["emi", "emis", "installment", "installments", "instalment", "instalments"],
+    "balance": ["balance", "balances", "outstanding"],
+    "explanation": [
+        "why", "explain", "how does", "how do", "how is", "should i", "can i",
+        "what if", "difference", "compare", "better"
+    ],
+    "lookup": [
+        "what", "whats", "s", "is", "are", "my", "the", "a", "of", "on", "for", "me",
+        "show", "tell", "check", "please", "can", "you", "give", "current", "next",
+        "when", "due", "date", "how", "much", "total", "remaining", "pending",
+        "loan", "loans", "account", "amount", "monthly", "and", "all",
+        "home", "car", "personal", "education", "gold"
+    ]
+}
+
+# Intents that a pure lookup query can ask for
+LOOKUP_INTENTS = ("emi", "balance")
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """
+    Build a regex matching the longest of the keywords at a position.
+
+    Args:
+        keywords: Non-empty keywords
+
+    Returns:
+        Regex source with one nested branch per distinct prefix
+    """
+    trie: Dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: Dict) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A keyword ends here: longer matches are optional (greedy, so preferred)
+        if "" in node:
+            pattern = f"(?:{pattern})?"
+        return pattern
+
+    return render(trie)
+
+
+class IntentClassifier:
+    """
+    Classify a query's scope and intents with one scan of the text.
+
+    All keywords are compiled into a single lookahead regex shaped like a
+    trie (`(?=(p(?:re(?:pay(?:ment)?)?|in)))`), so at each position of the
+    query the engine follows one branch per character instead of trying
+    every keyword. Scanning it with finditer finds, at every position, the
+    longest keyword starting there; every keyword that is a prefix of that
+    match also occurs at that position, so the groups of all of them are
+    credited. This gives exactly the substring semantics of
+    `keyword in query` for every keyword, with a per-query cost that does
+    not grow with the number of keywords.
+    """
+
+    def __init__(self, keywords: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Compile the keyword groups.
+
+        Args:
+            keywords: Mapping of group name to keywords (defaults to DEFAULT_KEYWORDS)
+        """
+        keywords = DEFAULT_KEYWORDS if keywords is None else keywords
+        self._lookup_words = frozenset(word.lower() for word in keywords.get("lookup", ()))
+        # Whole-word keywords of the intents a pure lookup can ask for
+        self._lookup_keywords: Dict[str, FrozenSet[str]] = {
+            intent: frozenset(" ".join(_WORD_PATTERN.findall(keyword.lower())) for keyword in keywords.get(intent, ()))
+            for intent in LOOKUP_INTENTS
+        }
+
+        groups_by_keyword: Dict[str, set] = {}
+        for group, group_keywords in keywords.items():
+            if group == "lookup":
+                continue
+            for keyword in group_keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    groups_by_keyword.setdefault(keyword, set()).add(group)
+
+        # Groups credited by a match: its own plus those of all keywords that prefix it
+        self._match_groups: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset().union(*(
+                groups_by_keyword.get(keyword[:end], ()) for end in range(1, len(keyword) + 1)
+            ))
+            for keyword in groups_by_keyword
+        }
+
+        self._pattern = re.compile("(?=(" + _trie_pattern(groups_by_keyword) + "))") if groups_by_keyword else None
+
+    @classmethod
+    def from_file(cls, path: str) -> "IntentClassifier":
+        """
+        Build a classifier from a JSON file of {"group": ["keyword", ...]}.
+
+        Groups in the file replace the default keywords of the same group;
+        other default groups are kept.
+
+        Args:
+            path: JSON file path
+
+        Returns:
+            Compiled classifier
+        """
+        with open(path) as handle:
+            overrides = json.load(handle)
+        keywords = dict(DEFAULT_KEYWORDS)
+        keywords.update(overrides)
+        return cls(keywords)
+
+    def matched_groups(self, query: str) -> FrozenSet[str]:
+        """
+        Find the keyword groups occurring in a query.
+
+        Args:
+            query: User query
+
+        Returns:
+            Names of the groups with at least one keyword in the query
+        """
+        if self._pattern is None:
+            return frozenset()
+
+        groups = set()
+        for match in self._pattern.finditer(query.lower()):
+            groups |= self._match_groups[match.group(1)]
+        return frozenset(groups)
+
+    def lookup_intents(self, query: str) -> Tuple[List[str], bool]:
+        """
+        Find the EMI and balance intents of a query as whole words.
+
+        Unlike the substring intents, "premium" does not ask for the EMI.
+        The query is a pure lookup if every other word in it is a "lookup"
+        word; anything else (a penalty, a rate change, a prepayment, a "why")
+        makes it a question for the LLM.
+
+        Args:
+            query: User query
+
+        Returns:
+            (intents in LOOKUP_INTENTS order, whether the query is a pure lookup)
+        """
+        words = _WORD_PATTERN.findall(query.lower())
+        padded = " " + " ".join(words) + " "
+        intents = []
+        keyword_words = set()
+        for intent in LOOKUP_INTENTS:
+            matched = [keyword for keyword in self._lookup_keywords[intent] if keyword and f" {keyword} " in padded]
+            if matched:
+                intents.append(intent)
+                for keyword in matched:
+                    keyword_words.update(keyword.split())
+
+        pure = bool(intents) and all(word in self._lookup_words or word in keyword_words for word in words)
+        return intents, pure
+
+    def classify(self, query: str) -> Dict:
+        """
+        Classify a query.
+
+        Args:
+            query: User query
+
+        Returns:
+            Dictionary with in_scope, confidence, intents, lookup_intents
+            and pure_lookup (see lookup_intents) and, for rejected queries,
+            the reason and message (the validate_query_scope format)
+        """
+        groups = self.matched_groups(query)
+        lookup_intents, pure_lookup = self.lookup_intents(query)
+
+        intents = []
+        if "emi" in groups:
+            intents.append("emi")
+        if "calculation" in groups and "prepayment" in groups:
+            intents.append("prepayment_calc")
+        if "balance" in groups:
+            intents.append("balance")
+        if "explanation" in groups:
+            intents.append("explanation")
+
+        if "out_of_scope" in groups:
+            return {
+                "in_scope": False,
+                "confidence": "high",
+                "intents": intents + ["out_of_scope"],
+                "reason": "out_of_scope",
+                "message": FALLBACK_RESPONSES["out_of_scope"]
+            }
+
+        return {
+            "in_scope": True,
+            "confidence": "high" if "in_scope" in groups else "low",
+            "intents": intents,
+            "lookup_intents": lookup_intents,
+            "pure_lookup": pure_lookup
+        }
+
+
+@lru_cache(maxsize=1)
+def get_classifier() -> IntentClassifier:
+    """
+    Get the shared classifier, compiled once per process.
+
+    Keywords come from config.INTENT_KEYWORDS_FILE if set, else the defaults.
+    """
+    if config.INTENT_KEYWORDS_FILE:
+        return IntentClassifier.from_file(config.INTENT_KEYWORDS_FILE)
+    return IntentClassifier()
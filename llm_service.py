@@ -1,13 +1,17 @@
 """LLM service for orchestrating responses using OpenAI."""
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, Iterator, Optional
+import hashlib
+import re
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
 
 import config
-from prompts import SYSTEM_PROMPT, FALLBACK_RESPONSES
+from cache import LRUCache, PersistentLRUCache, SingleFlight
+from intent_classifier import get_classifier
+from prompts import SYSTEM_PROMPT
 
 
 class LLMService:
@@ -18,21 +22,70 @@ class LLMService:
         self.model = config.LLM_MODEL
         self.temperature = config.LLM_TEMPERATURE
         self.client = None
+        self.async_client = None
+        self.response_cache = self._create_response_cache()
+        self.in_flight = SingleFlight()
         
-        if OPENAI_AVAILABLE and config.OPENAI_API_KEY and config.OPENAI_API_KEY != "your-api-key-here":
+        has_api_key = config.OPENAI_API_KEY and config.OPENAI_API_KEY != "your-api-key-here"
+        if OPENAI_AVAILABLE and (has_api_key or config.OPENAI_BASE_URL):
             try:
-                self.client = OpenAI(api_key=config.OPENAI_API_KEY)
+                # OpenAI-compatible servers (e.g. mock_llm_server.py) need no real key
+                client_options = {
+                    "api_key": config.OPENAI_API_KEY if has_api_key else "not-needed",
+                    "base_url": config.OPENAI_BASE_URL or None
+                }
+                self.client = OpenAI(**client_options)
+                self.async_client = AsyncOpenAI(**client_options)
             except Exception as e:
                 print(f"OpenAI initialization warning: {str(e)}")
                 self.client = None
+                self.async_client = None
+    
+    @staticmethod
+    def _create_response_cache() -> LRUCache:
+        """Create the response cache, persisted to disk if LLM_CACHE_PATH is set."""
+        if config.LLM_CACHE_PATH:
+            return PersistentLRUCache(
+                config.LLM_CACHE_PATH,
+                max_size=config.LLM_CACHE_SIZE,
+                ttl_seconds=config.LLM_CACHE_TTL
+            )
+        return LRUCache(max_size=config.LLM_CACHE_SIZE, ttl_seconds=config.LLM_CACHE_TTL)
+    
+    def _response_cache_key(self, cache_key: Optional[tuple], max_tokens: int) -> Optional[tuple]:
+        """Extend a caller's cache key with the generation settings."""
+        if cache_key is None:
+            return None
+        return tuple(cache_key) + (self.model, self.temperature, max_tokens)
+    
+    def _in_flight_key(self, prompt: str, max_tokens: int) -> tuple:
+        """Identify a completion request for coalescing identical concurrent calls."""
+        return (hashlib.sha256(prompt.encode("utf-8")).hexdigest(), self.model, max_tokens)
+    
+    def cache_stats(self) -> Dict:
+        """Report response cache usage."""
+        return self.response_cache.stats()
     
-    def generate_response(self, prompt: str, max_tokens: int = 500) -> str:
+    def coalescing_stats(self) -> Dict:
+        """Report how many completion calls were shared with an identical in-flight call."""
+        return self.in_flight.stats()
+    
+    def _build_messages(self, prompt: str) -> list:
+        """Build the chat messages for a prompt."""
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def generate_response(self, prompt: str, max_tokens: int = 500, cache_key: Optional[tuple] = None) -> str:
         """
         Generate a response from the LLM.
         
         Args:
             prompt: The formatted prompt with context
             max_tokens: Maximum tokens in response
+            cache_key: Key identifying an answer that can be shared between
+                customers; hits skip the LLM call (None disables caching)
             
         Returns:
             Generated response text
@@ -40,22 +93,195 @@ class LLMService:
         if not self.client:
             return self._create_demo_response(prompt)
         
+        key = self._response_cache_key(cache_key, max_tokens)
+        if key is not None:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        try:
+            text = self.in_flight.do(
+                self._in_flight_key(prompt, max_tokens),
+                lambda: self._complete(prompt, max_tokens)
+            )
+            if key is not None:
+                self.response_cache.set(key, text)
+            return text
+        
+        except Exception as e:
+            print(f"LLM Error: {str(e)}")
+            return self._create_demo_response(prompt)
+    
+    async def generate_response_async(self, prompt: str, max_tokens: int = 500,
+                                      cache_key: Optional[tuple] = None) -> str:
+        """
+        Generate a response from the LLM without blocking the event loop.
+        
+        Args:
+            prompt: The formatted prompt with context
+            max_tokens: Maximum tokens in response
+            cache_key: Response cache key (see generate_response)
+            
+        Returns:
+            Generated response text
+        """
+        if not self.async_client:
+            return self._create_demo_response(prompt)
+        
+        key = self._response_cache_key(cache_key, max_tokens)
+        if key is not None:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                return cached
+        
         try:
-            response = self.client.chat.completions.create(
+            text = await self.in_flight.do_async(
+                self._in_flight_key(prompt, max_tokens),
+                lambda: self._complete_async(prompt, max_tokens)
+            )
+            if key is not None:
+                self.response_cache.set(key, text)
+            return text
+        
+        except Exception as e:
+            print(f"LLM Error: {str(e)}")
+            return self._create_demo_response(prompt)
+    
+    def _complete(self, prompt: str, max_tokens: int) -> str:
+        """Run one chat completion and return the stripped text."""
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(prompt),
+            temperature=self.temperature,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content.strip()
+    
+    async def _complete_async(self, prompt: str, max_tokens: int) -> str:
+        """Async counterpart of _complete."""
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(prompt),
+            temperature=self.temperature,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content.strip()
+    
+    def generate_response_stream(self, prompt: str, max_tokens: int = 500,
+                                 cache_key: Optional[tuple] = None) -> Iterator[str]:
+        """
+        Stream a response from the LLM as it is generated.
+        
+        Args:
+            prompt: The formatted prompt with context
+            max_tokens: Maximum tokens in response
+            cache_key: Response cache key (see generate_response); a hit is
+                sent as a single chunk
+            
+        Yields:
+            Text chunks in generation order
+        """
+        if not self.client:
+            yield from self._stream_demo_response(prompt)
+            return
+        
+        key = self._response_cache_key(cache_key, max_tokens)
+        if key is not None:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        started = False
+        chunks = []
+        try:
+            stream = self.client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._build_messages(prompt),
                 temperature=self.temperature,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                stream=True
             )
+            for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    started = True
+                    chunks.append(text)
+                    yield text
             
-            return response.choices[0].message.content.strip()
+            if key is not None:
+                self.response_cache.set(key, "".join(chunks).strip())
         
         except Exception as e:
             print(f"LLM Error: {str(e)}")
-            return self._create_demo_response(prompt)
+            if not started:
+                yield from self._stream_demo_response(prompt)
+    
+    async def generate_response_stream_async(self, prompt: str, max_tokens: int = 500,
+                                             cache_key: Optional[tuple] = None) -> AsyncIterator[str]:
+        """
+        Stream a response from the LLM without blocking the event loop.
+        
+        Args:
+            prompt: The formatted prompt with context
+            max_tokens: Maximum tokens in response
+            cache_key: Response cache key (see generate_response_stream)
+            
+        Yields:
+            Text chunks in generation order
+        """
+        if not self.async_client:
+            for text in self._stream_demo_response(prompt):
+                yield text
+            return
+        
+        key = self._response_cache_key(cache_key, max_tokens)
+        if key is not None:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        started = False
+        chunks = []
+        try:
+            stream = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(prompt),
+                temperature=self.temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            async for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    started = True
+                    chunks.append(text)
+                    yield text
+            
+            if key is not None:
+                self.response_cache.set(key, "".join(chunks).strip())
+        
+        except Exception as e:
+            print(f"LLM Error: {str(e)}")
+            if not started:
+                for text in self._stream_demo_response(prompt):
+                    yield text
+    
+    def _stream_demo_response(self, prompt: str, words_per_chunk: int = 4) -> Iterator[str]:
+        """
+        Stream the demo response in small chunks, like a real LLM stream.
+        
+        Args:
+            prompt: The formatted prompt
+            words_per_chunk: Number of words per chunk
+            
+        Yields:
+            Text chunks that concatenate to the demo response
+        """
+        pieces = re.findall(r'\S+\s*', self._create_demo_response(prompt))
+        for i in range(0, len(pieces), words_per_chunk):
+            yield "".join(pieces[i:i + words_per_chunk])
     
     def _create_demo_response(self, prompt: str) -> str:
         """
@@ -134,42 +360,6 @@ Please feel free to ask specific questions about your loans or account!"""
             query: User query
             
         Returns:
-            Dictionary with validation result
+            Dictionary with validation result and the detected intents
         """
-        query_lower = query.lower()
-        
-        # Out of scope keywords
-        out_of_scope = [
-            "new account", "open account", "new loan application",
-            "credit card", "debit card", "apply for",
-            "password", "otp", "pin"
-        ]
-        
-        # In scope keywords
-        in_scope = [
-            "emi", "loan", "prepay", "prepayment", "outstanding",
-            "balance", "account", "payment", "interest", "tenure"
-        ]
-        
-        # Check for out of scope
-        for keyword in out_of_scope:
-            if keyword in query_lower:
-                return {
-                    "in_scope": False,
-                    "reason": "out_of_scope",
-                    "message": FALLBACK_RESPONSES["out_of_scope"]
-                }
-        
-        # Check for in scope
-        for keyword in in_scope:
-            if keyword in query_lower:
-                return {
-                    "in_scope": True,
-                    "confidence": "high"
-                }
-        
-        # Uncertain queries - allow but with lower confidence
-        return {
-            "in_scope": True,
-            "confidence": "low"
-        }
+        return get_classifier().classify(query)
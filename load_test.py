@@ -0,0 +1,344 @@
+"""HTTP load generator for the chatbot API.
+
+Sends requests to a running app.py (or asgi.py) at a fixed target rate and
+reports latency percentiles, a latency histogram, throughput and error rates
+per endpoint. Requests are started on schedule whether or not earlier ones
+have finished (open loop), and latency is measured from the scheduled start,
+so queueing in an overloaded server shows up in the numbers instead of
+slowing the generator down.
+
+Run it against the stand-in bank and LLM servers to find the saturation
+point offline:
+
+    python mock_llm_server.py &
+    OPENAI_BASE_URL=http://localhost:8001/v1 python app.py &
+    python load_test.py --rps 5,10,20,50 --duration 30 --output load.json
+
+Several rates run as consecutive steps. A step is marked saturated when
+requests queue up in the server (the p90 latency of its last quarter is more
+than twice that of its first quarter) or more than 1% of the requests fail.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import bisect
+import json
+import random
+import sys
+import threading
+import time
+
+import requests
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+HISTOGRAM_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+QUERIES = (
+    "What's my current EMI and can I prepay this month?",
+    "What is my outstanding loan amount?",
+    "When is my next EMI due?",
+    "Can I prepay my home loan and how much will I save?",
+    "What are the prepayment charges on a personal loan?",
+    "How is EMI calculated?",
+    "What happens if I miss an EMI payment?",
+    "Why would reducing my tenure save more interest than reducing my EMI?"
+)
+
+DEMO_LOANS = {"CUST001": ("LOAN001",), "CUST002": ("LOAN002", "LOAN003")}
+
+# Default request mix (endpoint -> weight)
+DEFAULT_MIX = "chat:6,chat_stream:2,prepayment:1,summary:1"
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    """Keep-alive session of the current worker thread."""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def _check(response: requests.Response) -> Optional[str]:
+    """Error label of a response, or None if it succeeded."""
+    if response.status_code >= 400:
+        return f"HTTP {response.status_code}"
+    return None
+
+
+def _chat(base_url: str, customer_id: str, loan_id: str, rng: random.Random, timeout: float) -> Optional[str]:
+    response = _session().post(f"{base_url}/chat", json={
+        "customer_id": customer_id, "query": rng.choice(QUERIES)
+    }, timeout=timeout)
+    error = _check(response)
+    if error is None and not response.json().get("success"):
+        error = "unsuccessful"
+    return error
+
+
+def _chat_stream(base_url: str, customer_id: str, loan_id: str, rng: random.Random, timeout: float) -> Optional[str]:
+    with _session().post(f"{base_url}/chat/stream", json={
+        "customer_id": customer_id, "query": rng.choice(QUERIES)
+    }, timeout=timeout, stream=True) as response:
+        error = _check(response)
+        if error:
+            return error
+        events = set()
+        for line in response.iter_lines(decode_unicode=True):
+            if line and line.startswith("event:"):
+                events.add(line[6:].strip())
+    if "error" in events:
+        return "stream error"
+    if "done" not in events:
+        return "stream incomplete"
+    return None
+
+
+def _prepayment(base_url: str, customer_id: str, loan_id: str, rng: random.Random, timeout: float) -> Optional[str]:
+    response = _session().post(f"{base_url}/prepayment/calculate", json={
+        "customer_id": customer_id,
+        "loan_id": loan_id,
+        "prepayment_amount": round(rng.uniform(10_000, 200_000), -3)
+    }, timeout=timeout)
+    return _check(response)
+
+
+def _summary(base_url: str, customer_id: str, loan_id: str, rng: random.Random, timeout: float) -> Optional[str]:
+    return _check(_session().get(f"{base_url}/customer/{customer_id}/summary", timeout=timeout))
+
+
+ENDPOINTS: Dict[str, Callable[..., Optional[str]]] = {
+    "chat": _chat,
+    "chat_stream": _chat_stream,
+    "prepayment": _prepayment,
+    "summary": _summary
+}
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """Percentile of sorted values (nearest rank)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def _histogram(latencies_ms: List[float]) -> Dict[str, int]:
+    """Count latencies per histogram bucket, keyed by the bucket's upper bound."""
+    counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for latency in latencies_ms:
+        counts[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, latency)] += 1
+    labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+    return dict(zip(labels, counts))
+
+
+def summarize(samples: List[Tuple[str, float, Optional[str], float]]) -> Dict:
+    """
+    Summarize request samples.
+
+    Args:
+        samples: (endpoint, latency in seconds, error or None, scheduled
+            start) per request
+
+    Returns:
+        Dictionary with request and error counts, error rate, throughput,
+        latency percentiles (ms), histogram and error breakdown
+    """
+    latencies = sorted(sample[1] * 1000 for sample in samples)
+    span = max(sample[3] + sample[1] for sample in samples) - min(sample[3] for sample in samples) if samples else 0.0
+    errors: Dict[str, int] = {}
+    for _, _, error, _ in samples:
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+    failed = sum(errors.values())
+
+    return {
+        "requests": len(samples),
+        "errors": failed,
+        "error_rate": round(failed / len(samples), 4) if samples else 0.0,
+        "throughput_per_s": round((len(samples) - failed) / span, 2) if span else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p90_ms": round(_percentile(latencies, 90), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "histogram": _histogram(latencies),
+        "error_breakdown": errors
+    }
+
+
+def _latency_growth(samples: List[Tuple[str, float, Optional[str], float]]) -> float:
+    """
+    Ratio of the p90 latency of the last quarter of a step's requests to that
+    of the first quarter; well above 1 when requests are queueing up.
+    """
+    ordered = sorted(samples, key=lambda sample: sample[3])
+    quarter = len(ordered) // 4
+    if not quarter:
+        return 1.0
+    first = _percentile(sorted(sample[1] for sample in ordered[:quarter]), 90)
+    last = _percentile(sorted(sample[1] for sample in ordered[-quarter:]), 90)
+    return round(last / first, 2) if first else 1.0
+
+
+def run_step(base_url: str, rps: float, duration: float, mix: Dict[str, float], customers: Dict[str, tuple],
+             workers: int = 256, timeout: float = 30, seed: int = 0) -> Dict:
+    """
+    Send requests at a fixed rate for a duration.
+
+    Args:
+        base_url: Base URL of the chatbot API
+        rps: Target requests per second
+        duration: Seconds to send requests for
+        mix: Endpoint name -> relative weight
+        customers: Customer ID -> loan IDs used in the requests
+        workers: Maximum requests in flight
+        timeout: Per-request timeout in seconds
+        seed: Seed of the request mix
+
+    Returns:
+        Summary of all requests and of each endpoint
+    """
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    customer_ids = list(customers)
+    samples: List[Tuple[str, float, Optional[str], float]] = []
+    samples_lock = threading.Lock()
+
+    def send(name: str, customer_id: str, loan_id: str, scheduled: float, request_rng: random.Random):
+        try:
+            error = ENDPOINTS[name](base_url, customer_id, loan_id, request_rng, timeout)
+        except requests.Timeout:
+            error = "timeout"
+        except requests.RequestException as e:
+            error = type(e).__name__
+        latency = time.perf_counter() - scheduled
+        with samples_lock:
+            samples.append((name, latency, error, scheduled))
+
+    total = int(rps * duration)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="load") as executor:
+        for i in range(total):
+            scheduled = started + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            name = rng.choices(names, weights)[0]
+            customer_id = rng.choice(customer_ids)
+            loan_id = rng.choice(customers[customer_id])
+            executor.submit(send, name, customer_id, loan_id, scheduled, random.Random(rng.random()))
+
+    overall = summarize(samples)
+    overall["target_rps"] = rps
+    overall["latency_growth"] = _latency_growth(samples)
+    overall["saturated"] = overall["latency_growth"] > 2 or overall["error_rate"] > 0.01
+    overall["endpoints"] = {
+        name: summarize([sample for sample in samples if sample[0] == name])
+        for name in names
+    }
+    return overall
+
+
+def _print_step(step: Dict):
+    flag = "  SATURATED" if step["saturated"] else ""
+    print(f"\n{step['target_rps']} rps target: {step['throughput_per_s']}/s completed, "
+          f"{step['requests']} requests, error rate {step['error_rate']:.2%}, "
+          f"latency growth x{step['latency_growth']}{flag}")
+    print(f"  latency p50 {step['p50_ms']}ms  p90 {step['p90_ms']}ms  p95 {step['p95_ms']}ms  "
+          f"p99 {step['p99_ms']}ms  max {step['max_ms']}ms")
+
+    largest = max(step["histogram"].values()) or 1
+    for bucket, count in step["histogram"].items():
+        if count:
+            print(f"  {bucket:>10} {count:>7} {'#' * max(1, round(40 * count / largest))}")
+
+    for name, endpoint in step["endpoints"].items():
+        print(f"  {name:<12} {endpoint['requests']:>6} req  p50 {endpoint['p50_ms']}ms  "
+              f"p99 {endpoint['p99_ms']}ms  errors {endpoint['error_rate']:.2%}")
+    for error, count in step["error_breakdown"].items():
+        print(f"  error: {error} x{count}")
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition(":")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r} (one of {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _load_customers(path: str, limit: int) -> Dict[str, tuple]:
+    """Customer and loan IDs from a synthetic customers file (see synthetic_data.py)."""
+    from synthetic_data import read_jsonl
+
+    customers = {}
+    for record in read_jsonl(path):
+        loans = tuple(loan["loan_id"] for loan in record.get("loans", ()))
+        if loans:
+            customers[record["customer_id"]] = loans
+        if len(customers) >= limit:
+            break
+    return customers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the chatbot API at a target request rate.")
+    parser.add_argument("--url", default="http://localhost:5000", help="chatbot API base URL")
+    parser.add_argument("--rps", type=lambda value: [float(rate) for rate in value.split(",")], default=[10.0],
+                        help="comma-separated target rates, run as consecutive steps (default: 10)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per step")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix(DEFAULT_MIX),
+                        help=f"endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--customers-file",
+                        help="synthetic customers file to draw customers from (the server must load it "
+                             "with MOCK_CUSTOMERS_FILE); default: the demo customers")
+    parser.add_argument("--customers-limit", type=int, default=10000,
+                        help="customers read from --customers-file")
+    parser.add_argument("--workers", type=int, default=256, help="maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    customers = _load_customers(args.customers_file, args.customers_limit) if args.customers_file else DEMO_LOANS
+
+    try:
+        requests.get(f"{args.url}/health", timeout=5).raise_for_status()
+    except requests.RequestException as e:
+        raise SystemExit(f"Chatbot API not reachable at {args.url}: {e}")
+
+    steps = []
+    for rps in args.rps:
+        print(f"Running {rps} rps for {args.duration}s...", file=sys.stderr)
+        step = run_step(args.url, rps, args.duration, args.mix, customers,
+                        workers=args.workers, timeout=args.timeout, seed=args.seed)
+        steps.append(step)
+        _print_step(step)
+
+    saturated = [step["target_rps"] for step in steps if step["saturated"]]
+    if saturated:
+        print(f"\nSaturated from {min(saturated)} rps")
+
+    if args.output:
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "url": args.url,
+                "duration": args.duration,
+                "mix": args.mix,
+                "workers": args.workers,
+                "seed": args.seed
+            },
+            "steps": steps
+        }
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Report written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Loan amortization math: EMIs, schedules and the impact of prepayments.
+
+Uses the EMI formula quoted in the loan FAQs:
+
+    EMI = [P x R x (1+R)^N] / [(1+R)^N - 1]
+
+where P is the principal, R the monthly interest rate (annual rate/12/100)
+and N the tenure in months. Scenario figures are computed in closed form, for
+one loan or for many at once with NumPy; full schedules are computed for
+all months at once with NumPy.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import math
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Balances below this are treated as repaid (rounding residue)
+_PAID_OFF = 0.005
+
+
+def monthly_rate(annual_rate: float) -> float:
+    """Monthly interest rate R from an annual percentage rate."""
+    return annual_rate / 12 / 100
+
+
+def calculate_emi(principal: float, annual_rate: float, months: int) -> float:
+    """
+    EMI repaying a principal over a number of months.
+
+    Args:
+        principal: Principal loan amount
+        annual_rate: Annual interest rate in percent
+        months: Tenure in months
+
+    Returns:
+        Monthly installment
+    """
+    if months <= 0:
+        raise ValueError("Tenure must be at least one month")
+    if principal <= 0:
+        return 0.0
+
+    rate = monthly_rate(annual_rate)
+    if rate == 0:
+        return principal / months
+    growth = (1 + rate) ** months
+    return principal * rate * growth / (growth - 1)
+
+
+def _repayment(balance: float, annual_rate: float, emi: float) -> Tuple[int, float, float]:
+    """
+    Repay a balance with a fixed EMI, the last installment covering what is left.
+
+    Returns:
+        (number of installments, last installment, total interest paid)
+    """
+    if balance <= _PAID_OFF:
+        return 0, 0.0, 0.0
+
+    rate = monthly_rate(annual_rate)
+    if emi <= balance * rate:
+        raise ValueError("EMI does not cover the monthly interest; the loan would never be repaid")
+
+    if rate == 0:
+        full_months = math.floor(balance / emi + 1e-9)
+        remaining = balance - emi * full_months
+    else:
+        months = -math.log(1 - balance * rate / emi) / math.log(1 + rate)
+        full_months = math.floor(months + 1e-9)
+        growth = (1 + rate) ** full_months
+        remaining = balance * growth - emi * (growth - 1) / rate
+
+    if remaining > _PAID_OFF:
+        last_installment = remaining * (1 + rate)
+        installments = full_months + 1
+    else:
+        last_installment = emi
+        installments = full_months
+
+    total_paid = emi * full_months + (last_installment if installments > full_months else 0.0)
+    return installments, last_installment, total_paid - balance
+
+
+def remaining_tenure(balance: float, annual_rate: float, emi: float) -> int:
+    """
+    Number of installments left to repay a balance with a given EMI.
+
+    Args:
+        balance: Outstanding amount
+        annual_rate: Annual interest rate in percent
+        emi: Monthly installment
+
+    Returns:
+        Installments, the last one possibly smaller than the EMI
+    """
+    return _repayment(balance, annual_rate, emi)[0]
+
+
+def total_interest(balance: float, annual_rate: float, emi: float) -> float:
+    """
+    Interest paid while repaying a balance with a given EMI.
+
+    Args:
+        balance: Outstanding amount
+        annual_rate: Annual interest rate in percent
+        emi: Monthly installment
+
+    Returns:
+        Total interest over the remaining installments
+    """
+    return _repayment(balance, annual_rate, emi)[2]
+
+
+def amortization_schedule(principal: float, annual_rate: float, emi: Optional[float] = None,
+                          months: Optional[int] = None) -> Dict[str, "np.ndarray"]:
+    """
+    Month-by-month schedule of a loan, computed for all months at once.
+
+    The balance after k installments has the closed form
+    P(1+R)^k - EMI((1+R)^k - 1)/R, so every row is computed with array
+    operations instead of a month-by-month loop.
+
+    Args:
+        principal: Principal (or current outstanding) amount
+        annual_rate: Annual interest rate in percent
+        emi: Monthly installment (default: the EMI repaying over `months`)
+        months: Tenure in months (default: until repaid with `emi`)
+
+    Returns:
+        Dictionary of arrays with one entry per installment: month,
+        opening_balance, installment, interest, principal, closing_balance
+    """
+    if not NUMPY_AVAILABLE:
+        raise ImportError("numpy is required for amortization schedules")
+    if emi is None and months is None:
+        raise ValueError("Either emi or months is required")
+
+    if emi is None:
+        emi = calculate_emi(principal, annual_rate, months)
+    installments, last_installment, _ = _repayment(principal, annual_rate, emi)
+
+    rate = monthly_rate(annual_rate)
+    elapsed = np.arange(installments, dtype=np.float64)
+    if rate == 0:
+        opening = principal - emi * elapsed
+    else:
+        growth = (1 + rate) ** elapsed
+        opening = principal * growth - emi * (growth - 1) / rate
+
+    installment = np.full(installments, emi)
+    if installments:
+        installment[-1] = last_installment
+    interest = opening * rate
+    principal_paid = installment - interest
+    closing = opening - principal_paid
+    if installments:
+        closing[-1] = 0.0
+
+    return {
+        "month": np.arange(1, installments + 1),
+        "opening_balance": opening,
+        "installment": installment,
+        "interest": interest,
+        "principal": principal_paid,
+        "closing_balance": closing
+    }
+
+
+def prepayment_impact(outstanding: float, annual_rate: float, emi: float, prepayment_amount: float) -> Dict:
+    """
+    Compare keeping the loan as is with the two ways of applying a prepayment.
+
+    - reduce_tenure: keep the EMI, finish earlier
+    - reduce_emi: keep the remaining tenure, pay a lower EMI
+
+    Args:
+        outstanding: Current outstanding amount
+        annual_rate: Annual interest rate in percent
+        emi: Current monthly installment
+        prepayment_amount: Amount prepaid
+
+    Returns:
+        Dictionary with "current", "reduce_tenure" and "reduce_emi"
+        scenarios (emi, remaining_months, total_interest) and the interest,
+        months and EMI saved by each option
+    """
+    months, _, interest = _repayment(outstanding, annual_rate, emi)
+    new_outstanding = max(0.0, outstanding - prepayment_amount)
+
+    tenure_months, _, tenure_interest = _repayment(new_outstanding, annual_rate, emi)
+
+    if new_outstanding > _PAID_OFF:
+        reduced_emi = calculate_emi(new_outstanding, annual_rate, months)
+        emi_months, _, emi_interest = _repayment(new_outstanding, annual_rate, reduced_emi)
+    else:
+        reduced_emi, emi_months, emi_interest = 0.0, 0, 0.0
+
+    return _impact(emi, months, interest, tenure_months, tenure_interest, reduced_emi, emi_months, emi_interest)
+
+
+def _impact(emi: float, months: int, interest: float, tenure_months: int, tenure_interest: float,
+            reduced_emi: float, emi_months: int, emi_interest: float) -> Dict:
+    """Scenario dictionary of prepayment_impact from the computed figures."""
+    return {
+        "current": {
+            "emi": round(emi, 2),
+            "remaining_months": months,
+            "total_interest": round(interest, 2)
+        },
+        "reduce_tenure": {
+            "emi": round(emi, 2) if tenure_months else 0.0,
+            "remaining_months": tenure_months,
+            "total_interest": round(tenure_interest, 2),
+            "interest_saved": round(interest - tenure_interest, 2),
+            "months_saved": months - tenure_months
+        },
+        "reduce_emi": {
+            "emi": round(reduced_emi, 2),
+            "remaining_months": emi_months,
+            "total_interest": round(emi_interest, 2),
+            "interest_saved": round(interest - emi_interest, 2),
+            "emi_reduction": round(emi - reduced_emi, 2)
+        }
+    }
+
+
+def _repayments(balance: "np.ndarray", annual_rate: "np.ndarray",
+                emi: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    _repayment for arrays of loans.
+
+    Returns:
+        (installments, total interest paid, whether the EMI repays the balance),
+        one entry per loan; the first two are 0 where it does not
+    """
+    rate = monthly_rate(annual_rate)
+    paid = balance <= _PAID_OFF
+    valid = paid | (emi > balance * rate)
+    active = valid & ~paid
+    interest_free = rate == 0
+
+    # Substitute harmless values where a formula does not apply, so no
+    # entry divides by zero or takes the log of a non-positive number
+    safe_emi = np.where(active, emi, 1.0)
+    safe_rate = np.where(interest_free, 1.0, rate)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        coverage = np.where(active & ~interest_free, balance * rate / safe_emi, 0.0)
+        months = np.where(
+            interest_free, balance / safe_emi, -np.log(1 - coverage) / np.log(1 + safe_rate)
+        )
+    full_months = np.floor(np.where(active, months, 0.0) + 1e-9)
+    growth = (1 + rate) ** full_months
+    remaining = np.where(
+        interest_free,
+        balance - emi * full_months,
+        balance * growth - emi * (growth - 1) / safe_rate
+    )
+
+    extra = active & (remaining > _PAID_OFF)
+    installments = np.where(active, full_months + extra, 0).astype(np.int64)
+    total_paid = emi * full_months + np.where(extra, remaining * (1 + rate), 0.0)
+    return installments, np.where(active, total_paid - balance, 0.0), valid
+
+
+def _emis(principal: "np.ndarray", annual_rate: "np.ndarray", months: "np.ndarray") -> "np.ndarray":
+    """calculate_emi for arrays of loans with positive tenures (0 where the principal is repaid)."""
+    rate = monthly_rate(annual_rate)
+    safe_months = np.maximum(months, 1)
+    growth = (1 + rate) ** safe_months
+    with np.errstate(divide="ignore", invalid="ignore"):
+        emi = np.where(rate == 0, principal / safe_months, principal * rate * growth / (growth - 1))
+    return np.where(principal > 0, emi, 0.0)
+
+
+def prepayment_impacts(outstanding: Sequence[float], annual_rate: Sequence[float], emi: Sequence[float],
+                       prepayment_amount: Sequence[float]) -> List[Optional[Dict]]:
+    """
+    prepayment_impact for many loans at once.
+
+    All three scenarios are computed as NumPy array operations over the
+    loans; only the result dictionaries are built per loan.
+
+    Args:
+        outstanding: Current outstanding amounts
+        annual_rate: Annual interest rates in percent
+        emi: Current monthly installments
+        prepayment_amount: Amounts prepaid
+
+    Returns:
+        One prepayment_impact result per loan, or None where the EMI does
+        not cover the monthly interest
+    """
+    if not NUMPY_AVAILABLE:
+        raise ImportError("numpy is required for batch prepayment impacts")
+
+    outstanding = np.asarray(outstanding, dtype=np.float64)
+    annual_rate = np.asarray(annual_rate, dtype=np.float64)
+    emi = np.asarray(emi, dtype=np.float64)
+    new_outstanding = np.maximum(0.0, outstanding - np.asarray(prepayment_amount, dtype=np.float64))
+
+    months, interest, valid = _repayments(outstanding, annual_rate, emi)
+    tenure_months, tenure_interest, _ = _repayments(new_outstanding, annual_rate, emi)
+    reduced_emi = np.where(new_outstanding > _PAID_OFF, _emis(new_outstanding, annual_rate, months), 0.0)
+    emi_months, emi_interest, _ = _repayments(new_outstanding, annual_rate, reduced_emi)
+
+    # Python floats and ints, so rounding and JSON output match prepayment_impact
+    return [
+        _impact(*figures) if is_valid else None
+        for is_valid, *figures in zip(
+            valid.tolist(), emi.tolist(), months.tolist(), interest.tolist(),
+            tenure_months.tolist(), tenure_interest.tolist(),
+            reduced_emi.tolist(), emi_months.tolist(), emi_interest.tolist()
+        )
+    ]
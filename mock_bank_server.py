@@ -0,0 +1,103 @@
+"""Stand-in core-banking API serving the demo customer data over HTTP.
+
+Serves the same data shape as the mock BankAPIClient, with a configurable
+simulated latency, so the HTTP client mode (BANK_API_MODE=http) can be run
+and load-tested offline.
+
+    python mock_bank_server.py
+
+Endpoints:
+    GET /health
+    GET /customers/<customer_id>           account and loans
+    GET /customers/<customer_id>/account   account details
+    GET /customers/<customer_id>/loans     loan details
+    POST /customers/batch                  {"customer_ids": [...]} -> several customers
+"""
+import random
+import time
+
+from flask import Flask, jsonify, request
+
+from bank_api_client import BankAPIClient
+import config
+
+app = Flask(__name__)
+bank = BankAPIClient(mode="mock")
+
+
+def _simulate_latency():
+    """Sleep for the configured latency plus random jitter."""
+    delay_ms = config.MOCK_BANK_LATENCY_MS + random.uniform(-1, 1) * config.MOCK_BANK_JITTER_MS
+    if delay_ms > 0:
+        time.sleep(delay_ms / 1000)
+
+
+def _not_found(customer_id: str):
+    return jsonify({"error": f"Customer {customer_id} not found"}), 404
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint."""
+    return jsonify({"status": "healthy", "service": "mock-bank-api"}), 200
+
+
+@app.route('/customers/<customer_id>', methods=['GET'])
+def get_customer(customer_id):
+    """Account and loan data of a customer."""
+    _simulate_latency()
+    customer = bank.get_all_customer_data(customer_id)
+    if not customer:
+        return _not_found(customer_id)
+    return jsonify(customer.to_dict()), 200
+
+
+@app.route('/customers/batch', methods=['POST'])
+def get_customers():
+    """
+    Account and loan data of several customers in one round trip.
+    
+    Unknown IDs are listed in "not_found".
+    """
+    _simulate_latency()
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('customer_ids'), list):
+        return jsonify({"error": "Missing required field: customer_ids (list)"}), 400
+    
+    customers = {}
+    not_found = []
+    for customer_id in data['customer_ids']:
+        customer = bank.get_all_customer_data(customer_id)
+        if customer:
+            customers[customer_id] = customer.to_dict()
+        else:
+            not_found.append(customer_id)
+    
+    return jsonify({"customers": customers, "not_found": not_found}), 200
+
+
+@app.route('/customers/<customer_id>/account', methods=['GET'])
+def get_account(customer_id):
+    """Account details of a customer."""
+    _simulate_latency()
+    account = bank.get_account_details(customer_id)
+    if not account:
+        return _not_found(customer_id)
+    return jsonify(account), 200
+
+
+@app.route('/customers/<customer_id>/loans', methods=['GET'])
+def get_loans(customer_id):
+    """Loan details of a customer."""
+    _simulate_latency()
+    loans = bank.get_loan_details(customer_id)
+    if loans is None:
+        return _not_found(customer_id)
+    return jsonify([loan.to_dict() for loan in loans]), 200
+
+
+if __name__ == '__main__':
+    print("Starting mock bank API...")
+    print(f"Server running on http://{config.FLASK_HOST}:{config.MOCK_BANK_PORT}")
+    print(f"Simulated latency: {config.MOCK_BANK_LATENCY_MS}ms ± {config.MOCK_BANK_JITTER_MS}ms")
+    app.run(host=config.FLASK_HOST, port=config.MOCK_BANK_PORT, threaded=True)
@@ -0,0 +1,221 @@
+"""Stand-in OpenAI-compatible chat completions API for offline load tests.
+
+Answers POST /v1/chat/completions (plain and streamed) like the OpenAI API,
+with a configurable time to first token, token rate and injected errors, so
+the LLM path of the chatbot can be load-tested without API quota. Point the
+chatbot at it with OPENAI_BASE_URL:
+
+    python mock_llm_server.py
+    OPENAI_BASE_URL=http://localhost:8001/v1 python app.py
+
+Endpoints:
+    GET /health
+    GET /stats                      requests served, errors injected, streams aborted
+    GET /v1/models
+    POST /v1/chat/completions       {"model", "messages", "max_tokens", "stream"}
+"""
+from typing import Dict, Iterator, List
+import json
+import math
+import random
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+import config
+
+app = Flask(__name__)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+# Words the simulated answers are made of (one word per token)
+_WORDS = (
+    "Based on your loan details, your EMI is due on the scheduled date and prepayment "
+    "reduces the outstanding principal. Charges depend on the loan type and the bank's "
+    "policy, so please review the terms before you proceed with the payment."
+).split()
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "streams": 0, "errors_injected": 0, "streams_aborted": 0, "tokens": 0}
+
+
+def _count(**increments: int):
+    with _stats_lock:
+        for name, value in increments.items():
+            _stats[name] += value
+
+
+def _time_to_first_token() -> float:
+    """Draw a time to first token in seconds from the configured distribution."""
+    latency = config.MOCK_LLM_LATENCY_MS
+    jitter = config.MOCK_LLM_JITTER_MS
+    distribution = config.MOCK_LLM_LATENCY_DISTRIBUTION
+
+    if distribution == "uniform":
+        delay_ms = latency + random.uniform(-1, 1) * jitter
+    elif distribution == "normal":
+        delay_ms = random.gauss(latency, jitter)
+    elif distribution == "lognormal" and latency > 0:
+        delay_ms = random.lognormvariate(math.log(latency), jitter / latency)
+    else:
+        delay_ms = latency
+    return max(0.0, delay_ms) / 1000
+
+
+def _token_interval() -> float:
+    """Seconds between generated tokens."""
+    rate = config.MOCK_LLM_TOKENS_PER_SECOND
+    return 1 / rate if rate > 0 else 0.0
+
+
+def _tokens(max_tokens: int) -> List[str]:
+    """Tokens of a simulated answer of up to max_tokens tokens."""
+    count = max(1, min(max_tokens, config.MOCK_LLM_RESPONSE_TOKENS))
+    return [("" if i == 0 else " ") + _WORDS[i % len(_WORDS)] for i in range(count)]
+
+
+def _prompt_tokens(messages: list) -> int:
+    """Rough prompt size in tokens (about four characters per token)."""
+    return sum(len(str(message.get("content", ""))) for message in messages if isinstance(message, dict)) // 4
+
+
+def _error_response():
+    """OpenAI-style error response with the configured status."""
+    _count(errors_injected=1)
+    status = config.MOCK_LLM_ERROR_STATUS
+    error_type = "rate_limit_exceeded" if status == 429 else "server_error"
+    return jsonify({"error": {
+        "message": f"Injected error ({status})",
+        "type": error_type,
+        "code": error_type
+    }}), status
+
+
+def _completion(completion_id: str, model: str, text: str, prompt_tokens: int, completion_tokens: int) -> Dict:
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+
+def _chunk(completion_id: str, model: str, delta: Dict, finish_reason=None) -> str:
+    """One server-sent event of a streamed completion."""
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def _stream(completion_id: str, model: str, tokens: List[str], abort: bool) -> Iterator[str]:
+    """
+    Stream a completion token by token at the configured rate.
+
+    Aborted streams end without the finish chunk and [DONE] after a few tokens,
+    like a dropped upstream connection.
+    """
+    interval = _token_interval()
+    yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+    for i, token in enumerate(tokens):
+        if abort and i == min(3, len(tokens) - 1):
+            _count(streams_aborted=1)
+            return
+        if i:
+            time.sleep(interval)
+        yield _chunk(completion_id, model, {"content": token})
+    yield _chunk(completion_id, model, {}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint."""
+    return jsonify({"status": "healthy", "service": "mock-llm-api"}), 200
+
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Requests served and faults injected since startup."""
+    with _stats_lock:
+        return jsonify(dict(_stats)), 200
+
+
+@app.route('/v1/models', methods=['GET'])
+def list_models():
+    """Models accepted by the stand-in (any name is answered)."""
+    return jsonify({"object": "list", "data": [
+        {"id": config.LLM_MODEL, "object": "model", "created": 0, "owned_by": "mock-llm-api"}
+    ]}), 200
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    """
+    OpenAI-compatible chat completion.
+
+    Waits a time to first token drawn from the latency distribution, then
+    generates tokens at MOCK_LLM_TOKENS_PER_SECOND (streamed as server-sent
+    events when "stream" is true).
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('messages'), list):
+        return jsonify({"error": {
+            "message": "Missing required field: messages (list)",
+            "type": "invalid_request_error",
+            "code": None
+        }}), 400
+
+    _count(requests=1)
+    if random.random() < config.MOCK_LLM_ERROR_RATE:
+        return _error_response()
+
+    model = data.get('model') or config.LLM_MODEL
+    tokens = _tokens(int(data.get('max_tokens') or config.MOCK_LLM_RESPONSE_TOKENS))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    _count(tokens=len(tokens))
+
+    time.sleep(_time_to_first_token())
+
+    if data.get('stream'):
+        _count(streams=1)
+        abort = random.random() < config.MOCK_LLM_STREAM_ABORT_RATE
+        return Response(
+            _stream(completion_id, model, tokens, abort),
+            mimetype='text/event-stream',
+            headers={"Cache-Control": "no-cache"}
+        )
+
+    time.sleep(_token_interval() * (len(tokens) - 1))
+    return jsonify(_completion(
+        completion_id, model, "".join(tokens), _prompt_tokens(data['messages']), len(tokens)
+    )), 200
+
+
+if __name__ == '__main__':
+    if config.MOCK_LLM_LATENCY_DISTRIBUTION not in LATENCY_DISTRIBUTIONS:
+        raise SystemExit(
+            f"MOCK_LLM_LATENCY_DISTRIBUTION must be one of {', '.join(LATENCY_DISTRIBUTIONS)}"
+        )
+    print("Starting mock LLM API...")
+    print(f"Server running on http://{config.FLASK_HOST}:{config.MOCK_LLM_PORT}/v1")
+    print(f"Time to first token: {config.MOCK_LLM_LATENCY_MS}ms ({config.MOCK_LLM_LATENCY_DISTRIBUTION}, "
+          f"jitter {config.MOCK_LLM_JITTER_MS}ms), {config.MOCK_LLM_TOKENS_PER_SECOND} tokens/s, "
+          f"error rate {config.MOCK_LLM_ERROR_RATE:.0%}")
+    app.run(host=config.FLASK_HOST, port=config.MOCK_LLM_PORT, threaded=True)
@@ -1,4 +1,9 @@
 """Prompt templates for the banking chatbot with strict system prompts."""
+from typing import List, Optional, Tuple
+
+import config
+from cache import LRUCache
+from records import Customer
 
 SYSTEM_PROMPT = """You are a professional banking support assistant for an established bank. Your role is to help existing customers manage their loans.
 
@@ -28,76 +33,254 @@ RESPONSE GUIDELINES:
 - Format numbers with proper currency symbols (₹)"""
 
 
-def create_query_prompt(user_query: str, customer_data: dict, retrieved_context: dict) -> str:
+def estimate_tokens(text: str) -> int:
     """
-    Create a structured prompt for the LLM with retrieved context and customer data.
+    Estimate the number of LLM tokens in a text (about 4 characters per token).
+    
+    Args:
+        text: Text to measure
+        
+    Returns:
+        Estimated token count
+    """
+    return (len(text) + 3) // 4
+
+
+SYSTEM_PROMPT_TOKENS = estimate_tokens(SYSTEM_PROMPT)
+
+QUERY_INSTRUCTIONS = "\n".join([
+    "=== INSTRUCTIONS ===",
+    "Based on the context information provided above, answer the user's query accurately and professionally.",
+    "Use ONLY the information from the context. If you need information not available in the context, clearly state that.",
+    "Format your response in a clear, friendly manner suitable for a customer."
+])
+
+# Latest customer record and its rendered section, keyed by customer ID
+_customer_sections = LRUCache(max_size=config.PROMPT_CUSTOMER_CACHE_SIZE)
+
+
+def _account_lines(customer_data: dict) -> List[str]:
+    """Render the CUSTOMER DATA lines of the prompt."""
+    prompt_parts = ["CUSTOMER DATA:"]
+    if "name" in customer_data:
+        prompt_parts.append(f"Customer Name: {customer_data['name']}")
+    if "account_number" in customer_data:
+        prompt_parts.append(f"Account Number: {customer_data['account_number']}")
+    if "account_balance" in customer_data:
+        prompt_parts.append(f"Account Balance: ₹{customer_data['account_balance']:,.2f}")
+    return prompt_parts
+
+
+def _loan_block(loan: dict) -> str:
+    """Render the LOAN DETAILS lines of one loan."""
+    prompt_parts = [f"\nLoan ID: {loan['loan_id']}"]
+    prompt_parts.append(f"  Type: {loan['loan_type']}")
+    prompt_parts.append(f"  Outstanding Amount: ₹{loan['outstanding_amount']:,.2f}")
+    prompt_parts.append(f"  EMI Amount: ₹{loan['emi_amount']:,.2f}")
+    prompt_parts.append(f"  EMI Date: {loan['emi_date']} of each month")
+    prompt_parts.append(f"  Next EMI Date: {loan['next_emi_date']}")
+    prompt_parts.append(f"  Interest Rate: {loan['interest_rate']}% p.a.")
+    prompt_parts.append(f"  Remaining Months: {loan['remaining_months']}")
+    prompt_parts.append(f"  Prepayment Allowed: {'Yes' if loan['prepayment_allowed'] else 'No'}")
+    if loan['prepayment_allowed']:
+        prompt_parts.append(f"  Prepayment Charges: {loan['prepayment_charges']}%")
+    return "\n".join(prompt_parts)
+
+
+def _render_customer_section(customer_data: dict) -> str:
+    """Render the CUSTOMER DATA and LOAN DETAILS lines of the prompt."""
+    prompt_parts = _account_lines(customer_data)
+    
+    if "loans" in customer_data and customer_data["loans"]:
+        prompt_parts.append("\nLOAN DETAILS:")
+        prompt_parts.extend(_loan_block(loan) for loan in customer_data["loans"])
+    
+    prompt_parts.append("")
+    return "\n".join(prompt_parts)
+
+
+def _omitted_loans_note(omitted: int) -> str:
+    return f"\n(Details of {omitted} more loan{'s' if omitted != 1 else ''} are not included here.)"
+
+
+def _fit_customer_section(customer_data: dict, token_budget: int) -> Tuple[str, int]:
+    """
+    Render the customer section with only as many loans as fit in a token budget.
+    
+    Loans are kept in order; a note tells the LLM how many were left out.
+    
+    Returns:
+        Tuple of (section, number of loans left out)
+    """
+    prompt_parts = _account_lines(customer_data)
+    loans = list(customer_data.get("loans") or ())
+    if not loans:
+        return _render_customer_section(customer_data), 0
+    prompt_parts.append("\nLOAN DETAILS:")
+    
+    # Characters of the joined section so far, counting a newline per part
+    # and the trailing empty line
+    length = sum(len(part) + 1 for part in prompt_parts)
+    included = 0
+    for loan in loans:
+        block = _loan_block(loan)
+        omitted_after = len(loans) - included - 1
+        note_length = len(_omitted_loans_note(omitted_after)) + 1 if omitted_after else 0
+        # estimate_tokens allows 4 characters per token
+        if length + len(block) + 1 + note_length > token_budget * 4:
+            break
+        prompt_parts.append(block)
+        length += len(block) + 1
+        included += 1
+    
+    omitted = len(loans) - included
+    if omitted:
+        prompt_parts.append(_omitted_loans_note(omitted))
+    prompt_parts.append("")
+    return "\n".join(prompt_parts), omitted
+
+
+def customer_section(customer_data: dict) -> str:
+    """
+    Get the rendered customer section, reusing it while the record is the same.
+    
+    Args:
+        customer_data: Customer account and loan data from API
+        
+    Returns:
+        Customer section of the prompt
+    """
+    # Customer records are never modified once built, so the record fetched
+    # from the bank API identifies its data; plain dicts may change in place
+    if not isinstance(customer_data, Customer):
+        return _render_customer_section(customer_data)
+    
+    entry = _customer_sections.get(customer_data.customer_id)
+    if entry is not None and entry[0] is customer_data:
+        return entry[1]
+    section = _render_customer_section(customer_data)
+    _customer_sections.set(customer_data.customer_id, (customer_data, section))
+    return section
+
+
+def _select_documents(retrieved_context: dict, token_budget: Optional[int]) -> tuple:
+    """
+    Pick the retrieved documents that fit in the token budget, best score first.
+    
+    At most 3 FAQs and 3 policies are considered.
+    
+    Returns:
+        Tuple of (FAQs, policies) to include, each in retrieval order
+    """
+    candidates = [
+        (collection, rank, document)
+        for collection in ("faqs", "policies")
+        for rank, document in enumerate(retrieved_context.get(collection, [])[:3])
+    ]
+    if token_budget is not None:
+        # Highest score first; ties keep FAQs before policies and retrieval order
+        candidates.sort(key=lambda candidate: -candidate[2].get("score", 0.0))
+        selected, used = [], 0
+        for candidate in candidates:
+            # Heading line ("FAQ n:") plus the content
+            cost = estimate_tokens(candidate[2]["content"]) + 3
+            if used + cost > token_budget:
+                continue
+            selected.append(candidate)
+            used += cost
+        candidates = sorted(selected, key=lambda candidate: (candidate[0] != "faqs", candidate[1]))
+    
+    faqs = [document for collection, _, document in candidates if collection == "faqs"]
+    policies = [document for collection, _, document in candidates if collection == "policies"]
+    return faqs, policies
+
+
+def build_query_prompt(user_query: str, customer_data: dict, retrieved_context: dict,
+                       token_budget: Optional[int] = config.PROMPT_TOKEN_BUDGET) -> Tuple[str, dict]:
+    """
+    Assemble the query prompt within a token budget.
+    
+    The system prompt, account data, query and instructions are always
+    included. Loan details are included in order while they fit (a note
+    tells the LLM how many loans were left out), and retrieved FAQs and
+    policies fill the remaining budget in order of relevance score.
     
     Args:
         user_query: The user's natural language query
         customer_data: Customer account and loan data from API
         retrieved_context: Retrieved FAQs and policies from vector DB
+        token_budget: Estimated tokens allowed for system prompt plus prompt
+            (None or 0 for no limit)
         
     Returns:
-        Formatted prompt string
+        Tuple of (prompt, details) where details holds "prompt_tokens"
+        (system prompt included), "token_budget", the "document_ids" used and
+        the number of "loans_omitted"
     """
-    prompt_parts = []
+    head = "=== CONTEXT INFORMATION ===\n"
+    tail = f"=== USER QUERY ===\n{user_query}\n\n{QUERY_INSTRUCTIONS}"
+    loans_omitted = 0
+    if customer_data:
+        section = customer_section(customer_data)
+        if token_budget:
+            # Room for the customer section (one token for the newline before it)
+            available = token_budget - SYSTEM_PROMPT_TOKENS - estimate_tokens(head) - estimate_tokens(tail) - 12 - 1
+            if estimate_tokens(section) > available:
+                section, loans_omitted = _fit_customer_section(customer_data, available)
+        head += "\n" + section
     
-    # Add context section
-    prompt_parts.append("=== CONTEXT INFORMATION ===\n")
+    remaining = None
+    if token_budget:
+        remaining = token_budget - SYSTEM_PROMPT_TOKENS - estimate_tokens(head) - estimate_tokens(tail) - 12
+    faqs, policies = _select_documents(retrieved_context, remaining)
     
-    # Add customer data if available
-    if customer_data:
-        prompt_parts.append("CUSTOMER DATA:")
-        if "name" in customer_data:
-            prompt_parts.append(f"Customer Name: {customer_data['name']}")
-        if "account_number" in customer_data:
-            prompt_parts.append(f"Account Number: {customer_data['account_number']}")
-        if "account_balance" in customer_data:
-            prompt_parts.append(f"Account Balance: ₹{customer_data['account_balance']:,.2f}")
-        
-        if "loans" in customer_data and customer_data["loans"]:
-            prompt_parts.append("\nLOAN DETAILS:")
-            for loan in customer_data["loans"]:
-                prompt_parts.append(f"\nLoan ID: {loan['loan_id']}")
-                prompt_parts.append(f"  Type: {loan['loan_type']}")
-                prompt_parts.append(f"  Outstanding Amount: ₹{loan['outstanding_amount']:,.2f}")
-                prompt_parts.append(f"  EMI Amount: ₹{loan['emi_amount']:,.2f}")
-                prompt_parts.append(f"  EMI Date: {loan['emi_date']} of each month")
-                prompt_parts.append(f"  Next EMI Date: {loan['next_emi_date']}")
-                prompt_parts.append(f"  Interest Rate: {loan['interest_rate']}% p.a.")
-                prompt_parts.append(f"  Remaining Months: {loan['remaining_months']}")
-                prompt_parts.append(f"  Prepayment Allowed: {'Yes' if loan['prepayment_allowed'] else 'No'}")
-                if loan['prepayment_allowed']:
-                    prompt_parts.append(f"  Prepayment Charges: {loan['prepayment_charges']}%")
-        
-        prompt_parts.append("")
+    prompt_parts = [head]
     
     # Add retrieved FAQs
-    if retrieved_context.get("faqs"):
+    if faqs:
         prompt_parts.append("RELEVANT FAQs:")
-        for i, faq in enumerate(retrieved_context["faqs"][:3], 1):
+        for i, faq in enumerate(faqs, 1):
             prompt_parts.append(f"\nFAQ {i}:")
             prompt_parts.append(faq["content"])
         prompt_parts.append("")
     
     # Add retrieved policies
-    if retrieved_context.get("policies"):
+    if policies:
         prompt_parts.append("RELEVANT POLICIES:")
-        for i, policy in enumerate(retrieved_context["policies"][:3], 1):
+        for i, policy in enumerate(policies, 1):
             prompt_parts.append(f"\nPolicy {i}:")
             prompt_parts.append(policy["content"])
         prompt_parts.append("")
     
-    # Add the actual query
-    prompt_parts.append("=== USER QUERY ===")
-    prompt_parts.append(user_query)
-    prompt_parts.append("")
-    prompt_parts.append("=== INSTRUCTIONS ===")
-    prompt_parts.append("Based on the context information provided above, answer the user's query accurately and professionally.")
-    prompt_parts.append("Use ONLY the information from the context. If you need information not available in the context, clearly state that.")
-    prompt_parts.append("Format your response in a clear, friendly manner suitable for a customer.")
+    prompt_parts.append(tail)
+    prompt = "\n".join(prompt_parts)
     
-    return "\n".join(prompt_parts)
+    prompt_tokens = SYSTEM_PROMPT_TOKENS + estimate_tokens(prompt)
+    if token_budget and prompt_tokens > token_budget:
+        # Only the fixed parts (e.g. a very long query) are left to blame
+        print(f"Prompt warning: {prompt_tokens} estimated tokens exceed the budget of {token_budget}")
+    
+    return prompt, {
+        "prompt_tokens": prompt_tokens,
+        "token_budget": token_budget or None,
+        "document_ids": [document["metadata"].get("id") for document in faqs + policies],
+        "loans_omitted": loans_omitted
+    }
+
+
+def create_query_prompt(user_query: str, customer_data: dict, retrieved_context: dict) -> str:
+    """
+    Create a structured prompt for the LLM with retrieved context and customer data.
+    
+    Args:
+        user_query: The user's natural language query
+        customer_data: Customer account and loan data from API
+        retrieved_context: Retrieved FAQs and policies from vector DB
+        
+    Returns:
+        Formatted prompt string
+    """
+    return build_query_prompt(user_query, customer_data, retrieved_context, token_budget=None)[0]
 
 
 def create_prepayment_calculation_prompt(loan_data: dict, prepayment_amount: float, calculation_result: dict) -> str:
@@ -126,13 +309,65 @@ def create_prepayment_calculation_prompt(loan_data: dict, prepayment_amount: flo
     prompt_parts.append(f"- New Outstanding: ₹{calculation_result['new_outstanding']:,.2f}")
     prompt_parts.append(f"- Amount Reduced: ₹{calculation_result['current_outstanding'] - calculation_result['new_outstanding']:,.2f}")
     
+    impact = calculation_result.get("impact")
+    if impact:
+        current = impact["current"]
+        reduce_tenure = impact["reduce_tenure"]
+        reduce_emi = impact["reduce_emi"]
+        prompt_parts.append(f"\nSAVINGS (at {loan_data['interest_rate']}% interest):")
+        prompt_parts.append(f"- Without Prepayment: EMI ₹{current['emi']:,.2f} for {current['remaining_months']} more months, total interest ₹{current['total_interest']:,.2f}")
+        prompt_parts.append(f"- Option 1, Reduce Tenure: same EMI for {reduce_tenure['remaining_months']} months ({reduce_tenure['months_saved']} fewer EMIs), interest saved ₹{reduce_tenure['interest_saved']:,.2f}")
+        prompt_parts.append(f"- Option 2, Reduce EMI: EMI ₹{reduce_emi['emi']:,.2f} (₹{reduce_emi['emi_reduction']:,.2f} lower) for {reduce_emi['remaining_months']} months, interest saved ₹{reduce_emi['interest_saved']:,.2f}")
+    
     prompt_parts.append("\n=== INSTRUCTIONS ===")
     prompt_parts.append("Explain this prepayment calculation to the customer in a clear and friendly manner.")
+    if impact:
+        prompt_parts.append("Use the savings figures above exactly as given; do not recalculate them. Compare the two options.")
     prompt_parts.append("Mention the benefits of prepayment and confirm if they would like to proceed.")
     
     return "\n".join(prompt_parts)
 
 
+def create_prepayment_batch_summary_prompt(results: list, max_scenarios: int = 20) -> str:
+    """
+    Create a prompt summarizing a batch of prepayment scenarios.
+    
+    Args:
+        results: Batch calculation rows (customer_id, loan_id and the calculation)
+        max_scenarios: Maximum number of scenarios listed in the prompt
+        
+    Returns:
+        Formatted prompt for one summary of all scenarios
+    """
+    calculated = [row for row in results if row.get("allowed")]
+    
+    prompt_parts = []
+    
+    prompt_parts.append("=== PREPAYMENT SCENARIOS ===\n")
+    prompt_parts.append(f"Scenarios: {len(results)} ({len(calculated)} calculated, {len(results) - len(calculated)} not possible)")
+    for row in calculated[:max_scenarios]:
+        prompt_parts.append(
+            f"- {row['customer_id']} / {row['loan_id']} ({row['loan_type']}): "
+            f"prepay ₹{row['prepayment_amount']:,.2f}, "
+            f"charges ₹{row['prepayment_charge']:,.2f} ({row['prepayment_charge_percentage']}%), "
+            f"total ₹{row['total_amount_to_pay']:,.2f}, "
+            f"outstanding ₹{row['current_outstanding']:,.2f} -> ₹{row['new_outstanding']:,.2f}"
+            + (
+                f", interest saved ₹{row['impact']['reduce_tenure']['interest_saved']:,.2f} "
+                f"({row['impact']['reduce_tenure']['months_saved']} fewer EMIs) if tenure is reduced"
+                if row.get("impact") else ""
+            )
+        )
+    if len(calculated) > max_scenarios:
+        prompt_parts.append(f"- ... and {len(calculated) - max_scenarios} more scenarios")
+    
+    prompt_parts.append("\n=== INSTRUCTIONS ===")
+    prompt_parts.append("Summarize these prepayment scenarios for a relationship manager in a few sentences.")
+    prompt_parts.append("Compare the scenarios, point out the charges involved and which options reduce the outstanding the most.")
+    
+    return "\n".join(prompt_parts)
+
+
 FALLBACK_RESPONSES = {
     "out_of_scope": "I apologize, but I can only assist with questions related to your existing loans, EMIs, and account management. For other banking services, please contact our customer care at 1800-XXX-XXXX or visit your nearest branch.",
     "no_customer_data": "I don't have access to your account information at the moment. Please ensure you're logged in or contact customer support for assistance.",
@@ -0,0 +1,331 @@
+"""Staged, lazily evaluated query processing for the banking chatbot."""
+from concurrent.futures import Executor, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Optional, TYPE_CHECKING
+import asyncio
+import threading
+import time
+
+if TYPE_CHECKING:
+    from chatbot_service import BankingChatbot
+
+# Stages of a query, in the order they can run
+STAGES = ("scope", "intent", "customer", "retrieval", "prompt", "generate")
+
+# The query prompt uses at most the top 3 FAQs and the top 3 policies
+RESULTS_PER_COLLECTION = 3
+
+
+class StageTimeoutError(Exception):
+    """A pipeline stage did not finish within its timeout."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"Stage '{stage}' timed out after {timeout}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class StageStats:
+    """Thread-safe counters of how often each pipeline stage ran or was skipped."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.runs = {stage: 0 for stage in STAGES}
+        self.skips = {stage: 0 for stage in STAGES}
+        self.seconds = {stage: 0.0 for stage in STAGES}
+        self.timeouts = {stage: 0 for stage in STAGES}
+        self.cancellations = {stage: 0 for stage in STAGES}
+
+    def record(self, pipeline: "QueryPipeline") -> None:
+        """
+        Account for a finished pipeline.
+
+        Args:
+            pipeline: Pipeline whose request is complete
+        """
+        with self._lock:
+            self.requests += 1
+            for stage in STAGES:
+                if stage in pipeline.timings:
+                    self.runs[stage] += 1
+                    self.seconds[stage] += pipeline.timings[stage]
+                else:
+                    self.skips[stage] += 1
+            for stage in pipeline.timed_out:
+                self.timeouts[stage] += 1
+            for stage in pipeline.cancelled:
+                self.cancellations[stage] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report stage counters.
+
+        Returns:
+            Dictionary with the request count and runs, skips, timeouts,
+            cancellations and average duration per stage
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "stages": {
+                    stage: {
+                        "runs": self.runs[stage],
+                        "skips": self.skips[stage],
+                        "timeouts": self.timeouts[stage],
+                        "cancellations": self.cancellations[stage],
+                        "avg_ms": round(self.seconds[stage] / self.runs[stage] * 1000, 3) if self.runs[stage] else 0.0
+                    }
+                    for stage in STAGES
+                }
+            }
+
+
+class QueryPipeline:
+    """
+    Per-request state of a chat query.
+
+    Each stage (scope, intent, customer, retrieval, prompt, generate) is
+    computed on first access and memoized, so a stage only runs if a later
+    step actually needs its output. For example, a prepayment calculation
+    never triggers retrieval, and an out-of-scope query never reaches the
+    bank API. Stages that never ran are counted as skipped when the
+    pipeline is recorded.
+
+    Independent stages (customer fetch and retrieval) can be started early
+    with fan_out(); they then run concurrently on the shared executor and
+    the first access waits for them, up to the stage timeout.
+    """
+
+    def __init__(self, chatbot: "BankingChatbot", customer_id: str, query: str,
+                 executor: Optional[Executor] = None, timeouts: Optional[Dict[str, float]] = None,
+                 response_mode: str = "llm"):
+        """
+        Initialize the pipeline.
+
+        Args:
+            chatbot: Chatbot providing the services
+            customer_id: Customer identifier
+            query: Natural language query from user
+            executor: Executor running fanned-out stages
+            timeouts: Seconds to wait for each fanned-out stage
+            response_mode: How structured answers are written ("template", "llm" or "auto")
+        """
+        self.chatbot = chatbot
+        self.customer_id = customer_id
+        self.query = query
+        self.executor = executor
+        self.timeouts = timeouts or {}
+        self.response_mode = response_mode
+        self.timings: Dict[str, float] = {}
+        self.timed_out = set()
+        self.cancelled = set()
+        self._values: Dict[str, Any] = {}
+        self._pending: Dict[str, tuple] = {}
+
+    def start_stage(self, stage: str, compute: Callable[[], Any]) -> None:
+        """
+        Start a stage in the background on the executor.
+
+        Args:
+            stage: Stage name
+            compute: Function producing the stage output
+        """
+        if self.executor is None or stage in self._values or stage in self._pending:
+            return
+        self._pending[stage] = (self.executor.submit(compute), time.perf_counter())
+
+    def start_stage_async(self, stage: str, compute: Callable[[], Awaitable[Any]]) -> None:
+        """Start a stage as an asyncio task."""
+        if stage in self._values or stage in self._pending:
+            return
+        self._pending[stage] = (asyncio.ensure_future(compute()), time.perf_counter())
+
+    def _remaining(self, stage: str, started: float) -> Optional[float]:
+        """Seconds left of a stage's timeout, or None if it has none."""
+        timeout = self.timeouts.get(stage)
+        if timeout is None:
+            return None
+        return max(0.0, timeout - (time.perf_counter() - started))
+
+    def _finish_stage(self, stage: str, value: Any, started: float) -> Any:
+        self._values[stage] = value
+        self.timings[stage] = time.perf_counter() - started
+        return value
+
+    def _stage_timed_out(self, stage: str, started: float, fallback: Optional[Callable[[], Any]]) -> Any:
+        self.timed_out.add(stage)
+        if fallback is None:
+            raise StageTimeoutError(stage, self.timeouts[stage])
+        return self._finish_stage(stage, fallback(), started)
+
+    def run_stage(self, stage: str, compute: Callable[[], Any],
+                  fallback: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Run a stage once and memoize its output.
+
+        If the stage was started with start_stage, wait for it instead.
+
+        Args:
+            stage: Stage name
+            compute: Function producing the stage output
+            fallback: Function producing the output if the stage times out
+                (None raises StageTimeoutError)
+
+        Returns:
+            Stage output
+        """
+        if stage in self._values:
+            return self._values[stage]
+
+        pending = self._pending.pop(stage, None)
+        if pending is None:
+            started = time.perf_counter()
+            return self._finish_stage(stage, compute(), started)
+
+        future, started = pending
+        try:
+            return self._finish_stage(stage, future.result(timeout=self._remaining(stage, started)), started)
+        except FutureTimeoutError:
+            future.cancel()
+            return self._stage_timed_out(stage, started, fallback)
+
+    async def run_stage_async(self, stage: str, compute: Callable[[], Awaitable[Any]],
+                              fallback: Optional[Callable[[], Any]] = None) -> Any:
+        """Async counterpart of run_stage."""
+        if stage in self._values:
+            return self._values[stage]
+
+        pending = self._pending.pop(stage, None)
+        if pending is None:
+            started = time.perf_counter()
+            task = asyncio.ensure_future(compute())
+        else:
+            task, started = pending
+
+        try:
+            value = await asyncio.wait_for(task, self._remaining(stage, started))
+        except asyncio.TimeoutError:
+            return self._stage_timed_out(stage, started, fallback)
+        return self._finish_stage(stage, value, started)
+
+    def cancel_pending(self) -> None:
+        """Cancel stages that were started but are no longer needed."""
+        for stage, (future, _) in self._pending.items():
+            if not future.done():
+                future.cancel()
+                self.cancelled.add(stage)
+        self._pending.clear()
+
+    def fan_out(self, retrieval: bool = True) -> None:
+        """
+        Start the customer fetch and, if needed, retrieval concurrently.
+
+        Args:
+            retrieval: Whether the query will need retrieved context
+        """
+        self.start_stage("customer", self._fetch_customer)
+        if retrieval:
+            self.start_stage("retrieval", self._retrieve)
+
+    def fan_out_async(self, retrieval: bool = True) -> None:
+        """Start the customer fetch and, if needed, retrieval as asyncio tasks."""
+        self.start_stage_async("customer", self._fetch_customer_async)
+        if retrieval:
+            self.start_stage_async("retrieval", self._retrieve_async)
+
+    @property
+    def scope(self) -> Dict:
+        """Scope validation result."""
+        return self.run_stage("scope", lambda: self.chatbot.llm.validate_query_scope(self.query))
+
+    @property
+    def intent(self) -> Dict[str, bool]:
+        """Detected intents of the query (from the scope classification)."""
+        def classify() -> Dict[str, bool]:
+            intents = self.scope.get("intents", ())
+            customer_independent = self.chatbot._is_customer_independent_query(self.query)
+            return {
+                "prepayment_calculation": "prepayment_calc" in intents,
+                "customer_independent": customer_independent,
+                "template": self.chatbot._use_template(self.scope, customer_independent, self.response_mode)
+            }
+
+        return self.run_stage("intent", classify)
+
+    def _fetch_customer(self) -> Optional[Dict]:
+        return self.chatbot.bank_api.get_all_customer_data(self.customer_id)
+
+    def _fetch_customer_async(self) -> Awaitable[Optional[Dict]]:
+        return self.chatbot.bank_api.get_all_customer_data_async(self.customer_id)
+
+    @property
+    def customer_data(self) -> Optional[Dict]:
+        """Customer account and loan data from the bank API."""
+        return self.run_stage("customer", self._fetch_customer)
+
+    async def customer_data_async(self) -> Optional[Dict]:
+        """Customer data, fetched without blocking the event loop."""
+        return await self.run_stage_async("customer", self._fetch_customer_async)
+
+    def _retrieve(self) -> tuple:
+        """Search both collections, returning (corpus hash, retrieved context)."""
+        vector_db = self.chatbot.vector_db
+        corpus_hash = vector_db.corpus_hash
+        return corpus_hash, vector_db.search_all(self.query, per_collection=RESULTS_PER_COLLECTION)
+
+    def _retrieve_async(self) -> Awaitable[tuple]:
+        return asyncio.get_running_loop().run_in_executor(self.executor, self._retrieve)
+
+    def _no_context(self) -> tuple:
+        """Retrieval output used when retrieval times out: answer without documents."""
+        return self.chatbot.vector_db.corpus_hash, {"faqs": [], "policies": []}
+
+    @property
+    def retrieved_context(self) -> Dict:
+        """Relevant FAQs and policies."""
+        return self.run_stage("retrieval", self._retrieve, self._no_context)[1]
+
+    async def retrieved_context_async(self) -> Dict:
+        """Relevant FAQs and policies, searched on the executor."""
+        corpus_hash, retrieved_context = await self.run_stage_async(
+            "retrieval", self._retrieve_async, self._no_context
+        )
+        return retrieved_context
+
+    @property
+    def prompt(self) -> str:
+        """LLM prompt built from the query, customer data and retrieved context."""
+        return self._prompt[0]
+
+    @property
+    def cache_key(self) -> Optional[tuple]:
+        """Response cache key for customer-independent queries, else None."""
+        return self._prompt[1]
+
+    @property
+    def prompt_details(self) -> Dict:
+        """Prompt size details: prompt_tokens, token_budget and document_ids."""
+        return self._prompt[2]
+
+    @property
+    def _prompt(self) -> tuple:
+        corpus_hash, retrieved_context = self.run_stage("retrieval", self._retrieve, self._no_context)
+        return self.run_stage("prompt", lambda: self.chatbot._build_prompt(
+            self.query,
+            self.customer_data,
+            retrieved_context,
+            corpus_hash,
+            self.intent["customer_independent"]
+        ))
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        """Record a stage that ran outside run_stage (e.g. a streamed generation)."""
+        self.timings[stage] = seconds
+
+    def generate(self, compute: Callable[[], Any]) -> Any:
+        """Run the generation stage."""
+        return self.run_stage("generate", compute)
+
+    async def generate_async(self, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Async counterpart of generate."""
+        return await self.run_stage_async("generate", compute)
@@ -0,0 +1,197 @@
+"""Compact customer and loan records with lookup indexes."""
+from collections.abc import Mapping
+from sys import intern
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+
+class _Record(Mapping):
+    """
+    Read-only dict view over a __slots__ record.
+
+    Records behave like the plain dicts returned by the bank API
+    (`record["loan_id"]`, `.get()`, iteration, `dict(record)`), so code
+    written against dicts keeps working, while each record stores its
+    fields in slots instead of a per-instance dict.
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    _FIELD_SET: FrozenSet[str] = frozenset()
+
+    def __getitem__(self, key: str):
+        if key not in self._FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict:
+        """Convert to plain (JSON-serializable) dicts."""
+        return {
+            field: [item.to_dict() for item in value] if isinstance(value, tuple) else value
+            for field, value in ((field, getattr(self, field)) for field in self.FIELDS)
+        }
+
+
+class Loan(_Record):
+    """A loan in the shape of the bank API's loan objects."""
+
+    FIELDS = (
+        "loan_id", "loan_type", "principal_amount", "outstanding_amount",
+        "interest_rate", "emi_amount", "emi_date", "tenure_months",
+        "remaining_months", "next_emi_date", "prepayment_allowed",
+        "prepayment_charges", "status"
+    )
+    _FIELD_SET = frozenset(FIELDS)
+    # Low-cardinality text fields: one shared string per distinct value
+    _SHARED_FIELDS = ("loan_type", "next_emi_date", "status")
+    __slots__ = FIELDS + ("customer_id",)
+
+    def __init__(self, loan_id: str, loan_type: str, principal_amount: float, outstanding_amount: float,
+                 interest_rate: float, emi_amount: float, emi_date: int, tenure_months: int,
+                 remaining_months: int, next_emi_date: str, prepayment_allowed: bool,
+                 prepayment_charges: float, status: str = "active", customer_id: Optional[str] = None):
+        self.loan_id = loan_id
+        self.loan_type = loan_type
+        self.principal_amount = principal_amount
+        self.outstanding_amount = outstanding_amount
+        self.interest_rate = interest_rate
+        self.emi_amount = emi_amount
+        self.emi_date = emi_date
+        self.tenure_months = tenure_months
+        self.remaining_months = remaining_months
+        self.next_emi_date = next_emi_date
+        self.prepayment_allowed = prepayment_allowed
+        self.prepayment_charges = prepayment_charges
+        self.status = status
+        self.customer_id = customer_id
+
+    @classmethod
+    def from_dict(cls, data: Mapping, customer_id: Optional[str] = None) -> "Loan":
+        """
+        Build a loan from a bank API loan object.
+
+        Args:
+            data: Loan fields
+            customer_id: Owner of the loan
+
+        Returns:
+            Loan record
+        """
+        fields = {field: data[field] for field in cls.FIELDS if field in data}
+        for field in cls._SHARED_FIELDS:
+            if isinstance(fields.get(field), str):
+                fields[field] = intern(fields[field])
+        return cls(customer_id=customer_id, **fields)
+
+
+class Customer(_Record):
+    """A customer (account plus loans) in the shape of the bank API's customer objects."""
+
+    FIELDS = ("customer_id", "name", "account_number", "account_balance", "loans")
+    _FIELD_SET = frozenset(FIELDS)
+    __slots__ = FIELDS
+
+    def __init__(self, customer_id: str, name: str, account_number: str, account_balance: float,
+                 loans: Iterable[Loan] = ()):
+        self.customer_id = customer_id
+        self.name = name
+        self.account_number = account_number
+        self.account_balance = account_balance
+        self.loans = tuple(loans)
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Customer":
+        """
+        Build a customer, and its loans, from a bank API customer object.
+
+        Args:
+            data: Customer fields with a "loans" list
+
+        Returns:
+            Customer record
+        """
+        if isinstance(data, Customer):
+            return data
+        return cls(
+            customer_id=data["customer_id"],
+            name=data["name"],
+            account_number=data["account_number"],
+            account_balance=data["account_balance"],
+            loans=(Loan.from_dict(loan, data["customer_id"]) for loan in data.get("loans", ()))
+        )
+
+    def find_loan(self, loan_id: str) -> Optional[Loan]:
+        """Find one of the customer's loans by ID."""
+        for loan in self.loans:
+            if loan.loan_id == loan_id:
+                return loan
+        return None
+
+
+class LoanBook:
+    """
+    In-memory book of customers and loans.
+
+    Keeps a customer_id -> Customer index and a global loan_id -> Loan index,
+    so both customer and loan lookups are O(1) regardless of book size.
+    """
+
+    def __init__(self, customers: Iterable[Mapping] = ()):
+        """
+        Build the book.
+
+        Args:
+            customers: Customer records or bank API customer objects
+        """
+        self.customers: Dict[str, Customer] = {}
+        self.loans: Dict[str, Loan] = {}
+        for customer in customers:
+            self.add(customer)
+
+    def __len__(self) -> int:
+        return len(self.customers)
+
+    def __contains__(self, customer_id: str) -> bool:
+        return customer_id in self.customers
+
+    def add(self, customer: Mapping) -> Customer:
+        """
+        Add or replace a customer and index its loans.
+
+        Args:
+            customer: Customer record or bank API customer object
+
+        Returns:
+            The stored record
+        """
+        record = Customer.from_dict(customer)
+        previous = self.customers.get(record.customer_id)
+        if previous is not None:
+            for loan in previous.loans:
+                self.loans.pop(loan.loan_id, None)
+
+        self.customers[record.customer_id] = record
+        for loan in record.loans:
+            self.loans[loan.loan_id] = loan
+        return record
+
+    def get(self, customer_id: str) -> Optional[Customer]:
+        """Look up a customer by ID."""
+        return self.customers.get(customer_id)
+
+    def get_loan(self, loan_id: str) -> Optional[Loan]:
+        """Look up a loan by ID."""
+        return self.loans.get(loan_id)
+
+    def customer_loans(self, customer_id: str) -> List[Loan]:
+        """Loans of a customer (empty if the customer is unknown)."""
+        customer = self.customers.get(customer_id)
+        return list(customer.loans) if customer else []
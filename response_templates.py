@@ -0,0 +1,105 @@
+"""Deterministic response templates for structured answers.
+
+Prepayment breakdowns, EMI/next-due-date answers and balances are fully
+determined by bank data, so they can be rendered from pre-built format
+strings in microseconds instead of asking the LLM to restate the numbers.
+"""
+from typing import Iterable, List, Mapping, Optional
+
+# "template": render structured answers from templates
+# "llm": always let the LLM write the answer
+# "auto": templates, unless the query asks for an explanation
+RESPONSE_MODES = ("template", "llm", "auto")
+
+# Templates are bound to str.format once, at import
+_PREPAYMENT = (
+    "Prepaying ₹{prepayment_amount:,.2f} on your {loan_type} carries a prepayment charge of "
+    "₹{prepayment_charge:,.2f} ({prepayment_charge_percentage}%), so the total amount to pay is "
+    "₹{total_amount_to_pay:,.2f}. Your outstanding amount will go down from "
+    "₹{current_outstanding:,.2f} to ₹{new_outstanding:,.2f}."
+).format
+_PREPAYMENT_CLOSES_LOAN = (
+    "This prepayment closes the loan and saves ₹{interest_saved:,.2f} of interest."
+).format
+_PREPAYMENT_IMPACT = (
+    "If you keep your EMI of ₹{emi:,.2f}, the loan closes {months_saved} months earlier "
+    "and you save ₹{tenure_interest_saved:,.2f} in interest. If you keep the remaining tenure "
+    "instead, your EMI goes down to ₹{reduced_emi:,.2f} and you save ₹{emi_interest_saved:,.2f} "
+    "in interest."
+).format
+_PREPAYMENT_CLOSING = "Would you like to proceed with this prepayment?"
+_EMI_LINE = (
+    "Your {loan_type} ({loan_id}) EMI is ₹{emi_amount:,.2f}, next due on {next_emi_date}; "
+    "{remaining_months} EMIs remain."
+).format
+_ACCOUNT_BALANCE = "Your account {account_number} has a balance of ₹{account_balance:,.2f}.".format
+_OUTSTANDING_LINE = "Outstanding on your {loan_type} ({loan_id}): ₹{outstanding_amount:,.2f}.".format
+_NO_LOANS = "You don't have any active loans."
+
+
+def render_prepayment(calculation: Mapping) -> str:
+    """
+    Render a prepayment breakdown.
+
+    Args:
+        calculation: Allowed prepayment calculation from BankAPIClient
+
+    Returns:
+        Response text
+    """
+    parts = [_PREPAYMENT(**calculation)]
+
+    impact = calculation.get("impact")
+    if impact:
+        if calculation["new_outstanding"] <= 0:
+            parts.append(_PREPAYMENT_CLOSES_LOAN(interest_saved=impact["reduce_tenure"]["interest_saved"]))
+        else:
+            parts.append(_PREPAYMENT_IMPACT(
+                emi=impact["current"]["emi"],
+                months_saved=impact["reduce_tenure"]["months_saved"],
+                tenure_interest_saved=impact["reduce_tenure"]["interest_saved"],
+                reduced_emi=impact["reduce_emi"]["emi"],
+                emi_interest_saved=impact["reduce_emi"]["interest_saved"]
+            ))
+
+    parts.append(_PREPAYMENT_CLOSING)
+    return " ".join(parts)
+
+
+def render_emi(customer_data: Mapping) -> str:
+    """Render the EMI amount and next due date of each loan."""
+    loans = customer_data.get("loans", ())
+    if not loans:
+        return _NO_LOANS
+    return "\n".join(_EMI_LINE(**loan) for loan in loans)
+
+
+def render_balance(customer_data: Mapping) -> str:
+    """Render the account balance and the outstanding amount of each loan."""
+    lines = [_ACCOUNT_BALANCE(**customer_data)]
+    lines.extend(_OUTSTANDING_LINE(**loan) for loan in customer_data.get("loans", ()))
+    return "\n".join(lines)
+
+
+# Chat intents answerable from customer data alone, in answer order
+INTENT_RENDERERS = {
+    "emi": render_emi,
+    "balance": render_balance
+}
+
+
+def render_intents(intents: Iterable[str], customer_data: Mapping) -> Optional[str]:
+    """
+    Render the answer to a chat query from its structured intents.
+
+    Args:
+        intents: Intents detected in the query
+        customer_data: Customer account and loan data
+
+    Returns:
+        Response text, or None if no intent has a template
+    """
+    sections: List[str] = [
+        renderer(customer_data) for intent, renderer in INTENT_RENDERERS.items() if intent in intents
+    ]
+    return "\n\n".join(sections) if sections else None
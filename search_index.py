@@ -0,0 +1,505 @@
+"""Inverted index used by the vector database service for keyword retrieval."""
+from array import array
+from typing import Dict, Iterable, List, Optional
+import heapq
+import math
+import re
+
+TOKEN_PATTERN = re.compile(r'\b\w+\b')
+
+RANKING_MODES = ("overlap", "bm25")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def query_terms(query: str) -> set:
+    """Extract the keywords used for matching (words longer than 2 characters)."""
+    return set(word for word in tokenize(query) if len(word) > 2)
+
+
+class InvertedIndex:
+    """In-memory inverted index over a single document collection.
+
+    Documents are tokenized once when they are added. Each term maps to the
+    list of documents containing it, so a query only touches documents that
+    share at least one term with it instead of re-scanning the whole corpus.
+
+    Postings, term frequencies and document lengths are kept in compact
+    arrays. The BM25 corpus statistics (IDF per term, per-document length
+    normalization) are computed once after the index is built and refreshed
+    lazily if documents are added or removed later.
+
+    Documents are only ever appended; removal marks a document number as
+    deleted so concurrent readers never see postings shift under them.
+    Documents whose metadata carries an "id" can be looked up by it.
+    """
+
+    def __init__(self, documents: Iterable[Dict] = (), k1: float = 1.2, b: float = 0.75):
+        """
+        Build the index.
+
+        Args:
+            documents: Iterable of dictionaries with "content" and "metadata" keys
+            k1: BM25 term frequency saturation parameter
+            b: BM25 document length normalization parameter
+        """
+        self.k1 = k1
+        self.b = b
+
+        self.contents: List[str] = []
+        self.contents_lower: List[str] = []
+        self.metadata: List[Dict] = []
+        self.doc_terms: List[frozenset] = []
+        self.doc_lengths = array('I')
+
+        # Term id -> postings (document numbers) and matching term frequencies
+        self.vocabulary: Dict[str, int] = {}
+        self.postings: List[array] = []
+        self.term_freqs: List[array] = []
+
+        # Removed document numbers and lazily built lookups
+        self.deleted: set = set()
+        self._doc_freqs: Optional[array] = array('I')
+        self._positions: Optional[Dict[str, int]] = {}
+        # Postings of the index this one was copied from, see copy()
+        self._shared_postings: Optional[List] = None
+
+        # BM25 statistics, see _refresh_statistics()
+        self.avg_doc_length = 0.0
+        self.idf = array('d')
+        self.length_norms = array('d')
+        self._stats_stale = True
+
+        for document in documents:
+            self.add(document["content"], document["metadata"])
+
+        self._refresh_statistics()
+
+    @classmethod
+    def from_parts(cls, contents, contents_lower, metadata, doc_terms, doc_lengths, vocabulary,
+                   postings, term_freqs, idf, length_norms, k1: float, b: float,
+                   deleted: Iterable[int] = ()) -> "InvertedIndex":
+        """
+        Assemble an index from prebuilt structures (e.g. memory-mapped files).
+
+        Postings may be any sequence of integer sequences; they are copied into
+        arrays only when a document is added to that term.
+
+        Returns:
+            InvertedIndex using the given structures as-is
+        """
+        index = cls(k1=k1, b=b)
+        index.contents = contents
+        index.contents_lower = contents_lower
+        index.metadata = metadata
+        index.doc_terms = doc_terms
+        index.doc_lengths = doc_lengths
+        index.vocabulary = vocabulary
+        index.postings = postings
+        index.term_freqs = term_freqs
+        index.idf = idf
+        index.length_norms = length_norms
+        index.deleted = set(deleted)
+        index._doc_freqs = None
+        index._positions = None
+        live_docs = len(doc_lengths) - len(index.deleted)
+        live_length = sum(doc_lengths) - sum(doc_lengths[doc_id] for doc_id in index.deleted)
+        index.avg_doc_length = (live_length / live_docs) if live_docs else 0.0
+        index._stats_stale = False
+        return index
+
+    def copy(self) -> "InvertedIndex":
+        """
+        Copy the index for an update that readers must not see half-done.
+
+        The per-document lists, the vocabulary and the document lengths are
+        copied; the postings of each term stay shared with this index until
+        the copy adds a document to that term (copy-on-write). No document is
+        re-tokenized, and updating the copy never changes this index.
+
+        Returns:
+            Independent InvertedIndex with the same documents and statistics
+        """
+        index = InvertedIndex(k1=self.k1, b=self.b)
+        index.contents = self.contents.copy()
+        index.contents_lower = self.contents_lower.copy()
+        index.metadata = self.metadata.copy()
+        index.doc_terms = self.doc_terms.copy()
+        index.doc_lengths = array('I', self.doc_lengths)
+        index.vocabulary = dict(self.vocabulary)
+        index.postings = self.postings.copy()
+        index.term_freqs = self.term_freqs.copy()
+        index._shared_postings = self.postings
+        index.deleted = self.deleted
+        index._doc_freqs = array('I', self._doc_freqs) if self._doc_freqs is not None else None
+        index._positions = dict(self._positions) if self._positions is not None else None
+        index.avg_doc_length = self.avg_doc_length
+        index.idf = self.idf
+        index.length_norms = self.length_norms
+        index._stats_stale = self._stats_stale
+        return index
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    @property
+    def live_count(self) -> int:
+        """Number of documents that have not been removed."""
+        return len(self.contents) - len(self.deleted)
+
+    def position_of(self, document_id: str) -> Optional[int]:
+        """
+        Find the document number of a live document by its metadata "id".
+
+        Args:
+            document_id: Value of the document's metadata "id"
+
+        Returns:
+            Document number or None if there is no such live document
+        """
+        if self._positions is None:
+            self._positions = {}
+            for doc_id in range(len(self.metadata)):
+                if doc_id not in self.deleted:
+                    key = self.metadata[doc_id].get("id")
+                    if key is not None:
+                        self._positions[key] = doc_id
+        return self._positions.get(document_id)
+
+    def add(self, content: str, metadata: Dict) -> int:
+        """
+        Add a document to the index.
+
+        Args:
+            content: Searchable document text
+            metadata: Metadata returned alongside search results
+
+        Returns:
+            Internal document number
+        """
+        doc_id = len(self.contents)
+        content_lower = content.lower()
+        tokens = TOKEN_PATTERN.findall(content_lower)
+
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+
+        doc_freqs = self._doc_frequencies()
+
+        self.contents.append(content)
+        self.contents_lower.append(content_lower)
+        self.metadata.append(metadata)
+        self.doc_terms.append(frozenset(counts))
+        self.doc_lengths.append(len(tokens))
+
+        for term, count in counts.items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                term_id = len(self.postings)
+                self.postings.append(array('I'))
+                self.term_freqs.append(array('I'))
+                doc_freqs.append(0)
+                self.vocabulary[term] = term_id
+
+            postings = self.postings[term_id]
+            shared = self._shared_postings
+            if not isinstance(postings, array) or (
+                shared is not None and term_id < len(shared) and postings is shared[term_id]
+            ):
+                # Copy-on-write for postings backed by read-only storage or
+                # still shared with the index this one was copied from
+                postings = self.postings[term_id] = array('I', postings)
+                self.term_freqs[term_id] = array('I', self.term_freqs[term_id])
+            postings.append(doc_id)
+            self.term_freqs[term_id].append(count)
+            doc_freqs[term_id] += 1
+
+        if metadata.get("id") is not None and self._positions is not None:
+            self._positions[metadata["id"]] = doc_id
+
+        self._stats_stale = True
+        return doc_id
+
+    def remove(self, doc_id: int) -> bool:
+        """
+        Remove a document from search results.
+
+        The document's postings stay in place and are skipped at query time;
+        corpus statistics are updated for BM25.
+
+        Args:
+            doc_id: Internal document number
+
+        Returns:
+            True if the document was live and has been removed
+        """
+        if doc_id in self.deleted or not 0 <= doc_id < len(self.contents):
+            return False
+
+        doc_freqs = self._doc_frequencies()
+        for term in self.doc_terms[doc_id]:
+            doc_freqs[self.vocabulary[term]] -= 1
+
+        if self._positions is not None:
+            self._positions.pop(self.metadata[doc_id].get("id"), None)
+
+        # Replace rather than mutate so concurrent readers keep a stable set
+        self.deleted = self.deleted | {doc_id}
+        self._stats_stale = True
+        return True
+
+    def _doc_frequencies(self) -> array:
+        """Return live document frequencies per term id, building them on first use."""
+        if self._doc_freqs is None:
+            doc_freqs = array('I', (len(postings) for postings in self.postings))
+            for doc_id in self.deleted:
+                for term in self.doc_terms[doc_id]:
+                    doc_freqs[self.vocabulary[term]] -= 1
+            self._doc_freqs = doc_freqs
+        return self._doc_freqs
+
+    def _refresh_statistics(self):
+        """Recompute IDF values and per-document BM25 length normalization."""
+        deleted = self.deleted
+        n_docs = len(self.contents) - len(deleted)
+        total_length = sum(self.doc_lengths) - sum(self.doc_lengths[doc_id] for doc_id in deleted)
+        self.avg_doc_length = (total_length / n_docs) if n_docs else 0.0
+
+        self.idf = array('d', (
+            math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            for df in self._doc_frequencies()
+        ))
+
+        avg = self.avg_doc_length or 1.0
+        k1, b = self.k1, self.b
+        self.length_norms = array('d', (
+            k1 * (1.0 - b + b * length / avg) for length in self.doc_lengths
+        ))
+        self._stats_stale = False
+
+    def _postings_for(self, term: str):
+        """Return the postings array for a term (empty if unknown)."""
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            return ()
+        return self.postings[term_id]
+
+    def score(self, query: str, ranking: str = "overlap") -> Dict[int, float]:
+        """
+        Score every document sharing a term with the query.
+
+        Args:
+            query: Search query
+            ranking: Ranking mode, one of RANKING_MODES
+
+        Returns:
+            Mapping of document number to relevance score
+        """
+        return self.score_many([query], ranking)[0]
+
+    def score_many(self, queries: List[str], ranking: str = "overlap") -> List[Dict[int, float]]:
+        """
+        Score several queries in one pass over the postings.
+
+        Each distinct term is looked up and its postings traversed once,
+        crediting every query that contains it.
+
+        Args:
+            queries: Search queries
+            ranking: Ranking mode, one of RANKING_MODES
+
+        Returns:
+            One mapping of document number to score per query, in input order
+        """
+        if ranking == "bm25":
+            return self.score_bm25_many(queries)
+        if ranking == "overlap":
+            return self.score_overlap_many(queries)
+        raise ValueError(f"Unknown ranking mode: {ranking}")
+
+    @staticmethod
+    def _group_terms(queries: List[str]) -> tuple:
+        """Return each query's keywords and a mapping of term -> query positions."""
+        terms_per_query = [query_terms(query) for query in queries]
+        queries_by_term: Dict[str, List[int]] = {}
+        for position, terms in enumerate(terms_per_query):
+            for term in terms:
+                queries_by_term.setdefault(term, []).append(position)
+        return terms_per_query, queries_by_term
+
+    def score_overlap(self, query: str) -> Dict[int, float]:
+        """
+        Score documents by keyword overlap.
+
+        The score is the fraction of query keywords found in the document,
+        boosted by 0.5 (capped at 1.0) when the whole query appears verbatim.
+        A verbatim match counts even without a keyword hit ("rate" in
+        "rates"), so scores are those of a scan over every document.
+
+        Args:
+            query: Search query
+
+        Returns:
+            Mapping of document number to relevance score (0-1)
+        """
+        return self.score_overlap_many([query])[0]
+
+    def score_overlap_many(self, queries: List[str]) -> List[Dict[int, float]]:
+        """Keyword overlap scores for several queries (see score_overlap)."""
+        terms_per_query, queries_by_term = self._group_terms(queries)
+
+        matches: List[Dict[int, int]] = [{} for _ in queries]
+        for term, positions in queries_by_term.items():
+            for doc_id in self._postings_for(term):
+                for position in positions:
+                    counts = matches[position]
+                    counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        deleted = self.deleted
+        results = []
+        for query, terms, counts in zip(queries, terms_per_query, matches):
+            query_lower = query.lower()
+            n_terms = len(terms)
+            scores = {}
+            for doc_id, count in counts.items():
+                if doc_id in deleted:
+                    continue
+                score = count / n_terms
+                if query_lower in self.contents_lower[doc_id]:
+                    score = min(1.0, score + 0.5)
+                scores[doc_id] = score
+
+            if n_terms and self._may_match_without_terms(query_lower, terms):
+                for doc_id in range(len(self.contents_lower)):
+                    if doc_id not in counts and doc_id not in deleted and query_lower in self.contents_lower[doc_id]:
+                        scores[doc_id] = 0.5
+            results.append(scores)
+
+        return results
+
+    @staticmethod
+    def _may_match_without_terms(query_lower: str, terms: set) -> bool:
+        """
+        Whether the query can appear verbatim in a document lacking all its keywords.
+
+        A keyword with a non-word character on both sides inside the query
+        appears as a whole token wherever the query does, so such documents
+        are already among the keyword hits. Otherwise (e.g. "rate" inside
+        "rates") the documents must be scanned for the verbatim query.
+        """
+        for match in TOKEN_PATTERN.finditer(query_lower):
+            if match.group() in terms and match.start() > 0 and match.end() < len(query_lower):
+                return False
+        return True
+
+    def score_bm25(self, query: str) -> Dict[int, float]:
+        """
+        Score documents with Okapi BM25.
+
+        Unlike keyword overlap, rare terms weigh more than common ones, so a
+        generic word such as "loan" does not rank every document equally.
+
+        Args:
+            query: Search query
+
+        Returns:
+            Mapping of document number to BM25 score
+        """
+        return self.score_bm25_many([query])[0]
+
+    def score_bm25_many(self, queries: List[str]) -> List[Dict[int, float]]:
+        """BM25 scores for several queries (see score_bm25)."""
+        if self._stats_stale:
+            self._refresh_statistics()
+
+        k1_plus_one = self.k1 + 1.0
+        # Statistics may be replaced by a concurrent writer; only use this snapshot
+        idf_table = self.idf
+        length_norms = self.length_norms
+        n_docs = len(length_norms)
+        deleted = self.deleted
+        results: List[Dict[int, float]] = [{} for _ in queries]
+
+        queries_by_term = self._group_terms(queries)[1]
+        # Sorted traversal keeps float sums identical however queries are batched
+        for term in sorted(queries_by_term):
+            positions = queries_by_term[term]
+            term_id = self.vocabulary.get(term)
+            if term_id is None or term_id >= len(idf_table):
+                continue
+            idf = idf_table[term_id]
+            for doc_id, tf in zip(self.postings[term_id], self.term_freqs[term_id]):
+                if doc_id >= n_docs or doc_id in deleted:
+                    continue
+                weight = idf * tf * k1_plus_one / (tf + length_norms[doc_id])
+                for position in positions:
+                    scores = results[position]
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight
+
+        return results
+
+    def top_k(self, scores: Dict[int, float], n_results: int) -> List[tuple]:
+        """
+        Select the best scoring documents.
+
+        Ties are broken by insertion order. When fewer than n_results documents
+        matched, the remaining slots are filled with unmatched documents at a
+        score of 0.0, mirroring a full corpus sort.
+
+        Args:
+            scores: Mapping of document number to score
+            n_results: Number of results to return
+
+        Returns:
+            List of (document number, score) tuples
+        """
+        if n_results <= 0:
+            return []
+
+        ranked = heapq.nsmallest(n_results, scores.items(), key=lambda item: (-item[1], item[0]))
+
+        if len(ranked) < n_results:
+            for doc_id in range(len(self.contents)):
+                if len(ranked) >= n_results:
+                    break
+                if doc_id not in scores and doc_id not in self.deleted:
+                    ranked.append((doc_id, 0.0))
+
+        return ranked
+
+    def search(self, query: str, n_results: int, ranking: str = "overlap") -> List[Dict]:
+        """
+        Search the index.
+
+        Args:
+            query: Search query
+            n_results: Number of results to return
+            ranking: Ranking mode, one of RANKING_MODES
+
+        Returns:
+            List of documents with content, metadata and score
+        """
+        return self.documents(self.top_k(self.score(query, ranking), n_results))
+
+    def documents(self, ranked: List[tuple]) -> List[Dict]:
+        """
+        Build search results for ranked document numbers.
+
+        Args:
+            ranked: List of (document number, score) tuples
+
+        Returns:
+            List of documents with content, metadata and score
+        """
+        return [
+            {
+                "content": self.contents[doc_id],
+                "metadata": dict(self.metadata[doc_id]),
+                "score": score
+            }
+            for doc_id, score in ranked
+        ]
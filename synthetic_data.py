@@ -0,0 +1,432 @@
+"""Seeded synthetic customers and corpus documents for scale testing.
+
+Generates production-sized data locally: millions of customers and loans in
+the bank API's shape, and tens of thousands of FAQ and policy chunks in the
+shape of data.py. Everything is produced by generators and written one
+record at a time, so memory stays bounded no matter the count; the same
+seed (and as-of date) always produces the same data.
+
+Usage:
+
+    python synthetic_data.py customers customers.jsonl.gz --count 1000000
+    python synthetic_data.py corpus corpus.json --faqs 20000 --policies 20000
+
+Load the output with load_customers (into a mock-mode BankAPIClient, or via
+MOCK_CUSTOMERS_FILE at startup) and load_corpus / VectorDBService.load_corpus_file
+(or POST /admin/corpus/reload with CORPUS_FILE).
+"""
+from datetime import date
+from typing import Dict, Iterable, Iterator, Optional, TYPE_CHECKING
+import argparse
+import gzip
+import json
+import random
+
+from loan_math import calculate_emi, monthly_rate
+
+if TYPE_CHECKING:
+    from bank_api_client import BankAPIClient
+    from vector_db_service import VectorDBService
+
+# (loan type, principal range, annual rate range, tenure range in months,
+#  prepayment charge range in percent, prepayment allowed)
+LOAN_PRODUCTS = (
+    ("Home Loan", (1_500_000, 15_000_000), (8.0, 10.5), (120, 300), (0.0, 2.0), True),
+    ("Personal Loan", (50_000, 2_500_000), (10.5, 18.0), (12, 60), (3.0, 5.0), True),
+    ("Car Loan", (300_000, 5_000_000), (8.5, 12.0), (12, 84), (2.0, 3.0), True),
+    ("Education Loan", (200_000, 4_000_000), (9.0, 12.5), (60, 180), (0.0, 0.0), True),
+    ("Gold Loan", (20_000, 1_500_000), (9.0, 14.0), (6, 36), (1.0, 2.0), True),
+    ("Business Loan", (500_000, 20_000_000), (11.0, 18.0), (12, 120), (4.0, 6.0), False),
+)
+# Relative frequency of each product, in LOAN_PRODUCTS order
+LOAN_PRODUCT_WEIGHTS = (30, 30, 20, 8, 7, 5)
+# Relative frequency of customers with 1, 2 and 3 loans
+LOANS_PER_CUSTOMER_WEIGHTS = (70, 24, 6)
+
+FIRST_NAMES = (
+    "Aarav", "Aditi", "Arjun", "Ananya", "Dev", "Diya", "Ishaan", "Kavya", "Kabir", "Meera",
+    "Nikhil", "Neha", "Rahul", "Riya", "Rohan", "Sanya", "Vikram", "Zara", "John", "Jane"
+)
+LAST_NAMES = (
+    "Sharma", "Verma", "Iyer", "Nair", "Reddy", "Gupta", "Patel", "Mehta", "Rao", "Singh",
+    "Das", "Khan", "Joshi", "Kulkarni", "Menon", "Doe", "Smith", "Bose", "Chopra", "Pillai"
+)
+
+TOPICS = {
+    "Prepayment Terms": [
+        "Prepayment of the {loan} is allowed after {months} months from disbursement.",
+        "Prepayment charges of {percent}% of the prepaid amount apply during the first {years} years.",
+        "The minimum partial prepayment amount is Rs. {amount}.",
+        "A prepayment can be applied to reduce the tenure or to reduce the EMI."
+    ],
+    "Interest Rate": [
+        "{loan} interest rates range from {rate_low}% to {rate_high}% per annum.",
+        "Rates depend on the loan amount, tenure and credit profile of the customer.",
+        "Floating rates are reset every {months} months based on the benchmark rate.",
+        "Customers can switch from a floating to a fixed rate for a fee of {percent}% of the outstanding."
+    ],
+    "EMI Payment": [
+        "EMIs of the {loan} are debited on the chosen due date every month.",
+        "EMIs can be paid by auto-debit, internet banking, the mobile app or at a branch.",
+        "Keep a sufficient balance on the EMI due date to avoid late payment charges.",
+        "The EMI due date can be changed once every {years} years on request."
+    ],
+    "Late Payment": [
+        "A late payment charge of {percent}% of the EMI applies after {days} days.",
+        "Missed EMIs are reported to credit bureaus and can lower the credit score.",
+        "Repeated missed EMIs can lead to the loan being classified as a non-performing asset.",
+        "Contact customer care within {days} days of a missed EMI to discuss options."
+    ],
+    "Tenure": [
+        "The {loan} tenure ranges from {months} to {months_high} months.",
+        "The remaining tenure can be extended once, subject to the maximum age at maturity.",
+        "Reducing the tenure increases the EMI but lowers the total interest paid.",
+        "Tenure changes require a fresh repayment schedule to be issued."
+    ],
+    "Foreclosure": [
+        "The {loan} can be foreclosed by paying the full outstanding amount and applicable charges.",
+        "Foreclosure requests are processed within {days} working days.",
+        "A foreclosure statement with the exact payable amount can be requested online.",
+        "No foreclosure charges apply after {years} years from disbursement."
+    ],
+    "Eligibility": [
+        "The {loan} is available to applicants aged {age_low} to {age_high} years.",
+        "A minimum monthly income of Rs. {amount} is required for salaried applicants.",
+        "A credit score of {score} or above is preferred.",
+        "Co-applicants can be added to improve eligibility."
+    ],
+    "Statements and Certificates": [
+        "Loan statements for the {loan} can be downloaded from internet banking.",
+        "Interest certificates for tax purposes are issued every financial year.",
+        "A repayment schedule shows the principal and interest part of every EMI.",
+        "Duplicate statements are issued within {days} working days."
+    ],
+    "Balance Transfer": [
+        "An existing {loan} from another lender can be transferred at a rate from {rate_low}% per annum.",
+        "A processing fee of {percent}% applies to balance transfers.",
+        "A top-up loan of up to Rs. {amount} can be availed along with the transfer.",
+        "The transfer is completed within {days} working days of document submission."
+    ],
+    "Insurance": [
+        "Loan protection insurance covers the outstanding {loan} amount in case of death or disability.",
+        "The premium can be paid upfront or added to the loan amount.",
+        "Insurance is optional and can be cancelled within {days} days of purchase.",
+        "Claims are settled directly against the outstanding loan balance."
+    ]
+}
+
+FAQ_QUESTIONS = {
+    "Prepayment Terms": ["Can I prepay my {loan}?", "What are the prepayment charges on a {loan}?",
+                         "How much do I save by prepaying my {loan}?"],
+    "Interest Rate": ["What is the interest rate on a {loan}?", "Can I switch my {loan} to a fixed rate?"],
+    "EMI Payment": ["How do I pay my {loan} EMI?", "Can I change my {loan} EMI date?"],
+    "Late Payment": ["What happens if I miss a {loan} EMI?", "What are the late payment charges on a {loan}?"],
+    "Tenure": ["Can I change the tenure of my {loan}?", "What is the maximum tenure of a {loan}?"],
+    "Foreclosure": ["How do I close my {loan} early?", "Are there foreclosure charges on a {loan}?"],
+    "Eligibility": ["Who is eligible for a {loan}?", "Can I add a co-applicant to my {loan}?"],
+    "Statements and Certificates": ["How do I get my {loan} statement?",
+                                    "How do I get an interest certificate for my {loan}?"],
+    "Balance Transfer": ["Can I transfer my {loan} from another bank?", "Is a top-up available on a {loan}?"],
+    "Insurance": ["Is insurance mandatory for a {loan}?", "What does {loan} insurance cover?"]
+}
+
+
+def _as_of_date(as_of: Optional[date]) -> date:
+    return as_of or date.today()
+
+
+def _next_emi_date(emi_date: int, as_of: date) -> str:
+    """Next EMI date after as_of (same rule as BankAPIClient._get_next_emi_date)."""
+    if as_of.day < emi_date:
+        return date(as_of.year, as_of.month, emi_date).isoformat()
+    if as_of.month == 12:
+        return date(as_of.year + 1, 1, emi_date).isoformat()
+    return date(as_of.year, as_of.month + 1, emi_date).isoformat()
+
+
+def _generate_loan(rng: random.Random, loan_id: str, as_of: date) -> Dict:
+    """One loan with a consistent EMI, outstanding amount and remaining tenure."""
+    loan_type, principal_range, rate_range, tenure_range, charge_range, prepayment_allowed = rng.choices(
+        LOAN_PRODUCTS, weights=LOAN_PRODUCT_WEIGHTS
+    )[0]
+
+    principal = round(rng.uniform(*principal_range), -3)
+    interest_rate = round(rng.uniform(*rate_range), 2)
+    tenure_months = rng.randint(*tenure_range)
+    emi_amount = round(calculate_emi(principal, interest_rate, tenure_months), 2)
+
+    # Balance after the EMIs already paid (closed form of the amortization)
+    paid_months = rng.randint(0, tenure_months - 1)
+    rate = monthly_rate(interest_rate)
+    growth = (1 + rate) ** paid_months
+    outstanding = principal * growth - emi_amount * (growth - 1) / rate if rate else principal - emi_amount * paid_months
+    emi_date = rng.choice((1, 5, 7, 10, 15, 20, 25))
+
+    return {
+        "loan_id": loan_id,
+        "loan_type": loan_type,
+        "principal_amount": principal,
+        "outstanding_amount": round(max(outstanding, 0.0), 2),
+        "interest_rate": interest_rate,
+        "emi_amount": emi_amount,
+        "emi_date": emi_date,
+        "tenure_months": tenure_months,
+        "remaining_months": tenure_months - paid_months,
+        "next_emi_date": _next_emi_date(emi_date, as_of),
+        "prepayment_allowed": prepayment_allowed,
+        "prepayment_charges": round(rng.uniform(*charge_range), 1),
+        "status": "active"
+    }
+
+
+def generate_customers(count: int, seed: int = 0, as_of: Optional[date] = None) -> Iterator[Dict]:
+    """
+    Generate customers with their loans, in the bank API's customer shape.
+
+    Customer IDs are SYN00000000, SYN00000001, ...; loan IDs are SYNL000000000, ...
+
+    Args:
+        count: Number of customers
+        seed: Random seed
+        as_of: Date the next EMI dates are computed from (defaults to today)
+
+    Yields:
+        Customer dictionaries
+    """
+    rng = random.Random(seed)
+    as_of = _as_of_date(as_of)
+    loan_number = 0
+
+    for number in range(count):
+        customer_id = f"SYN{number:08d}"
+        loans = []
+        for _ in range(rng.choices((1, 2, 3), weights=LOANS_PER_CUSTOMER_WEIGHTS)[0]):
+            loans.append(_generate_loan(rng, f"SYNL{loan_number:09d}", as_of))
+            loan_number += 1
+
+        yield {
+            "customer_id": customer_id,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "account_number": f"ACC{rng.randrange(10 ** 11, 10 ** 12)}",
+            "account_balance": round(rng.uniform(1_000, 2_500_000), 2),
+            "loans": loans
+        }
+
+
+def _fill(rng: random.Random, sentence: str, loan: str) -> str:
+    """Fill a sentence template with plausible random values."""
+    rate_low = round(rng.uniform(7.5, 14.0), 1)
+    months = rng.choice((3, 6, 12, 24))
+    return sentence.format(
+        loan=loan.lower(),
+        months=months,
+        months_high=months * rng.randint(5, 15),
+        years=rng.randint(1, 5),
+        days=rng.choice((7, 15, 30)),
+        percent=round(rng.uniform(0.5, 5.0), 1),
+        amount=f"{rng.randrange(5, 500) * 1000:,}",
+        rate_low=rate_low,
+        rate_high=round(rate_low + rng.uniform(1.0, 4.0), 1),
+        age_low=rng.randint(18, 25),
+        age_high=rng.randint(58, 70),
+        score=rng.choice((650, 700, 725, 750))
+    )
+
+
+def _document_text(rng: random.Random, topic: str, loan: str) -> str:
+    """A chunk of 3-8 sentences, mostly on the topic, some from other topics."""
+    sentences = rng.sample(TOPICS[topic], k=rng.randint(2, len(TOPICS[topic])))
+    for _ in range(rng.randint(1, 4)):
+        sentences.append(rng.choice(TOPICS[rng.choice(list(TOPICS))]))
+    return " ".join(_fill(rng, sentence, loan) for sentence in sentences)
+
+
+def generate_faqs(count: int, seed: int = 0) -> Iterator[Dict]:
+    """
+    Generate FAQ chunks in the shape of data.LOAN_FAQS.
+
+    Args:
+        count: Number of FAQs
+        seed: Random seed
+
+    Yields:
+        FAQ dictionaries with question and answer
+    """
+    rng = random.Random(seed)
+    topics = list(FAQ_QUESTIONS)
+    for _ in range(count):
+        topic = rng.choice(topics)
+        loan = rng.choice(LOAN_PRODUCTS)[0]
+        yield {
+            "question": rng.choice(FAQ_QUESTIONS[topic]).format(loan=loan.lower()),
+            "answer": _document_text(rng, topic, loan)
+        }
+
+
+def generate_policies(count: int, seed: int = 0) -> Iterator[Dict]:
+    """
+    Generate policy chunks in the shape of data.POLICY_DOCUMENTS.
+
+    Args:
+        count: Number of policy chunks
+        seed: Random seed
+
+    Yields:
+        Policy dictionaries with title, section and content
+    """
+    rng = random.Random(seed + 1)
+    topics = list(TOPICS)
+    for number in range(count):
+        topic = rng.choice(topics)
+        loan = rng.choice(LOAN_PRODUCTS)[0]
+        yield {
+            "title": f"{loan} Policy",
+            "section": f"{topic} ({number // len(topics) + 1})",
+            "content": _document_text(rng, topic, loan)
+        }
+
+
+def _open(path: str, mode: str):
+    """Open a text file, gzip-compressed if the path ends in .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", compresslevel=6, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_jsonl(path: str, records: Iterable[Dict]) -> int:
+    """
+    Write records as JSON lines, one at a time.
+
+    Args:
+        path: Output file (.gz for gzip compression)
+        records: Records to write
+
+    Returns:
+        Number of records written
+    """
+    written = 0
+    with _open(path, "w") as handle:
+        for record in records:
+            handle.write(json.dumps(record, separators=(",", ":")) + "\n")
+            written += 1
+    return written
+
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+    """
+    Read JSON lines one at a time.
+
+    Args:
+        path: Input file (.gz for gzip compression)
+
+    Yields:
+        Decoded records
+    """
+    with _open(path, "r") as handle:
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_corpus(path: str, faqs: Iterable[Dict], policies: Iterable[Dict]) -> Dict[str, int]:
+    """
+    Write a corpus file ({"faqs": [...], "policies": [...]}) one document at a time.
+
+    The file is the format read by VectorDBService.load_corpus_file and
+    POST /admin/corpus/reload.
+
+    Args:
+        path: Output file (plain JSON, for load_corpus_file)
+        faqs: FAQ documents
+        policies: Policy documents
+
+    Returns:
+        Number of documents written per collection
+    """
+    counts = {}
+    with _open(path, "w") as handle:
+        handle.write("{")
+        for position, (name, documents) in enumerate((("faqs", faqs), ("policies", policies))):
+            handle.write(f'{"," if position else ""}"{name}":[')
+            counts[name] = 0
+            for document in documents:
+                handle.write(("," if counts[name] else "") + "\n" + json.dumps(document))
+                counts[name] += 1
+            handle.write("\n]")
+        handle.write("}\n")
+    return counts
+
+
+def load_customers(bank_api: "BankAPIClient", path: str, limit: Optional[int] = None) -> int:
+    """
+    Stream customers from a JSON-lines file into a mock-mode BankAPIClient.
+
+    Customers are stored as compact records in the client's LoanBook, so
+    loans can be looked up by ID in O(1).
+
+    Args:
+        bank_api: Client in "mock" mode
+        path: Customers file written by write_jsonl
+        limit: Maximum number of customers to load
+
+    Returns:
+        Number of customers loaded
+    """
+    if bank_api.mode != "mock":
+        raise ValueError("Synthetic customers can only be loaded into a mock-mode BankAPIClient")
+
+    loaded = 0
+    for customer in read_jsonl(path):
+        if limit is not None and loaded >= limit:
+            break
+        bank_api.book.add(customer)
+        loaded += 1
+    bank_api.invalidate_all_customers()
+    return loaded
+
+
+def load_corpus(vector_db: "VectorDBService", faqs: Iterable[Dict], policies: Iterable[Dict]) -> Dict[str, int]:
+    """
+    Replace the VectorDBService corpus with generated documents.
+
+    Args:
+        vector_db: Service to load into
+        faqs: FAQ documents (e.g. generate_faqs(20000))
+        policies: Policy documents (e.g. generate_policies(20000))
+
+    Returns:
+        Number of documents per collection
+    """
+    return vector_db.reload_corpus(list(faqs), list(policies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic customers or corpus documents.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    customers = subparsers.add_parser("customers", help="customers and loans as JSON lines")
+    customers.add_argument("path", help="output file (.gz for gzip compression)")
+    customers.add_argument("--count", type=int, default=100_000)
+    customers.add_argument("--seed", type=int, default=0)
+    customers.add_argument("--as-of", type=date.fromisoformat, default=None,
+                           help="date next EMI dates are computed from (YYYY-MM-DD, default today)")
+
+    corpus = subparsers.add_parser("corpus", help="FAQ and policy chunks as a corpus file")
+    corpus.add_argument("path", help="output corpus file (JSON)")
+    corpus.add_argument("--faqs", type=int, default=10_000)
+    corpus.add_argument("--policies", type=int, default=10_000)
+    corpus.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "customers":
+        written = write_jsonl(args.path, generate_customers(args.count, args.seed, args.as_of))
+        print(f"{written} customers written to {args.path}")
+    else:
+        written = write_corpus(
+            args.path, generate_faqs(args.faqs, args.seed), generate_policies(args.policies, args.seed)
+        )
+        print(f"{written['faqs']} FAQs and {written['policies']} policies written to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
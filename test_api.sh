@@ -78,6 +78,17 @@ curl -X POST "$BASE_URL/search/policies" \
   }'
 echo -e "\n\n"
 
+# Test batch search
+echo "8. Batch Search"
+echo "----------------------------------------"
+curl -X POST "$BASE_URL/search/batch" \
+  -H "Content-Type: application/json" \
+  -d '{
+    "queries": ["What is EMI?", "prepayment charges"],
+    "n_results": 2
+  }'
+echo -e "\n\n"
+
 echo "========================================"
 echo "Test completed!"
 echo "========================================"
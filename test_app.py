@@ -0,0 +1,44 @@
+"""Tests for request validation in the Flask API.
+
+Run with `python -m pytest`.
+"""
+import pytest
+
+from app import app
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.mark.parametrize("amount", ["inf", "-inf", "nan", "-5", -5])
+def test_batch_prepayment_rejects_invalid_amounts(client, amount):
+    response = client.post("/prepayment/calculate/batch", json={
+        "scenarios": [{"customer_id": "CUST001", "loan_id": "LOAN001", "prepayment_amount": amount}]
+    })
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid prepayment_amount: must be a finite, non-negative number"
+
+
+@pytest.mark.parametrize("body, error", [
+    ({"queries": [1]}, "Invalid queries: every query must be a non-empty string"),
+    ({"queries": ["What is EMI?", None]}, "Invalid queries: every query must be a non-empty string"),
+    ({"queries": ["  "]}, "Invalid queries: every query must be a non-empty string"),
+    ({"queries": ["What is EMI?"], "n_results": "3"}, "Invalid n_results: must be a positive integer"),
+    ({"queries": ["What is EMI?"], "n_results": 0}, "Invalid n_results: must be a positive integer"),
+    ({"queries": ["What is EMI?"], "n_results": 2.5}, "Invalid n_results: must be a positive integer"),
+    ({"queries": ["What is EMI?"], "n_results": True}, "Invalid n_results: must be a positive integer"),
+])
+def test_search_batch_rejects_invalid_input(client, body, error):
+    response = client.post("/search/batch", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == error
+
+
+def test_search_batch_returns_results_per_query(client):
+    response = client.post("/search/batch", json={"queries": ["What is EMI?", "prepayment"], "n_results": 2})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [result["query"] for result in results] == ["What is EMI?", "prepayment"]
+    assert all(len(result["faqs"]) == 2 for result in results)
@@ -0,0 +1,31 @@
+"""Tests for the prepayment calculation of BankingChatbot.
+
+Run with `python -m pytest`.
+"""
+import pytest
+
+from chatbot_service import BankingChatbot
+
+
+@pytest.fixture(scope="module")
+def chatbot():
+    chatbot = BankingChatbot()
+    # Demo responses instead of API calls
+    chatbot.llm.client = None
+    chatbot.llm.async_client = None
+    yield chatbot
+    chatbot.executor.shutdown(wait=False)
+
+
+@pytest.mark.parametrize("response_mode", ["auto", "template", "llm"])
+@pytest.mark.parametrize("amount", [float("nan"), float("inf"), -5000000.0, 0.0])
+def test_prepayment_rejects_amounts_the_explanation_cannot_handle(chatbot, amount, response_mode):
+    result = chatbot.calculate_prepayment("CUST001", "LOAN001", amount, response_mode)
+    assert result == {"response": "Please enter a prepayment amount greater than zero.", "success": False}
+
+
+def test_prepayment_template_renders_valid_amount(chatbot):
+    result = chatbot.calculate_prepayment("CUST001", "LOAN001", 100000.0, "auto")
+    assert result["success"] and result["response_mode"] == "template"
+    assert "Prepaying ₹100,000.00" in result["response"]
+    assert "from ₹4,250,000.00 to ₹4,150,000.00" in result["response"]
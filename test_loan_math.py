@@ -0,0 +1,36 @@
+"""Tests for the batch prepayment math of loan_math.
+
+Run with `python -m pytest`.
+"""
+import pytest
+
+from loan_math import prepayment_impact, prepayment_impacts
+
+# (outstanding, annual rate, EMI, prepayment): regular loans, interest-free
+# loans, loans already repaid, prepayments that close the loan, and an EMI
+# that does not cover the interest
+CASES = [
+    (4250000.0, 8.5, 45000.0, 100000.0),
+    (4250000.0, 8.5, 45000.0, 0.0),
+    (325000.0, 10.5, 12500.0, 50000.0),
+    (325000.0, 10.5, 12500.0, 325000.0),
+    (325000.0, 10.5, 12500.0, 400000.0),
+    (100000.0, 0.0, 5000.0, 20000.0),
+    (100000.0, 0.0, 3000.0, 99999.999),
+    (0.0, 12.0, 500.0, 10.0),
+    (0.004, 12.0, 500.0, 0.0),
+    (100000.0, 12.0, 500.0, 1000.0),
+]
+
+
+def _scalar(case):
+    try:
+        return prepayment_impact(*case)
+    except ValueError:
+        return None
+
+
+def test_prepayment_impacts_match_prepayment_impact():
+    pytest.importorskip("numpy")
+    columns = [list(column) for column in zip(*CASES)]
+    assert prepayment_impacts(*columns) == [_scalar(case) for case in CASES]
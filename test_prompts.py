@@ -0,0 +1,42 @@
+"""Tests for the token budget of the query prompt.
+
+Run with `python -m pytest`.
+"""
+import pytest
+
+from prompts import build_query_prompt
+from records import Customer, Loan
+from vector_db_service import VectorDBService
+
+
+def _customer(n_loans):
+    loans = [
+        Loan(f"LOAN{number:03d}", "Personal Loan", 500000.0, 350000.0, 11.5, 11000.0, 5,
+             60, 40, "2026-11-05", number % 2 == 0, 2.0, customer_id="CUST900")
+        for number in range(1, n_loans + 1)
+    ]
+    return Customer("CUST900", "Many Loans", "ACC900", 125000.0, loans)
+
+
+@pytest.fixture(scope="module")
+def retrieved_context():
+    return VectorDBService(ranking="bm25", persist_dir=None).search_all("What are the prepayment charges?", per_collection=3)
+
+
+@pytest.mark.parametrize("token_budget", [600, 1500, 4000])
+def test_many_loans_are_fitted_to_the_budget(retrieved_context, token_budget):
+    customer = _customer(200)
+    prompt, details = build_query_prompt("Can I prepay my loans?", customer, retrieved_context, token_budget)
+
+    assert details["prompt_tokens"] <= token_budget
+    assert 0 < details["loans_omitted"] < 200
+    assert f"Details of {details['loans_omitted']} more loans are not included here." in prompt
+    # Loans are kept in order
+    assert "Loan ID: LOAN001" in prompt
+    assert f"Loan ID: LOAN{200 - details['loans_omitted'] + 1:03d}" not in prompt
+
+
+def test_loans_that_fit_are_all_included(retrieved_context):
+    prompt, details = build_query_prompt("Can I prepay my loans?", _customer(2), retrieved_context, 1500)
+    assert details["loans_omitted"] == 0
+    assert "Loan ID: LOAN002" in prompt and "not included here" not in prompt
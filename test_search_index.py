@@ -0,0 +1,51 @@
+"""Tests for the keyword ranking of search_index.
+
+Run with `python -m pytest`.
+"""
+import re
+
+import pytest
+
+from vector_db_service import VectorDBService
+
+
+def _baseline_relevance(query, text):
+    """The per-document scorer the inverted index replaced."""
+    query_lower = query.lower()
+    text_lower = text.lower()
+    query_words = set(word for word in re.findall(r'\b\w+\b', query_lower) if len(word) > 2)
+    text_words = set(re.findall(r'\b\w+\b', text_lower))
+    if not query_words:
+        return 0.0
+    score = len(query_words.intersection(text_words)) / len(query_words)
+    if query_lower in text_lower:
+        score = min(1.0, score + 0.5)
+    return score
+
+
+QUERIES = [
+    "rate",
+    "pre",
+    "EMI",
+    "emi",
+    "What is EMI?",
+    "prepayment charges",
+    "Prepayment Charges:",
+    "home loan",
+    "loan.",
+    "is",
+    "",
+    "What happens if I miss an EMI payment?",
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_overlap_scores_match_baseline_scorer(query):
+    service = VectorDBService(ranking="overlap", persist_dir=None)
+    for index in (service.faq_index, service.policy_index):
+        expected = {
+            doc_id: _baseline_relevance(query, content)
+            for doc_id, content in enumerate(index.contents)
+        }
+        scores = index.score_overlap(query)
+        assert {doc_id: scores.get(doc_id, 0.0) for doc_id in expected} == expected
@@ -0,0 +1,130 @@
+"""Tests for the retrieval cache and the persisted index of VectorDBService.
+
+Run with `python -m pytest`.
+"""
+import pytest
+
+import index_store
+import search_index
+import vector_db_service
+from vector_db_service import SEARCH_MODES, VectorDBService
+
+# Phrasings that share words with each other, so a cache keyed too loosely
+# would hand one of them the other's ranking
+QUERIES = [
+    "EMI",
+    "What is EMI?",
+    "what is emi",
+    "How is EMI calculated?",
+    "When can prepayment be made?",
+    "How can prepayment be made?",
+    "prepayment",
+    "What are the prepayment charges?",
+]
+
+
+def _ids(results):
+    return [result["metadata"]["id"] for result in results]
+
+
+@pytest.mark.parametrize("ranking", SEARCH_MODES)
+def test_warm_cache_returns_cold_results(ranking):
+    if ranking == "dense":
+        pytest.importorskip("numpy")
+    cold = VectorDBService(ranking=ranking, persist_dir=None)
+    cold.cache.max_size = 0
+    expected = {query: _ids(cold.search_faqs(query)) for query in QUERIES}
+
+    # Warm the cache in both orders, so every query can be served a sibling's entry
+    for order in (QUERIES, QUERIES[::-1]):
+        warm = VectorDBService(ranking=ranking, persist_dir=None)
+        for query in order:
+            warm.search_faqs(query)
+        for query in order:
+            assert _ids(warm.search_faqs(query)) == expected[query], query
+
+
+@pytest.mark.parametrize("ranking", SEARCH_MODES)
+def test_search_many_matches_single_searches(ranking):
+    if ranking == "dense":
+        pytest.importorskip("numpy")
+    cold = VectorDBService(ranking=ranking, persist_dir=None)
+    cold.cache.max_size = 0
+    expected = [_ids(cold.search_faqs(query)) for query in QUERIES]
+
+    warm = VectorDBService(ranking=ranking, persist_dir=None)
+    warm.search_faqs(QUERIES[0])
+    for _ in range(2):
+        batch = warm.search_many(QUERIES, collections=("faqs",))
+        assert [_ids(result["faqs"]) for result in batch] == expected
+
+
+def test_persisted_index_is_ignored_after_data_changes(tmp_path, monkeypatch):
+    persist_dir = str(tmp_path / "vectordb")
+    index_store.build_index(persist_dir)
+    assert VectorDBService(ranking="bm25", persist_dir=persist_dir).persisted
+
+    faq = {"question": "Can I pause my EMIs during a moratorium?", "answer": "Yes, on request."}
+    monkeypatch.setattr(vector_db_service, "LOAN_FAQS", vector_db_service.LOAN_FAQS + [faq])
+    service = VectorDBService(ranking="bm25", persist_dir=persist_dir)
+    assert not service.persisted
+    assert service.search_faqs("moratorium")[0]["metadata"]["question"] == faq["question"]
+
+
+class _CountingPattern:
+    """Stand-in for search_index.TOKEN_PATTERN that counts the texts tokenized."""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.texts = []
+
+    def findall(self, text):
+        self.texts.append(text)
+        return self.pattern.findall(text)
+
+
+def _with_ids(documents, prefix):
+    return [dict(document, id=f"{prefix}-{position + 1}") for position, document in enumerate(documents)]
+
+
+@pytest.mark.parametrize("ranking", SEARCH_MODES)
+def test_incremental_updates_match_a_fresh_build(ranking, monkeypatch):
+    if ranking == "dense":
+        pytest.importorskip("numpy")
+    new_faq = {"id": "faq-new", "question": "Can I pause my EMIs during a moratorium?", "answer": "Yes, on request."}
+    replaced_faq = {"id": "faq-3", "question": "What is a foreclosure?", "answer": "Closing the loan early."}
+
+    service = VectorDBService(ranking=ranking, persist_dir=None)
+    index = service.faq_index
+    old_postings = {term: index.postings[term_id] for term, term_id in index.vocabulary.items()}
+
+    counter = _CountingPattern(search_index.TOKEN_PATTERN)
+    monkeypatch.setattr(search_index, "TOKEN_PATTERN", counter)
+    service.add_documents("faqs", [new_faq, replaced_faq])
+    service.remove_documents("policies", ["policy-2"])
+    monkeypatch.undo()
+
+    # Only the two added documents were tokenized (dense mode embeds them too)
+    added_contents = service.faq_index.contents[-2:]
+    assert set(counter.texts) == {content.lower() for content in added_contents}
+    changed_terms = set(search_index.tokenize(" ".join(added_contents)))
+    updated = service.faq_index
+    for term, postings in old_postings.items():
+        if term not in changed_terms:
+            assert updated.postings[updated.vocabulary[term]] is postings, term
+    # The published snapshot before the update was left as it was
+    assert index.live_count == len(vector_db_service.LOAN_FAQS)
+
+    faqs = [faq for faq in _with_ids(vector_db_service.LOAN_FAQS, "faq") if faq["id"] != "faq-3"]
+    policies = [policy for policy in _with_ids(vector_db_service.POLICY_DOCUMENTS, "policy") if policy["id"] != "policy-2"]
+    fresh = VectorDBService(ranking=ranking, persist_dir=None)
+    fresh.reload_corpus(faqs + [new_faq, replaced_faq], policies)
+
+    for query in QUERIES + ["moratorium", "foreclosure closing early"]:
+        for search in ("search_faqs", "search_policies"):
+            expected = getattr(fresh, search)(query)
+            results = getattr(service, search)(query)
+            assert _ids(results) == _ids(expected), (search, query)
+            assert [result["score"] for result in results] == pytest.approx(
+                [result["score"] for result in expected]
+            ), (search, query)
@@ -1,7 +1,19 @@
 """Vector database service for RAG (Retrieval-Augmented Generation)."""
-from typing import List, Dict
-import re
+from typing import List, Dict, Optional, Tuple
+import json
+import os
+import threading
+import config
+import index_store
+from cache import LRUCache
 from data import LOAN_FAQS, POLICY_DOCUMENTS
+from search_index import InvertedIndex, RANKING_MODES, query_terms, tokenize
+from embedding_index import HashingEmbedder, DenseIndex
+
+# Keyword ranking modes plus dense retrieval over local embeddings
+SEARCH_MODES = RANKING_MODES + ("dense",)
+
+COLLECTIONS = ("faqs", "policies")
 
 
 class VectorDBService:
@@ -9,43 +21,246 @@ class VectorDBService:
     
     This is a simplified implementation using keyword matching for demonstration.
     In production, use ChromaDB or similar with proper embeddings.
+    
+    Both collections are tokenized once at startup into an inverted index, so
+    each search only scores documents that share a keyword with the query.
+    Results are ranked by keyword overlap, by BM25, or by cosine similarity of
+    locally computed hashed n-gram embeddings (see config.RETRIEVAL_RANKING).
+    A prebuilt index in config.VECTOR_DB_PERSIST_DIR is memory-mapped at startup.
+    
+    Documents can be added or removed incrementally, and the whole corpus can
+    be reloaded. Every change is applied to new or copied indexes that are
+    swapped in with a single assignment, so searches already running keep
+    their snapshot.
+    
+    Search results are cached per collection, keyed on exactly what the
+    ranking reads from the query (see _cache_query) and n_results, so a cached
+    result is always the one ranking the query would produce; any corpus
+    change bumps corpus_version and clears the cache.
     """
     
-    def __init__(self):
-        """Initialize the vector database."""
+    def __init__(self, ranking: Optional[str] = None, persist_dir: Optional[str] = config.VECTOR_DB_PERSIST_DIR):
+        """
+        Initialize the vector database.
+        
+        If an index built with `python index_store.py build` exists in
+        persist_dir, it is opened via mmap instead of being rebuilt from data.py.
+        
+        Args:
+            ranking: Ranking mode ("overlap", "bm25" or "dense"), defaults to config.RETRIEVAL_RANKING
+            persist_dir: Directory of a persisted index, or None to always build in memory
+        """
+        self.ranking = ranking or config.RETRIEVAL_RANKING
+        if self.ranking not in SEARCH_MODES:
+            raise ValueError(f"Unknown ranking mode: {self.ranking}")
+        
         self.faqs = LOAN_FAQS
         self.policies = POLICY_DOCUMENTS
+        self.corpus_version = 0
+        self._write_lock = threading.Lock()
+        self.cache = LRUCache(
+            max_size=config.RETRIEVAL_CACHE_SIZE,
+            ttl_seconds=config.RETRIEVAL_CACHE_TTL
+        )
+        
+        # Hashed from the raw documents, so a persisted index can be checked
+        # against data.py without reading it
+        self.corpus_hash = self._source_hash(self.faqs, self.policies)
+        collections = self._open_persisted(persist_dir) if persist_dir is not None else None
+        self.persisted = collections is not None
+        self._collections = collections or self._build_collections(self.faqs, self.policies)
+    
+    @property
+    def faq_index(self) -> InvertedIndex:
+        return self._collections["faqs"][0]
+    
+    @property
+    def faq_vectors(self) -> Optional[DenseIndex]:
+        return self._collections["faqs"][1]
+    
+    @property
+    def policy_index(self) -> InvertedIndex:
+        return self._collections["policies"][0]
+    
+    @property
+    def policy_vectors(self) -> Optional[DenseIndex]:
+        return self._collections["policies"][1]
     
-    def _calculate_relevance(self, query: str, text: str) -> float:
+    def _new_embedder(self) -> Optional[HashingEmbedder]:
+        """Create the embedder for dense retrieval (None for keyword modes)."""
+        if self.ranking != "dense":
+            return None
+        return HashingEmbedder(dimensions=config.EMBEDDING_DIMENSIONS)
+    
+    def _build_collections(self, faqs: List[Dict], policies: List[Dict]) -> Dict[str, Tuple]:
         """
-        Calculate simple keyword-based relevance score.
+        Build in-memory indexes for both collections.
         
         Args:
-            query: Search query
-            text: Text to compare
+            faqs: FAQ dictionaries with question and answer
+            policies: Policy dictionaries with title, section and content
             
         Returns:
-            Relevance score (0-1)
+            Mapping of collection name to (InvertedIndex, DenseIndex or None)
+        """
+        embedder = self._new_embedder()
+        return {
+            name: self._build_collection(name, documents, embedder)
+            for name, documents in (("faqs", faqs), ("policies", policies))
+        }
+    
+    def _build_collection(self, name: str, documents: List[Dict], embedder: Optional[HashingEmbedder]) -> Tuple:
+        """Build the in-memory (InvertedIndex, DenseIndex or None) of one collection."""
+        index = InvertedIndex(
+            (self._document(name, document, position) for position, document in enumerate(documents)),
+            k1=config.BM25_K1, b=config.BM25_B
+        )
+        # Dense vectors are only built when dense retrieval is selected
+        vectors = DenseIndex(embedder, index.contents) if embedder else None
+        return index, vectors
+    
+    def _open_persisted(self, persist_dir: str) -> Optional[Dict[str, Tuple]]:
         """
-        query_lower = query.lower()
-        text_lower = text.lower()
+        Open a persisted index if one of the supported format exists and
+        holds the documents of data.py.
         
-        # Extract keywords from query (words longer than 2 characters)
-        query_words = set(word for word in re.findall(r'\b\w+\b', query_lower) if len(word) > 2)
-        text_words = set(re.findall(r'\b\w+\b', text_lower))
+        Args:
+            persist_dir: Index directory
+            
+        Returns:
+            Mapping of collection name to (InvertedIndex, DenseIndex or None), or None
+        """
+        manifest = index_store.read_manifest(persist_dir)
+        if not manifest or not set(COLLECTIONS) <= set(manifest["collections"]):
+            return None
+        # An index built from an older data.py is stale: rebuild in memory
+        if manifest.get("content_hash") != self.corpus_hash:
+            return None
         
-        if not query_words:
-            return 0.0
+        embedder = self._new_embedder()
+        collections = {}
+        for name in COLLECTIONS:
+            index, vectors = index_store.open_collection(
+                os.path.join(persist_dir, name), manifest["collections"][name], embedder
+            )
+            if embedder is not None and vectors is None:
+                # Persisted vectors are missing or have different dimensions
+                vectors = DenseIndex(embedder, index.contents)
+            if (index.k1, index.b) != (config.BM25_K1, config.BM25_B):
+                index.k1, index.b = config.BM25_K1, config.BM25_B
+                index._refresh_statistics()
+            collections[name] = (index, vectors)
+        return collections
+    
+    @classmethod
+    def _source_hash(cls, faqs: List[Dict], policies: List[Dict]) -> str:
+        """Content hash the indexes of a raw corpus would have, without building them."""
+        def documents(name: str, raw_documents: List[Dict]):
+            for position, document in enumerate(raw_documents):
+                indexed = cls._document(name, document, position)
+                yield indexed["metadata"]["id"], indexed["content"]
         
-        # Calculate overlap
-        common_words = query_words.intersection(text_words)
-        score = len(common_words) / len(query_words)
+        return index_store.content_hash({
+            name: documents(name, raw_documents)
+            for name, raw_documents in (("faqs", faqs), ("policies", policies))
+        })
+    
+    @classmethod
+    def _document(cls, collection: str, document: Dict, position: int) -> Dict:
+        """Build the indexed representation of a raw FAQ or policy document."""
+        if collection == "faqs":
+            indexed = cls._faq_document(document)
+        else:
+            indexed = cls._policy_document(document)
+        prefix = "faq" if collection == "faqs" else "policy"
+        indexed["metadata"]["id"] = document.get("id") or f"{prefix}-{position + 1}"
+        return indexed
+    
+    @staticmethod
+    def _faq_document(faq: Dict) -> Dict:
+        """Build the indexed representation of an FAQ."""
+        return {
+            "content": f"Q: {faq['question']}\nA: {faq['answer']}",
+            "metadata": {"question": faq["question"], "type": "faq"}
+        }
+    
+    @staticmethod
+    def _policy_document(policy: Dict) -> Dict:
+        """Build the indexed representation of a policy section."""
+        return {
+            "content": f"Title: {policy['title']}\nSection: {policy['section']}\nContent: {policy['content']}",
+            "metadata": {
+                "title": policy["title"],
+                "section": policy["section"],
+                "type": "policy"
+            }
+        }
+    
+    def _cache_query(self, query: str) -> str:
+        """
+        Reduce a query to what its ranking depends on, for cache keys.
         
-        # Boost score if query substring appears in text
-        if query_lower in text_lower:
-            score = min(1.0, score + 0.5)
+        - overlap: the lowercased query (its keywords, plus the verbatim
+          substring boost)
+        - bm25: the set of keywords
+        - dense: the bag of tokens that is embedded
+        """
+        if self.ranking == "overlap":
+            return query.lower()
+        if self.ranking == "bm25":
+            return " ".join(sorted(query_terms(query)))
+        return " ".join(sorted(tokenize(query)))
+    
+    def _snapshot(self) -> Tuple[int, Dict]:
+        """
+        Capture the corpus version and collections for a consistent search.
         
-        return score
+        The version is read before the collections: a result computed on a
+        newer snapshot may be cached under an older version, never the reverse.
+        """
+        version = self.corpus_version
+        return version, self._collections
+    
+    def _search(self, name: str, query: str, n_results: int, snapshot: Optional[Tuple] = None) -> List[Dict]:
+        """
+        Search one collection through the retrieval cache.
+        
+        Args:
+            name: Collection name
+            query: User query
+            n_results: Number of results to return
+            snapshot: (version, collections) from _snapshot(), defaults to the current one
+            
+        Returns:
+            List of relevant documents with metadata
+        """
+        version, collections = snapshot or self._snapshot()
+        key = (name, self._cache_query(query), n_results, version)
+        results = self.cache.get(key)
+        if results is None:
+            results = self._rank(collections[name], query, n_results)
+            self.cache.set(key, results)
+        
+        return [dict(result, metadata=dict(result["metadata"])) for result in results]
+    
+    def _rank(self, collection: Tuple, query: str, n_results: int) -> List[Dict]:
+        """Rank one collection with the configured ranking mode."""
+        return self._rank_many(collection, [query], n_results)[0]
+    
+    def _rank_many(self, collection: Tuple, queries: List[str], n_results: int) -> List[List[Dict]]:
+        """Rank one collection for several queries in a single scoring pass."""
+        index, vectors = collection
+        if vectors is not None:
+            score_matrix = vectors.score_many(queries)
+            if index.deleted:
+                score_matrix[:, list(index.deleted)] = float("-inf")
+            n_results = min(n_results, index.live_count)
+            return [index.documents(vectors.top_k(scores, n_results)) for scores in score_matrix]
+        
+        return [
+            index.documents(index.top_k(scores, n_results))
+            for scores in index.score_many(queries, self.ranking)
+        ]
     
     def search_faqs(self, query: str, n_results: int = 3) -> List[Dict]:
         """
@@ -58,21 +273,7 @@ class VectorDBService:
         Returns:
             List of relevant FAQ documents with metadata
         """
-        results = []
-        
-        for faq in self.faqs:
-            content = f"Q: {faq['question']}\nA: {faq['answer']}"
-            score = self._calculate_relevance(query, content)
-            
-            results.append({
-                "content": content,
-                "metadata": {"question": faq["question"], "type": "faq"},
-                "score": score
-            })
-        
-        # Sort by score and return top results
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:n_results]
+        return self._search("faqs", query, n_results)
     
     def search_policies(self, query: str, n_results: int = 3) -> List[Dict]:
         """
@@ -85,43 +286,240 @@ class VectorDBService:
         Returns:
             List of relevant policy documents with metadata
         """
-        results = []
-        
-        for policy in self.policies:
-            content = f"Title: {policy['title']}\nSection: {policy['section']}\nContent: {policy['content']}"
-            score = self._calculate_relevance(query, content)
-            
-            results.append({
-                "content": content,
-                "metadata": {
-                    "title": policy["title"],
-                    "section": policy["section"],
-                    "type": "policy"
-                },
-                "score": score
-            })
-        
-        # Sort by score and return top results
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:n_results]
-    
-    def search_all(self, query: str, n_results: int = 5) -> Dict[str, List[Dict]]:
+        return self._search("policies", query, n_results)
+    
+    def search_all(self, query: str, n_results: int = 5, per_collection: Optional[int] = None) -> Dict[str, List[Dict]]:
         """
         Search both FAQs and policies.
         
         Args:
             query: User query
-            n_results: Number of results per collection
+            n_results: Total number of results, split as n_results // 2 + 1 per collection
+            per_collection: Exact number of results per collection (overrides n_results)
             
         Returns:
             Dictionary with FAQ and policy results
         """
+        if per_collection is None:
+            per_collection = n_results // 2 + 1
+        
+        # Both collections come from the same corpus snapshot
+        snapshot = self._snapshot()
         return {
-            "faqs": self.search_faqs(query, n_results // 2 + 1),
-            "policies": self.search_policies(query, n_results // 2 + 1)
+            "faqs": self._search("faqs", query, per_collection, snapshot),
+            "policies": self._search("policies", query, per_collection, snapshot)
         }
     
+    def search_many(self, queries: List[str], n_results: int = 3,
+                    collections: Tuple[str, ...] = COLLECTIONS) -> List[Dict[str, List[Dict]]]:
+        """
+        Search many queries at once.
+        
+        Cached queries are answered from the retrieval cache; the rest are
+        scored together per collection (one shared postings traversal, or one
+        matrix-matrix product in dense mode).
+        
+        Args:
+            queries: User queries
+            n_results: Number of results per query and collection
+            collections: Collections to search
+            
+        Returns:
+            One dictionary of results per collection for each query, in input order
+        """
+        for name in collections:
+            if name not in COLLECTIONS:
+                raise ValueError(f"Unknown collection: {name}")
+        
+        version, snapshot = self._snapshot()
+        keys = [self._cache_query(query) for query in queries]
+        results = [{} for _ in queries]
+        
+        for name in collections:
+            # Cache key -> positions of the queries sharing it (ranked once)
+            pending: Dict[str, List[int]] = {}
+            for position, key in enumerate(keys):
+                cached = self.cache.get((name, key, n_results, version))
+                if cached is not None:
+                    results[position][name] = cached
+                else:
+                    pending.setdefault(key, []).append(position)
+            
+            if pending:
+                unique_keys = list(pending)
+                ranked = self._rank_many(
+                    snapshot[name], [queries[pending[key][0]] for key in unique_keys], n_results
+                )
+                for key, documents in zip(unique_keys, ranked):
+                    self.cache.set((name, key, n_results, version), documents)
+                    for position in pending[key]:
+                        results[position][name] = documents
+        
+        return [
+            {
+                name: [dict(result, metadata=dict(result["metadata"])) for result in documents]
+                for name, documents in per_query.items()
+            }
+            for per_query in results
+        ]
+    
+    def _update_collection(self, collection: str, update) -> None:
+        """
+        Apply an update to a copy of one collection and swap it in (caller
+        holds the write lock).
+        
+        The copy shares all unchanged postings and rows with the live index
+        (see InvertedIndex.copy and DenseIndex.copy), so only the documents
+        the update touches are tokenized or embedded. Like reload_corpus, the
+        result is published with a single assignment, so searches never see
+        a half-updated index.
+        
+        Args:
+            collection: "faqs" or "policies"
+            update: Function applying the change to (InvertedIndex, DenseIndex or None)
+        """
+        index, vectors = self._collections[collection]
+        index = index.copy()
+        vectors = vectors.copy() if vectors is not None else None
+        update(index, vectors)
+        index._refresh_statistics()
+        
+        collections = dict(self._collections)
+        collections[collection] = (index, vectors)
+        self._collections = collections
+        self.persisted = False
+        self._corpus_changed()
+    
+    def add_documents(self, collection: str, documents: List[Dict]) -> List[str]:
+        """
+        Add or replace documents without rebuilding the index.
+        
+        A document whose "id" already exists replaces the existing one. Only
+        the new documents are indexed, into a copy of the collection that is
+        swapped in afterwards, so concurrent searches keep using the previous
+        index until the update is complete.
+        
+        Args:
+            collection: "faqs" or "policies"
+            documents: Raw FAQ (question, answer) or policy (title, section, content) dictionaries
+            
+        Returns:
+            IDs of the added documents
+        """
+        if collection not in COLLECTIONS:
+            raise ValueError(f"Unknown collection: {collection}")
+        
+        # Validate every document before touching the index
+        for document in documents:
+            self._document(collection, document, 0)
+        
+        added = []
+        
+        def update(index: InvertedIndex, vectors: Optional[DenseIndex]):
+            for document in documents:
+                if document.get("id"):
+                    existing = index.position_of(document["id"])
+                    if existing is not None:
+                        index.remove(existing)
+                
+                indexed = self._document(collection, document, len(index))
+                while not document.get("id") and index.position_of(indexed["metadata"]["id"]) is not None:
+                    indexed["metadata"]["id"] += "-1"
+                
+                index.add(indexed["content"], indexed["metadata"])
+                if vectors is not None:
+                    vectors.add(indexed["content"])
+                added.append(indexed["metadata"]["id"])
+        
+        with self._write_lock:
+            self._update_collection(collection, update)
+        
+        return added
+    
+    def remove_documents(self, collection: str, document_ids: List[str]) -> int:
+        """
+        Remove documents by ID without rebuilding the index.
+        
+        Like add_documents, the removal is applied to a copy of the
+        collection that is then swapped in.
+        
+        Args:
+            collection: "faqs" or "policies"
+            document_ids: IDs of the documents to remove
+            
+        Returns:
+            Number of documents removed
+        """
+        if collection not in COLLECTIONS:
+            raise ValueError(f"Unknown collection: {collection}")
+        
+        def update(index: InvertedIndex, vectors: Optional[DenseIndex]):
+            for position in positions:
+                index.remove(position)
+        
+        with self._write_lock:
+            index = self._collections[collection][0]
+            positions = {index.position_of(document_id) for document_id in document_ids} - {None}
+            if positions:
+                self._update_collection(collection, update)
+        
+        return len(positions)
+    
+    def reload_corpus(self, faqs: List[Dict], policies: List[Dict]) -> Dict[str, int]:
+        """
+        Rebuild both collections from a new corpus and swap them in atomically.
+        
+        Args:
+            faqs: FAQ dictionaries with question and answer
+            policies: Policy dictionaries with title, section and content
+            
+        Returns:
+            Number of documents per collection
+        """
+        collections = self._build_collections(faqs, policies)
+        with self._write_lock:
+            self._collections = collections
+            self.faqs = faqs
+            self.policies = policies
+            self.persisted = False
+            self._corpus_changed()
+        
+        return {name: index.live_count for name, (index, _) in collections.items()}
+    
+    def load_corpus_file(self, path: str) -> Dict[str, int]:
+        """
+        Reload the corpus from a JSON file.
+        
+        The file holds {"faqs": [...], "policies": [...]} in the same shape as
+        LOAN_FAQS and POLICY_DOCUMENTS in data.py.
+        
+        Args:
+            path: Path to the corpus file
+            
+        Returns:
+            Number of documents per collection
+        """
+        with open(path) as handle:
+            corpus = json.load(handle)
+        
+        if not isinstance(corpus, dict) or not all(isinstance(corpus.get(name), list) for name in COLLECTIONS):
+            raise ValueError("Corpus file must contain 'faqs' and 'policies' lists")
+        
+        return self.reload_corpus(corpus["faqs"], corpus["policies"])
+    
+    def _corpus_changed(self):
+        """
+        Bump the corpus version, rehash the corpus and drop cached results
+        (caller holds the write lock).
+        """
+        self.corpus_version += 1
+        self.corpus_hash = index_store.index_hash(self._collections)
+        self.cache.clear()
+    
+    def cache_stats(self) -> Dict:
+        """Return retrieval cache statistics."""
+        return dict(self.cache.stats(), corpus_version=self.corpus_version)
+    
     def reset_collections(self):
-        """Reset all collections (useful for testing)."""
-        # No-op for this simple implementation
-        pass
+        """Reset all collections to the sample data in data.py (useful for testing)."""
+        self.reload_corpus(LOAN_FAQS, POLICY_DOCUMENTS)